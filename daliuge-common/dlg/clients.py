@@ -19,6 +19,7 @@
 #    Foundation, Inc., 59 Temple Place, Suite 330, Boston,
 #    MA 02111-1307  USA
 #
+import json
 import logging
 import os
 import urllib.parse
@@ -91,6 +92,25 @@ class BaseDROPManagerClient(RestClient):
             self.port,
         )
 
+    def append_graph_stream(self, sessionId, dropSpecs):
+        """
+        Like `append_graph`, but `dropSpecs` can be any iterable of DROP
+        specifications. They are serialised and uploaded in chunks as they are
+        consumed, and checked and added to the session in batches by the
+        remote end as they arrive.
+        """
+        self._post_json(
+            f"/sessions/{quote(sessionId)}/graph/stream",
+            (dropSpec for dropSpec in dropSpecs),
+            compress=compress,
+        )
+        logger.debug(
+            "Successfully streamed graph to session %s on %s:%s",
+            sessionId,
+            self.host,
+            self.port,
+        )
+
     def destroy_session(self, sessionId):
         """
         Destroys session `sessionId`
@@ -114,6 +134,33 @@ class BaseDROPManagerClient(RestClient):
         )
         return ret
 
+    def graph_status_summary(self, sessionId):
+        """
+        Returns the number of DROPs in each status, overall and per node and
+        lg_key, together with the version of the graph status
+        """
+        return self._get_json(f"/sessions/{quote(sessionId)}/graph/status/summary")
+
+    def graph_status_changes(
+        self, sessionId, since=None, status=None, node=None, lg_key=None
+    ):
+        """
+        Returns the status of the DROPs that changed after version `since` of
+        the graph status (all DROPs if not given), together with the current
+        version. DROPs can be further filtered by the given lists of `status`,
+        `node` and `lg_key` values.
+        """
+        params = {}
+        if since is not None:
+            params["since"] = json.dumps(since)
+        for name, values in (("status", status), ("node", node), ("lg_key", lg_key)):
+            if values:
+                params[name] = ",".join(str(v) for v in values)
+        url = f"/sessions/{quote(sessionId)}/graph/status/changes"
+        if params:
+            url += "?" + urllib.parse.urlencode(params)
+        return self._get_json(url)
+
     def graph(self, sessionId):
         """
         Returns a dictionary where the key are the DROP UIDs, and the values are
@@ -212,8 +259,11 @@ class BaseDROPManagerClient(RestClient):
     destroySession = destroy_session
     getSessionStatus = session_status
     addGraphSpec = append_graph
+    addGraphSpecStream = append_graph_stream
     deploySession = deploy_session
     getGraphStatus = graph_status
+    getGraphStatusSummary = graph_status_summary
+    getGraphStatusChanges = graph_status_changes
     getGraphSize = graph_size
     getGraph = graph
 
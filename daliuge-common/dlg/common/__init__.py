@@ -26,7 +26,7 @@ import logging
 """Common utilities used by daliuge packages"""
 from .osutils import terminate_or_kill, wait_or_kill
 from .network import check_port, connect_to, portIsClosed, portIsOpen, write_to
-from .streams import ZlibCompressedStream, JSONStream
+from .streams import ZlibCompressedStream, JSONStream, JSONArrayReader
 
 logger = logging.getLogger(__name__)
 
@@ -20,10 +20,16 @@
 #    MA 02111-1307  USA
 #
 """Common stream utilities"""
+import codecs
 import json
+import re
 import types
 import zlib
 
+_NON_WS = re.compile(r"[^ \t\n\r]")
+_DELIMITER = re.compile(r"[ \t\n\r,\]]")
+_SEPARATOR = re.compile(r"[ \t\n\r]*([,\]])[ \t\n\r]*")
+
 
 class ZlibCompressedStream(object):
     """
@@ -191,3 +197,106 @@ class JSONStream(object):
                 break
 
         return b"".join(response)
+
+
+class JSONArrayReader(object):
+    """
+    An iterable that reads a JSON array from an input stream (bytes or text)
+    and yields its elements one by one as they are decoded. Only the element
+    currently being decoded and a small read buffer are kept in memory, so
+    arbitrarily long arrays, like those produced by JSONStream, can be
+    consumed with bounded memory.
+    """
+
+    def __init__(self, content, blocksize=65536):
+        self.content = content
+        self.blocksize = blocksize
+        # json.loads shares the keys of all objects decoded in a single call,
+        # but here each element is decoded separately, so we share them
+        # ourselves to keep many similar objects (e.g., DROP specs) compact
+        keys = {}
+        self.decoder = json.JSONDecoder(
+            object_pairs_hook=lambda pairs: {keys.setdefault(k, k): v for k, v in pairs}
+        )
+        self.text_decoder = codecs.getincrementaldecoder("utf8")()
+        self.buf = ""
+        self.pos = 0
+        self.exhausted = False
+
+    def _fill(self, n):
+        """Reads `n` more bytes into the buffer, dropping those already parsed"""
+        data = self.content.read(n)
+        if not data:
+            self.exhausted = True
+            data = b""
+        if isinstance(data, bytes):
+            data = self.text_decoder.decode(data, final=self.exhausted)
+        self.buf = self.buf[self.pos :] + data
+        self.pos = 0
+
+    def _next_token(self):
+        """Returns the next non-whitespace character, or None at the end"""
+        while True:
+            match = _NON_WS.search(self.buf, self.pos)
+            if match:
+                self.pos = match.start()
+                return self.buf[self.pos]
+            self.pos = len(self.buf)
+            if self.exhausted:
+                return None
+            self._fill(self.blocksize)
+
+    def _expect(self, expected):
+        token = self._next_token()
+        if token is None or token not in expected:
+            raise ValueError(
+                "Expected one of %r at position %d, found %r"
+                % (expected, self.pos, token)
+            )
+        self.pos += 1
+        return token
+
+    def _decode_value(self):
+        # A value is accepted only when followed by a delimiter, otherwise
+        # the buffer might end in the middle of it (e.g., a number). Values
+        # spanning many blocks are re-read with an increasingly larger block
+        # size to avoid decoding them too many times
+        n = self.blocksize
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buf, self.pos)
+                if self.exhausted or _DELIMITER.match(self.buf, end):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.exhausted:
+                    raise
+            self._fill(n)
+            n *= 2
+
+    def __iter__(self):
+        self._expect("[")
+        if self._next_token() == "]":
+            self.pos += 1
+            return
+        scan_once = self.decoder.scan_once
+        while True:
+            # Fast path for elements fully contained in the buffer and
+            # followed by their delimiter
+            try:
+                value, end = scan_once(self.buf, self.pos)
+                separator = _SEPARATOR.match(self.buf, end)
+            except (StopIteration, ValueError):
+                separator = None
+            if separator:
+                self.pos = separator.end()
+                yield value
+                if separator.group(1) == "]":
+                    return
+                continue
+
+            self._next_token()
+            yield self._decode_value()
+            if self._expect(",]") == "]":
+                return
+            self._next_token()
@@ -20,11 +20,14 @@
 #    MA 02111-1307  USA
 #
 import codecs
+import collections
 import http.client
 import io
 import json
 import logging
+import socket
 import socketserver
+import threading
 import urllib.parse
 import wsgiref.simple_server
 
@@ -42,6 +45,41 @@ class ThreadingWSGIServer(
     daemon_threads = True
     allow_reuse_address = True
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._idle_lock = threading.Lock()
+        self._idle_connections = set()
+        self._closing = False
+
+    def wait_for_request(self, connection):
+        """
+        Marks `connection` as idle while waiting for its next request. Returns
+        False if the server is closing, and thus the connection shouldn't be
+        used anymore
+        """
+        with self._idle_lock:
+            if self._closing:
+                return False
+            self._idle_connections.add(connection)
+            return True
+
+    def request_arrived(self, connection):
+        with self._idle_lock:
+            self._idle_connections.discard(connection)
+
+    def server_close(self):
+        # Idle keep-alive connections would otherwise keep being served by
+        # their (daemon) threads after the server has gone
+        with self._idle_lock:
+            self._closing = True
+            for connection in self._idle_connections:
+                try:
+                    connection.shutdown(socket.SHUT_RD)
+                except OSError:
+                    pass
+            self._idle_connections.clear()
+        super().server_close()
+
 
 class LoggingWSGIRequestHandler(wsgiref.simple_server.WSGIRequestHandler):
     def log_message(self, fmt, *args):
@@ -49,6 +87,142 @@ class LoggingWSGIRequestHandler(wsgiref.simple_server.WSGIRequestHandler):
         # logger.debug(fmt, *args)
 
 
+class _RequestBody(object):
+    """
+    The body of a request with a Content-Length, which can be drained after the
+    application is done with it so the connection can take a new request
+    """
+
+    def __init__(self, stream, length):
+        self._stream = stream
+        self._remaining = length
+
+    def read(self, size=-1):
+        if size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._stream.read(size) if size else b""
+        self._remaining -= len(data)
+        return data
+
+    def readline(self, size=-1):
+        if size < 0 or size > self._remaining:
+            size = self._remaining
+        data = self._stream.readline(size) if size else b""
+        self._remaining -= len(data)
+        return data
+
+    @property
+    def remaining(self):
+        return self._remaining
+
+    def readlines(self, hint=-1):
+        return list(iter(self.readline, b""))
+
+    def __iter__(self):
+        return iter(self.readline, b"")
+
+    def drain(self, limit):
+        """Skips the rest of the body, returns False if more than `limit` left"""
+        if self._remaining > limit:
+            return False
+        while self._remaining:
+            if not self.read(65536):
+                return False
+        return True
+
+
+class KeepAliveServerHandler(wsgiref.simple_server.ServerHandler):
+    """
+    A ServerHandler that answers with HTTP/1.1 and keeps the connection open
+    when the length of the response is known
+    """
+
+    http_version = "1.1"
+
+    def cleanup_headers(self):
+        super().cleanup_headers()
+        request_handler = self.request_handler
+        if "Content-Length" not in self.headers:
+            request_handler.close_connection = True
+        elif isinstance(self.stdin, _RequestBody):
+            if self.stdin.remaining > request_handler.max_drained_body:
+                request_handler.close_connection = True
+        if request_handler.close_connection:
+            self.headers["Connection"] = "close"
+
+    def handle_error(self):
+        self.request_handler.close_connection = True
+        super().handle_error()
+
+
+class KeepAliveWSGIRequestHandler(LoggingWSGIRequestHandler):
+    """
+    A WSGIRequestHandler that serves more than one request per connection, so
+    clients can keep their connections open between requests. Connections that
+    stay idle for longer than `idle_timeout` seconds are closed
+    """
+
+    protocol_version = "HTTP/1.1"
+    idle_timeout = 60
+    max_drained_body = 1024**2
+
+    def handle(self):
+        self.close_connection = True
+        self.handle_one_request()
+        while not self.close_connection:
+            if not self.server.wait_for_request(self.connection):
+                break
+            self.connection.settimeout(self.idle_timeout)
+            try:
+                self.raw_requestline = self.rfile.readline(65537)
+            except OSError:
+                break
+            finally:
+                self.server.request_arrived(self.connection)
+            if not self.raw_requestline:
+                break
+            self.connection.settimeout(None)
+            self._handle_request()
+
+    def handle_one_request(self):
+        self.raw_requestline = self.rfile.readline(65537)
+        self._handle_request()
+
+    def _handle_request(self):
+        if len(self.raw_requestline) > 65536:
+            self.requestline = ""
+            self.request_version = ""
+            self.command = ""
+            self.send_error(414)
+            self.close_connection = True
+            return
+
+        if not self.parse_request():  # An error code has been sent, just exit
+            self.close_connection = True
+            return
+
+        # The end of chunked bodies is only known to whoever reads them
+        environ = self.get_environ()
+        stdin = self.rfile
+        if "chunked" in environ.get("HTTP_TRANSFER_ENCODING", "").lower():
+            self.close_connection = True
+        else:
+            stdin = _RequestBody(self.rfile, int(environ.get("CONTENT_LENGTH") or 0))
+
+        handler = KeepAliveServerHandler(
+            stdin,
+            self.wfile,
+            self.get_stderr(),
+            environ,
+            multithread=False,
+        )
+        handler.request_handler = self  # backpointer for logging
+        handler.run(self.server.get_app())
+
+        if not self.close_connection and not stdin.drain(self.max_drained_body):
+            self.close_connection = True
+
+
 class RestServerWSGIServer:
     def __init__(self, wsgi_app, listen="localhost", port=8080):
         self.wsgi_app = wsgi_app
@@ -59,7 +233,7 @@ class RestServerWSGIServer:
             self.port,
             self.wsgi_app,
             server_class=ThreadingWSGIServer,
-            handler_class=LoggingWSGIRequestHandler,
+            handler_class=KeepAliveWSGIRequestHandler,
         )
 
     def serve_forever(self):
@@ -108,9 +282,120 @@ class chunked(object):
         return chunk(data)
 
 
+_IDEMPOTENT_METHODS = ("GET", "HEAD", "PUT", "DELETE", "OPTIONS")
+
+
+def _is_alive(conn):
+    """
+    Checks, without blocking, that the server hasn't closed an idle connection
+    """
+    sock = conn.sock
+    if sock is None:
+        return False
+    try:
+        sock.setblocking(False)
+        # Idle connections have nothing to read: an empty read means the server
+        # closed the connection, and unexpected data means it can't be reused
+        sock.recv(1, socket.MSG_PEEK)
+        return False
+    except BlockingIOError:
+        return True
+    except OSError:
+        return False
+    finally:
+        try:
+            sock.settimeout(None)
+        except OSError:
+            pass
+
+
+class ConnectionPool(object):
+    """
+    A pool of persistent HTTP connections. Connections are kept per
+    (host, port), up to `max_idle` idle connections each, and are checked to be
+    still alive before being reused
+    """
+
+    def __init__(self, max_idle=4):
+        self.max_idle = max_idle
+        self._lock = threading.Lock()
+        self._idle = collections.defaultdict(list)
+
+    def get(self, host, port):
+        """
+        Returns an idle connection to `host`:`port` if there is one still
+        alive, or None otherwise
+        """
+        with self._lock:
+            idle = self._idle.get((host, port))
+            while idle:
+                conn = idle.pop()
+                if _is_alive(conn):
+                    return conn
+                conn.close()
+        return None
+
+    def put(self, conn):
+        """
+        Gives back a connection whose last response has been fully read
+        """
+        with self._lock:
+            idle = self._idle[(conn.host, conn.port)]
+            if len(idle) < self.max_idle:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def clear(self):
+        """Closes all idle connections"""
+        with self._lock:
+            idle, self._idle = self._idle, collections.defaultdict(list)
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+
+# Shared by all clients, so connections to a given manager are reused
+connection_pool = ConnectionPool()
+
+# Streamed contents smaller than this are sent as a single, non-chunked body
+_SMALL_CONTENT = 65536
+
+
+class _PrefixedStream(object):
+    """
+    A reader that returns `prefix` and then the rest of `stream`
+    """
+
+    def __init__(self, prefix, stream):
+        self.prefix = io.BytesIO(prefix)
+        self.stream = stream
+
+    def read(self, n):
+        return self.prefix.read(n) or self.stream.read(n)
+
+
+def _content_body(content):
+    """
+    Returns the body to send for streamed `content`: its full contents if
+    small, or a chunked reader otherwise
+    """
+    data = []
+    size = 0
+    while size <= _SMALL_CONTENT:
+        block = content.read(_SMALL_CONTENT)
+        if not block:
+            return b"".join(data)
+        data.append(block)
+        size += len(block)
+    return chunked(_PrefixedStream(b"".join(data), content))
+
+
 class RestClient(object):
     """
-    The base class for our REST clients
+    The base class for our REST clients. Connections are taken from, and given
+    back to, a pool shared by all clients, so consecutive requests to the same
+    server reuse the same connection
     """
 
     def __init__(self, host, port, url_prefix="", timeout=10):
@@ -122,10 +407,17 @@ class RestClient(object):
         self._resp = None
 
     def _close(self):
-        if self._resp:
-            self._resp.close()
-        if self._conn:
-            self._conn.close()
+        conn, resp = self._conn, self._resp
+        self._conn = self._resp = None
+        if conn is None:
+            return
+        # Only fully read responses leave the connection ready for reuse
+        if resp is not None and resp.isclosed() and not resp.will_close:
+            connection_pool.put(conn)
+            return
+        if resp is not None:
+            resp.close()
+        conn.close()
 
     __del__ = _close
 
@@ -177,25 +469,67 @@ class RestClient(object):
         stream, _ = self._request(url, "DELETE")
         return stream
 
+    def _connect(self):
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+        try:
+            conn.connect()
+        except OSError:
+            # The server might be still starting up
+            if not common.portIsOpen(self.host, self.port, self.timeout):
+                raise RestClientException(
+                    "Cannot connect to %s:%d after %.2f [s]"
+                    % (self.host, self.port, self.timeout)
+                )
+            conn.connect()
+        conn.sock.settimeout(None)
+        return conn
+
     def _request(self, url, method, content=None, headers={}, timeout=10):
         # Do the HTTP stuff...
         url = self.url_prefix + url
         logger.debug("Sending %s request to %s:%d%s", method, self.host, self.port, url)
+        self._close()
 
-        if not common.portIsOpen(self.host, self.port, timeout):
-            raise RestClientException(
-                "Cannot connect to %s:%d after %.2f [s]"
-                % (self.host, self.port, self.timeout)
-            )
-
+        headers = dict(headers)
         if content and hasattr(content, "read"):
-            headers["Transfer-Encoding"] = "chunked"
-            headers["Origin"] = "http://dlg-trans.local:8084"
-            content = chunked(content)
-
-        self._conn = http.client.HTTPConnection(self.host, self.port)
-        self._conn.request(method, url, content, headers)
-        self._resp = self._conn.getresponse()
+            content = _content_body(content)
+            if isinstance(content, chunked):
+                headers["Transfer-Encoding"] = "chunked"
+                headers["Origin"] = "http://dlg-trans.local:8084"
+
+        conn = connection_pool.get(self.host, self.port)
+        if conn is not None:
+            sent = False
+            try:
+                conn.request(method, url, content, headers)
+                sent = True
+                self._resp = conn.getresponse()
+            except ConnectionError as e:
+                # The server closed the connection while it was idle, so it
+                # didn't process the request and we can try again, but only if
+                # the content wasn't streamed. That is the case if the request
+                # couldn't be sent, or if the connection was closed or reset
+                # (i.e., closed with the request still unread) before any
+                # answer came. Otherwise only idempotent requests are replayed
+                conn.close()
+                if isinstance(content, chunked):
+                    raise
+                if sent and not isinstance(e, ConnectionResetError):
+                    if method not in _IDEMPOTENT_METHODS:
+                        raise
+                conn = None
+            except:
+                conn.close()
+                raise
+        if conn is None:
+            conn = self._connect()
+            try:
+                conn.request(method, url, content, headers)
+                self._resp = conn.getresponse()
+            except:
+                conn.close()
+                raise
+        self._conn = conn
 
         # Server errors are encoded in the body as json content
         if self._resp.status != http.HTTPStatus.OK:
@@ -228,5 +562,7 @@ class RestClient(object):
             raise ex
 
         if not self._resp.length:
+            if self._resp.length == 0:
+                self._resp.read()
             return None, None
         return codecs.getreader("utf-8")(self._resp), self._resp
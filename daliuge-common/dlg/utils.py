@@ -547,4 +547,5 @@ portIsOpen = common.portIsOpen
 write_to = common.write_to
 
 JSONStream = common.JSONStream
+JSONArrayReader = common.JSONArrayReader
 ZlibCompressedStream = common.ZlibCompressedStream
@@ -2,9 +2,12 @@ from abc import ABC, abstractmethod
 from collections import OrderedDict
 from concurrent.futures import Future
 from typing import List, Callable
+import heapq
+import itertools
 import logging
 import math
 import threading
+import time
 
 from dlg.drop_loaders import load_pickle
 from dlg.data.drops.container import ContainerDROP
@@ -35,18 +38,16 @@ class DropRunner(ABC):
         """Executes `app_drop.run()`, returning a future with the result."""
         raise NotImplementedError
 
-
-class SyncDropRunner(DropRunner):
-    """
-    A simple pool-like object that creates a new thread for each invocation.
-    """
-
-    def run_drop(self, app_drop: "AppDROP") -> Future:
-        """Run drop synchronously."""
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        """
+        Executes `func(*args, **kwargs)`, returning a future with the result.
+        Used for auxiliary work on behalf of DROPs, like hashing their data.
+        By default the call is made synchronously.
+        """
         future = Future()
 
         try:
-            res = app_drop.run()
+            res = func(*args, **kwargs)
             future.set_result(res)
         except BaseException as e:
             future.set_exception(e)
@@ -54,6 +55,16 @@ class SyncDropRunner(DropRunner):
         return future
 
 
+class SyncDropRunner(DropRunner):
+    """
+    A simple pool-like object that creates a new thread for each invocation.
+    """
+
+    def run_drop(self, app_drop: "AppDROP") -> Future:
+        """Run drop synchronously."""
+        return self.submit(app_drop.run)
+
+
 def run_on_daemon_thread(func: Callable, *args, **kwargs) -> Future:
     """Runs a callable on a daemon thread, meaning it will be
     ungracefully terminated if the process ends."""
@@ -73,6 +84,106 @@ def run_on_daemon_thread(func: Callable, *args, **kwargs) -> Future:
     return future
 
 
+class ReadyQueueDispatcher:
+    """
+    Runs callables on a bounded number of daemon threads, meaning they will be
+    ungracefully terminated if the process ends. Callables waiting for a
+    thread are kept in a ready-queue that is served by priority (highest
+    first) and then in submission order. Threads are started on demand.
+    """
+
+    def __init__(self, max_workers: int):
+        if max_workers <= 0:
+            raise ValueError("max_workers must be greater than 0")
+        self._max_workers = max_workers
+        self._cond = threading.Condition()
+        self._queue = []
+        self._counter = itertools.count()
+        self._threads = []
+        self._idle = 0
+        self._shutdown = False
+
+        # Metrics
+        self._max_queue_depth = 0
+        self._dispatched = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def submit(self, priority: float, func: Callable, *args, **kwargs) -> Future:
+        """
+        Queues `func(*args, **kwargs)` for execution with the given
+        `priority`, returning a future with the result.
+        """
+        future = Future()
+        entry = (-priority, next(self._counter), time.time(), future, func, args, kwargs)
+        with self._cond:
+            if self._shutdown:
+                raise RuntimeError("cannot dispatch new work after shutdown")
+            heapq.heappush(self._queue, entry)
+            self._max_queue_depth = max(self._max_queue_depth, len(self._queue))
+            if (
+                len(self._queue) > self._idle
+                and len(self._threads) < self._max_workers
+            ):
+                t = threading.Thread(
+                    target=self._work,
+                    name="dispatcher-%d" % len(self._threads),
+                    daemon=True,
+                )
+                self._threads.append(t)
+                t.start()
+            self._cond.notify()
+        return future
+
+    def _work(self):
+        while True:
+            with self._cond:
+                self._idle += 1
+                while not self._queue and not self._shutdown:
+                    self._cond.wait()
+                self._idle -= 1
+                if not self._queue:
+                    return
+                _, _, queued, future, func, args, kwargs = heapq.heappop(self._queue)
+                wait = time.time() - queued
+                self._dispatched += 1
+                self._total_wait += wait
+                self._max_wait = max(self._max_wait, wait)
+
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(func(*args, **kwargs))
+            except BaseException as e:
+                future.set_exception(e)
+
+    def stats(self) -> dict:
+        """
+        Returns the current queue depth and number of busy threads, together
+        with the maximum queue depth and the wait time of the dispatched
+        callables so far.
+        """
+        with self._cond:
+            return {
+                "queue_depth": len(self._queue),
+                "max_queue_depth": self._max_queue_depth,
+                "threads": len(self._threads),
+                "busy_threads": len(self._threads) - self._idle,
+                "dispatched": self._dispatched,
+                "mean_wait": self._total_wait / max(self._dispatched, 1),
+                "max_wait": self._max_wait,
+            }
+
+    def shutdown(self):
+        """
+        Stops accepting new work. Threads finish the already queued callables
+        before exiting.
+        """
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+
+
 _SYNC_DROP_RUNNER = SyncDropRunner()
 
 
@@ -106,14 +217,27 @@ class AppDROP(ContainerDROP):
     an streaming input); for these cases see the `BarrierAppDROP`.
     """
 
+    # See AbstractDROP.__slots__
+    __slots__ = (
+        "_inputs",
+        "_outputs",
+        "_streamingInputs",
+        "_execStatus",
+        "_drop_runner",
+        "_dispatcher",
+        "_dispatch_priority",
+    )
+
     def __getstate__(self):
         state = super().__getstate__()
         del state["_drop_runner"]
+        del state["_dispatcher"]
         return state
 
     def __setstate__(self, state):
         super().__setstate__(state)
         self._drop_runner = _SYNC_DROP_RUNNER
+        self._dispatcher = None
 
     def initialize(self, **kwargs):
         super(AppDROP, self).initialize(**kwargs)
@@ -125,13 +249,13 @@ class AppDROP(ContainerDROP):
         #
         # Input and output objects are later referenced by their *index*
         # (relative to the order in which they were added to this object)
-        # Therefore we use an ordered dict to keep the insertion order.
-        self._inputs = OrderedDict()
-        self._outputs = OrderedDict()
+        # Therefore we rely on dictionaries keeping the insertion order.
+        self._inputs = {}
+        self._outputs = {}
 
         # Same as above, only that these correspond to the 'streaming' version
         # of the consumers
-        self._streamingInputs = OrderedDict()
+        self._streamingInputs = {}
 
         # An AppDROP has a second, separate state machine indicating its
         # execution status.
@@ -140,6 +264,12 @@ class AppDROP(ContainerDROP):
         # by default run drops synchronously
         self._drop_runner: DropRunner = _SYNC_DROP_RUNNER
 
+        # Apps that become ready to run are queued in this dispatcher if set
+        # (otherwise each one gets a new thread), those with a higher priority
+        # going first
+        self._dispatcher: ReadyQueueDispatcher = None
+        self._dispatch_priority = 0
+
     @track_current_drop
     def addInput(self, inputDrop, back=True):
         uid = inputDrop.uid
@@ -446,10 +576,13 @@ class InputFiredAppDROP(AppDROP):
                 self.async_execute()
 
     def async_execute(self):
-        # TODO Do we need another thread pool for this?
         # Careful, trying to run this on the same threadpool as the
         # DropRunner can cause deadlocks
-        return run_on_daemon_thread(self._execute_and_log_exception)
+        if self._dispatcher is None:
+            return run_on_daemon_thread(self._execute_and_log_exception)
+        return self._dispatcher.submit(
+            self._dispatch_priority, self._execute_and_log_exception
+        )
 
     def _execute_and_log_exception(self):
         try:
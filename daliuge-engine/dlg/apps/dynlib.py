@@ -108,6 +108,9 @@ def _to_c_input(i):
 
     def _read(desc_, buf, n):
         x = input_read(desc_, n)
+        if isinstance(x, memoryview):
+            # memmove only takes bytes-like objects it can get an address for
+            x = x.tobytes()
         ctypes.memmove(buf, x, len(x))
         return len(x)
 
@@ -25,6 +25,7 @@ import ast
 import base64
 import collections
 from enum import Enum
+import hashlib
 import importlib
 import inspect
 import json
@@ -141,6 +142,38 @@ def import_using_code(code):
     return dill.loads(code)
 
 
+# Functions resolved so far by this process, keyed by their func_key. Worker
+# processes are long-lived, so apps running the same function in them only
+# import or unpickle it the first time
+_FUNC_CACHE = {}
+
+
+def func_key(func_name, func_code=None):
+    """
+    Returns the key identifying the function of a PyFuncApp, which is given
+    either by name or by (serialised) code
+    """
+    if func_code:
+        return "code:" + hashlib.sha1(func_code).hexdigest()
+    return "name:" + func_name
+
+
+def resolve_func(app, func_name, func_code=None):
+    """
+    Returns the function given by `func_name` or `func_code`, importing or
+    unpickling it only if it's not found in this process' cache
+    """
+    key = func_key(func_name, func_code)
+    f = _FUNC_CACHE.get(key)
+    if f is None:
+        if func_code:
+            f = import_using_code(func_code)
+        else:
+            f = import_using_name(app, func_name)
+        _FUNC_CACHE[key] = f
+    return f
+
+
 ##
 # @brief PythonMemberFunction
 # @details A placeholder APP to aid construction of new class member function applications.
@@ -494,13 +527,26 @@ class PyFuncApp(BarrierAppDROP):
             )
         return portargs
 
+    def __getstate__(self):
+        state = super().__getstate__()
+        # The function is resolved again when unpickling, usually straight
+        # from the cache of the receiving process
+        state.pop("f", None)
+        return state
+
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        if "func_key" in state:
+            self.f = resolve_func(self, self.func_name, self.func_code)
+
     def initialize_with_func_code(self):
         """
         This function takes over if code is passed in through an argument.
         """
         if not isinstance(self.func_code, bytes):
             self.func_code = base64.b64decode(self.func_code.encode("utf8"))
-        self.f = import_using_code(self.func_code)
+        self.func_key = func_key(self.func_name, self.func_code)
+        self.f = resolve_func(self, self.func_name, self.func_code)
         self._init_fn_defaults()
         # make sure defaults are dicts
         self._mixin_func_defaults()
@@ -551,7 +597,8 @@ class PyFuncApp(BarrierAppDROP):
 
         # Lookup function or import bytecode as a function
         if not self.func_code:
-            self.f = import_using_name(self, self.func_name)
+            self.func_key = func_key(self.func_name)
+            self.f = resolve_func(self, self.func_name)
             self._init_fn_defaults()
         else:
             self.initialize_with_func_code()
@@ -20,11 +20,14 @@
 #    MA 02111-1307  USA
 #
 from abc import abstractmethod, abstractproperty
+import mmap
 import random
 import os
 import logging
+import weakref
 from typing import Union
 
+from dlg.common.reproducibility.constants import HashingAlg, ReproducibilityFlags
 from dlg.ddap_protocol import DROPStates
 
 from dlg.drop import AbstractDROP, track_current_drop
@@ -52,6 +55,32 @@ except:
 
 logger = logging.getLogger(__name__)
 
+# Reproducibility levels whose data includes the hash of a DROP's contents
+_DATA_HASH_RMODES = (
+    ReproducibilityFlags.REPRODUCE,
+    ReproducibilityFlags.REPLICATE_SCI,
+    ReproducibilityFlags.REPLICATE_COMP,
+    ReproducibilityFlags.REPLICATE_TOTAL,
+    ReproducibilityFlags.ALL,
+)
+
+
+def stream_hash(io: DataIO, chunk_size=65536) -> str:
+    """
+    Computes the reproducibility hash of the data behind `io`, reading it
+    chunk by chunk so it never needs to be fully loaded into memory.
+    """
+    data_hash = HashingAlg()
+    io.open(OpenMode.OPEN_READ)
+    try:
+        data = io.read(chunk_size)
+        while data:
+            data_hash.update(data)
+            data = io.read(chunk_size)
+    finally:
+        io.close()
+    return data_hash.hexdigest()
+
 
 ##
 # @brief Data
@@ -82,6 +111,17 @@ class DataDROP(AbstractDROP):
     parsed by function `IOForURL`.
     """
 
+    # Whether the reproducibility data of this DROP includes the hash of its
+    # contents, see `dataHash`
+    _reproduceDataHash = False
+
+    def __getstate__(self):
+        state = super().__getstate__()
+        # Hashing objects cannot be pickled, the hash is computed again from
+        # the stored data if needed
+        state["_dataHash"] = None
+        return state
+
     def incrRefCount(self):
         """
         Increments the reference count of this DROP by one atomically.
@@ -96,6 +136,15 @@ class DataDROP(AbstractDROP):
         with self._refLock:
             self._refCount -= 1
 
+    def incrRefCountWhileAlive(self, obj):
+        """
+        Increments the reference count of this DROP by one, and decrements it
+        again once `obj` is garbage collected. This is used to keep DROPs
+        counted as being read while there are memory mappings of their data.
+        """
+        self.incrRefCount()
+        weakref.finalize(obj, self.decrRefCount)
+
     @track_current_drop
     def open(self, **kwargs):
         """
@@ -165,6 +214,40 @@ class DataDROP(AbstractDROP):
         io = self._rios[descriptor]
         return io.read(count, **kwargs)
 
+    @track_current_drop
+    def buffer(self) -> Union[memoryview, bytes]:
+        """
+        Returns an object supporting the buffer protocol with the whole
+        contents of this DROP. Whenever the underlying storage allows it this
+        is a zero-copy, read-only view of the data (e.g., for in-memory DROPs);
+        otherwise the data is read in full into a new buffer.
+        """
+        if self.status != DROPStates.COMPLETED:
+            raise Exception(
+                "%r is in state %s (!=COMPLETED), cannot be read" % (self, self.status)
+            )
+
+        io = self.getIO()
+        io.open(OpenMode.OPEN_READ)
+        try:
+            buf = io.buffer()
+            if buf is None:
+                chunks = []
+                data = io.read(65536)
+                while data:
+                    chunks.append(data)
+                    data = io.read(65536)
+                buf = b"".join(chunks)
+        finally:
+            io.close()
+
+        # Mapped data is being read until the mapping goes away
+        if isinstance(buf, memoryview) and isinstance(buf.obj, mmap.mmap):
+            self.incrRefCountWhileAlive(buf.obj)
+
+        self._fire("open")
+        return buf
+
     def _checkStateAndDescriptor(self, descriptor):
         if self.status != DROPStates.COMPLETED:
             raise Exception(
@@ -210,6 +293,8 @@ class DataDROP(AbstractDROP):
             except:
                 self.status = DROPStates.ERROR
                 raise Exception("Problem opening drop for write!")
+            if not self._size and self._needsDataHash():
+                self._dataHash = HashingAlg()
         nbytes = self._wio.write(data)
         nbytes = 0 if nbytes is None else nbytes
 
@@ -236,6 +321,8 @@ class DataDROP(AbstractDROP):
         # Update our internal checksum
         if not checksum_disabled:
             self._updateChecksum(data)
+        if self._dataHash is not None:
+            self._dataHash.update(data)
 
         # If we know how much data we'll receive, keep track of it and
         # automatically switch to COMPLETED
@@ -331,6 +418,27 @@ class DataDROP(AbstractDROP):
             )
         self._checksumType = value
 
+    def _needsDataHash(self):
+        return self._reproduceDataHash and self._reproducibility in _DATA_HASH_RMODES
+
+    @property
+    def dataHash(self) -> str:
+        """
+        The hash of the data represented by this DROP used in its
+        reproducibility data. Like the checksum, it is built up while the data
+        is written through this DROP; if the data has been externally written
+        it is computed by streaming the stored data once.
+        """
+        if self._dataHash is not None:
+            return self._dataHash.hexdigest()
+        if self._dataDigest is None:
+            try:
+                self._dataDigest = stream_hash(self.getIO())
+            except Exception:
+                logger.debug("Could not read data of %r to hash it", self)
+                self._dataDigest = HashingAlg().hexdigest()
+        return self._dataDigest
+
     @abstractmethod
     def getIO(self) -> DataIO:
         """
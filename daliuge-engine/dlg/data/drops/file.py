@@ -23,9 +23,14 @@ import errno
 import os
 import re
 
-from dlg.common.reproducibility.reproducibility import common_hash
 from dlg.ddap_protocol import DROPStates
-from .data_base import DataDROP, PathBasedDrop, logger, track_current_drop
+from .data_base import (
+    DataDROP,
+    PathBasedDrop,
+    logger,
+    stream_hash,
+    track_current_drop,
+)
 from dlg.exceptions import InvalidDropException
 from dlg.data.io import FileIO
 from dlg.meta import dlg_bool_param
@@ -41,6 +46,7 @@ from typing import Union
 # @param tag daliuge
 # @param filepath /String/ApplicationArgument/NoPort/ReadWrite//False/False/"File path for this file. In many cases this does not need to be specified. If it has a \/ at the end it will be treated as a directory name and the filename will be generated. If it does not have a \/, the last part will be treated as a filename. If filepath does not start with \/ (relative path) then the session directory will be prepended to make the path absolute.""
 # @param check_filepath_exists False/Boolean/ComponentParameter/NoPort/ReadWrite//False/False/Perform a check to make sure the file path exists before proceeding with the application
+# @param use_mmap False/Boolean/ComponentParameter/NoPort/ReadWrite//False/False/Memory-map the file when its whole contents are accessed by readers instead of loading it into memory
 # @param dropclass dlg.data.drops.file.FileDROP/String/ComponentParameter/NoPort/ReadWrite//False/False/Drop class
 # @param streaming False/Boolean/ComponentParameter/NoPort/ReadWrite//False/False/Specifies whether this data component streams input and output data
 # @param persist True/Boolean/ComponentParameter/NoPort/ReadWrite//False/False/Specifies whether this data component contains data that should not be deleted after execution
@@ -68,6 +74,8 @@ class FileDROP(DataDROP, PathBasedDrop):
 
     delete_parent_directory = dlg_bool_param("delete_parent_directory", False)
     check_filepath_exists = dlg_bool_param("check_filepath_exists", False)
+    use_mmap = dlg_bool_param("use_mmap", False)
+    _reproduceDataHash = True
     # is_dir = dlg_bool_param("is_dir", False)
 
     # Make sure files are not deleted by default and certainly not if they are
@@ -158,7 +166,7 @@ class FileDROP(DataDROP, PathBasedDrop):
         self._wio = None
 
     def getIO(self):
-        return FileIO(self._path)
+        return FileIO(self._path, use_mmap=self.use_mmap)
 
     def delete(self):
         super().delete()
@@ -215,6 +223,21 @@ class FileDROP(DataDROP, PathBasedDrop):
             self._size = 0
         # Signal our subscribers that the show is over
         self._fire("dropCompleted", status=DROPStates.COMPLETED)
+
+        # Externally written files need to be read back to hash their contents;
+        # when possible do so in the drop runner pool instead of in this thread
+        drop_runner = getattr(self, "_drop_runner", None)
+        if self._dataHash is None and self._needsDataHash() and drop_runner:
+            future = drop_runner.submit(stream_hash, self.getIO())
+            future.add_done_callback(self._hashed)
+        else:
+            self.completedrop()
+
+    def _hashed(self, future):
+        try:
+            self._dataDigest = future.result()
+        except Exception:
+            logger.exception("Error while hashing the contents of %r", self)
         self.completedrop()
 
     @property
@@ -224,10 +247,4 @@ class FileDROP(DataDROP, PathBasedDrop):
 
     # Override
     def generate_reproduce_data(self):
-        from dlg.droputils import allDropContents
-
-        try:
-            data = allDropContents(self, self.size)
-        except Exception:
-            data = b""
-        return {"data_hash": common_hash(data)}
+        return {"data_hash": self.dataHash}
@@ -28,7 +28,7 @@ import random
 import string
 import sys
 
-from dlg.common.reproducibility.reproducibility import common_hash
+from dlg.ddap_protocol import DROPStates
 from dlg.data.drops.data_base import DataDROP, logger
 from dlg.data.io import SharedMemoryIO, MemoryIO
 
@@ -97,6 +97,8 @@ class InMemoryDROP(DataDROP):
     A DROP that points data stored in memory.
     """
 
+    _reproduceDataHash = True
+
     # Allow in-memory drops to be automatically removed by default
     def __init__(self, *args, **kwargs):
         if "persist" not in kwargs:
@@ -134,31 +136,69 @@ class InMemoryDROP(DataDROP):
         self._buf = io.BytesIO(*args)
         self.size = len(pydata) if pydata else 0
 
+    # Set when the data of this DROP has been spilled to another DROP
+    _spillDrop = None
+
     def getIO(self):
-        if (
-            hasattr(self, "_tp")
-            and hasattr(self, "_sessionId")
-            and sys.version_info >= (3, 8)
-        ):
+        if self._spillDrop is not None:
+            return self._spillDrop.getIO()
+        if self._usesSharedMemory():
             return SharedMemoryIO(self.oid, self._sessionId)
         else:
             return MemoryIO(self._buf)
 
+    def _usesSharedMemory(self):
+        return (
+            hasattr(self, "_tp")
+            and hasattr(self, "_sessionId")
+            and sys.version_info >= (3, 8)
+        )
+
+    @property
+    def spilled(self) -> bool:
+        """Whether the data of this DROP has been spilled out of memory"""
+        return self._spillDrop is not None
+
+    @property
+    def spillable(self) -> bool:
+        """Whether the data of this DROP can be spilled out of memory"""
+        return (
+            self._spillDrop is None
+            and not self._usesSharedMemory()
+            and self.status == DROPStates.COMPLETED
+        )
+
+    def spill(self, drop) -> bool:
+        """
+        Makes `drop`, a COMPLETED DROP holding a copy of the data of this DROP
+        (e.g., a FileDROP), the storage backing this DROP, and releases the
+        memory used by this DROP's data. Spilling is transparent to readers,
+        although readers that already opened this DROP keep reading from
+        memory. Returns `False` if the DROP is currently being read, in which
+        case nothing is done.
+        """
+        if not self.spillable:
+            raise Exception("%r cannot be spilled" % (self,))
+        if drop.status != DROPStates.COMPLETED:
+            raise Exception("%r not in COMPLETED state" % (drop,))
+        with self._refLock:
+            if self._refCount > 0:
+                return False
+            self._spillDrop = drop
+            self._buf = None
+        logger.debug("Spilled %r to %r", self, drop)
+        return True
+
     @property
     def dataURL(self) -> str:
+        if self._spillDrop is not None:
+            return self._spillDrop.dataURL
         hostname = os.uname()[1]
         return "mem://%s/%d/%d" % (hostname, os.getpid(), id(self._buf))
 
     # Override
     def generate_reproduce_data(self):
-        from dlg.droputils import allDropContents
-
-        data = b""
-        try:
-            data = allDropContents(self, self.size)
-        except Exception:
-            logger.debug("Could not read drop reproduce data")
-        return {"data_hash": common_hash(data)}
+        return {"data_hash": self.dataHash}
 
 
 ##
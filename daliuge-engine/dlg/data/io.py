@@ -25,6 +25,7 @@ from multiprocessing.sharedctypes import Value
 from overrides import overrides
 import io
 import logging
+import mmap
 import os
 import sys
 import urllib.parse
@@ -240,21 +241,25 @@ class ErrorIO(DataIO):
 class MemoryIO(DataIO):
     """
     A DataIO class that reads/write from/into the BytesIO object given at
-    construction time
+    construction time.
+
+    Reading doesn't copy the whole buffer: `read` returns copies of only the
+    requested bytes, and `buffer` a zero-copy, read-only view of the data.
     """
 
-    _desc: io.BytesIO  # TODO: This might actually be a problem
+    _desc: Union[io.BytesIO, memoryview]
 
     def __init__(self, buf: io.BytesIO, **kwargs):
         super().__init__()
         self._buf = buf
+        self._pos = 0
 
     def _open(self, **kwargs):
         if self._mode == OpenMode.OPEN_WRITE:
             return self._buf
         elif self._mode == OpenMode.OPEN_READ:
-            # TODO: potentially wasteful copy
-            return io.BytesIO(self._buf.getbuffer())
+            self._pos = 0
+            return self._buf.getbuffer().toreadonly()
         else:
             raise ValueError()
 
@@ -265,12 +270,15 @@ class MemoryIO(DataIO):
 
     @overrides
     def _read(self, count=65536, **kwargs):
-        return self._desc.read(count)
+        start = self._pos
+        end = len(self._desc) if count < 0 else min(start + count, len(self._desc))
+        self._pos = end
+        return self._desc[start:end].tobytes()
 
     @overrides
     def _close(self, **kwargs):
         if self._mode == OpenMode.OPEN_READ:
-            self._desc.close()
+            self._desc.release()
         # If we're writing we don't close the descriptor because it's our
         # self._buf, which won't be readable afterwards
 
@@ -287,12 +295,16 @@ class MemoryIO(DataIO):
 
     @overrides
     def delete(self):
-        self._buf.close()
+        try:
+            self._buf.close()
+        except BufferError:
+            # Zero-copy readers still hold views of our data, which will be
+            # freed when the last of them is released
+            logger.debug("Memory buffer still referenced by readers, not closing")
 
     @overrides
     def buffer(self) -> memoryview:
-        # TODO: This may also be an issue
-        return self._buf.getbuffer()
+        return self._buf.getbuffer().toreadonly()
 
 
 class SharedMemoryIO(DataIO):
@@ -311,24 +323,16 @@ class SharedMemoryIO(DataIO):
     def _open(self, **kwargs):
         self._pos = 0
         if self._buf is None:
+            self._buf = DlgSharedMemory(self._name)
             if self._mode == OpenMode.OPEN_WRITE:
                 self._written = 0
-            self._buf = DlgSharedMemory(self._name)
+                self._buf.truncate(0)
         return self._buf
 
     @overrides
     def _write(self, data, **kwargs) -> int:
-        total_size = len(data) + self._written
-        if total_size > self._buf.size:
-            self._buf.resize(total_size)
-            self._buf.buf[self._written : total_size] = data
-            self._written = total_size
-        else:
-            self._buf.buf[self._written : total_size] = data
-            self._written = total_size
-            self._buf.resize(total_size)
-            # It may be inefficient to resize many times, but assuming data is written 'once' this is
-            # might be tolerable and guarantees that the size of the underlying buffer is tight.
+        # Capacity grows geometrically, the block is trimmed to its final size on close
+        self._written += self._buf.append(data)
         return len(data)
 
     @overrides
@@ -345,6 +349,7 @@ class SharedMemoryIO(DataIO):
     @overrides
     def _close(self, **kwargs):
         if self._mode == OpenMode.OPEN_WRITE:
+            # Also for empty rewrites, readers take the size from the block
             self._buf.resize(self._written)
         self._buf.close()
         self._buf = None
@@ -357,6 +362,11 @@ class SharedMemoryIO(DataIO):
     def exists(self) -> bool:
         return self._buf is not None
 
+    @overrides
+    def buffer(self) -> memoryview:
+        # The mapping outlives our _close() for as long as this view is alive
+        return self._buf.buf[: self._buf.size].toreadonly()
+
     @overrides
     def delete(self):
         self._close()
@@ -364,14 +374,25 @@ class SharedMemoryIO(DataIO):
 
 class FileIO(DataIO):
     """
-    A file-based implementation of DataIO
+    A file-based implementation of DataIO.
+
+    `buffer` reads the file in full into a new, writable bytearray. If
+    `use_mmap` is set it returns a read-only memoryview over a memory mapping
+    of the file instead, allowing readers to work on files larger than the
+    available memory.
     """
 
     _desc: io.BufferedRWPair
 
-    def __init__(self, filename, **kwargs):
+    def __init__(self, filename, use_mmap=False, **kwargs):
         super().__init__()
         self._fnm = filename
+        self._use_mmap = use_mmap
+        self._mmap = None
+
+    @property
+    def use_mmap(self) -> bool:
+        return self._use_mmap
 
     def _open(self, **kwargs) -> io.BufferedRWPair:
         flag = "r" if self._mode is OpenMode.OPEN_READ else "w"
@@ -389,6 +410,13 @@ class FileIO(DataIO):
 
     @overrides
     def _close(self, **kwargs):
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Views handed out by buffer() keep the mapping alive
+                pass
+            self._mmap = None
         self._desc.close()
 
     @overrides
@@ -410,8 +438,18 @@ class FileIO(DataIO):
         os.unlink(self._fnm)
 
     @overrides
-    def buffer(self) -> bytes:
-        return self._desc.read(-1)
+    def buffer(self) -> Union[bytearray, bytes, memoryview]:
+        size = os.fstat(self._desc.fileno()).st_size
+        if not self._use_mmap:
+            buf = bytearray(size)
+            del buf[self._desc.readinto(buf) :]
+            return buf
+        if size == 0:
+            # Empty files cannot be mapped
+            return b""
+        if self._mmap is None:
+            self._mmap = mmap.mmap(self._desc.fileno(), 0, access=mmap.ACCESS_READ)
+        return memoryview(self._mmap)
 
 
 class NgasIO(DataIO):
@@ -40,11 +40,21 @@ class _StatusDumper(BaseDROPManagerClient):
     def __init__(self, *args, **kwargs):
         self.dump_path = kwargs.pop("dump_path")
         super(_StatusDumper, self).__init__(*args, **kwargs)
+        # session_id -> (version, graph status)
+        self._graph_status = {}
+
+    def _current_graph_status(self, session_id):
+        # Only the changes since the last poll are requested
+        version, graph_status = self._graph_status.get(session_id, (None, {}))
+        changes = self.graph_status_changes(session_id, since=version)
+        graph_status.update(changes["changes"])
+        self._graph_status[session_id] = (changes["version"], graph_status)
+        return graph_status
 
     def _dump_session_status(self, session_id):
         wgs = {
             "ssid": session_id,
-            "gs": self.graph_status(session_id),
+            "gs": self._current_graph_status(session_id),
             "ts": "%.3f" % time.time(),
         }
         with open(self.dump_path, "a") as fs:
@@ -62,6 +72,11 @@ class _StatusDumper(BaseDROPManagerClient):
         self._dump_session_status(session_id)
         return session
 
+    def session_status(self, session_id):
+        status = super(_StatusDumper, self).session_status(session_id)
+        self._dump_session_status(session_id)
+        return status
+
 
 def _is_end_state(session_status):
     return session_status in (SessionStates.FINISHED, SessionStates.CANCELLED)
@@ -112,7 +127,8 @@ def monitor_sessions(
     client = _get_client(host, port, timeout, status_dump_path)
     if session_id:
         while True:
-            session = client.session(session_id)
+            # Only the status is needed, not the whole session graph
+            session = {"status": client.session_status(session_id)}
             if _session_finished(session):
                 return _session_status(session)
             time.sleep(poll_interval)
@@ -23,13 +23,13 @@
 Module containing the core DROP classes.
 """
 import ast
-import inspect
 import logging
 import os
 import threading
 import time
 import re
 import sys
+import types
 from abc import ABCMeta
 
 from dlg.common.reproducibility.constants import (
@@ -49,7 +49,7 @@ from .ddap_protocol import (
     DROPStates,
     DROPRel,
 )
-from dlg.event import EventFirer, EventHandler
+from dlg.event import Event, EventFirer, EventHandler
 from dlg.exceptions import InvalidDropException, InvalidRelationshipException
 
 DEFAULT_INTERNAL_PARAMETERS = {
@@ -106,6 +106,8 @@ logger = logging.getLogger(__name__)
 class ListAsDict(list):
     """A list that adds drop UIDs to a set as they get appended to the list"""
 
+    __slots__ = ("set",)
+
     def __init__(self, my_set):
         self.set = my_set
 
@@ -116,6 +118,30 @@ class ListAsDict(list):
 
 track_current_drop = object_tracking("drop")
 
+# Placeholders for the relationship containers of a DROP until a first DROP
+# is added to them, since most DROPs have no producers, consumers or
+# streaming consumers at all in one or more of them
+_NO_DROPS = ()
+_NO_UIDS = frozenset()
+
+# DROPs protect their short, non-nested critical sections with locks taken
+# from this pool (based on their UID) instead of allocating their own
+_DROP_LOCKS = tuple(threading.RLock() for _ in range(1024))
+
+# The parameters of DROPs that were created without any
+_NO_PARAMETERS = types.MappingProxyType({})
+
+# Class attributes of these types are turned into instance attributes
+_DLG_PARAM_TYPES = (
+    dlg_float_param,
+    dlg_bool_param,
+    dlg_int_param,
+    dlg_string_param,
+    dlg_enum_param,
+    dlg_list_param,
+    dlg_dict_param,
+)
+
 
 # ===============================================================================
 # DROP classes follow
@@ -168,27 +194,93 @@ class AbstractDROP(EventFirer, EventHandler):
     _env_var_matcher = re.compile(r"\$[A-z|\d]+\..+")
     _dlg_var_matcher = re.compile(r"\$DLG_.+")
 
-    _known_locks = ("_finishedProducersLock", "_refLock")
-    _known_rlocks = ("_statusLock",)
+    # The core attributes of all DROPs are kept in slots rather than in the
+    # instance's __dict__, which keeps the memory footprint of each DROP low
+    __slots__ = (
+        "_oid",
+        "_uid",
+        "_type",
+        "_dlg_session_id",
+        "name",
+        "lg_key",
+        "_consumers_uids",
+        "_consumers",
+        "_producers_uids",
+        "_producers",
+        "_finishedProducers",
+        "_streamingConsumers_uids",
+        "_streamingConsumers",
+        "_refCount",
+        "_location",
+        "_parent",
+        "_status",
+        "_phase",
+        "_targetPhase",
+        "_checksum",
+        "_checksumType",
+        "_size",
+        "_committed",
+        "_merkleRoot",
+        "_merkleTree",
+        "_merkleData",
+        "_reproducibility",
+        "_dataHash",
+        "_dataDigest",
+        "_wio",
+        "_rios",
+        "_executionMode",
+        "_node",
+        "_dataIsland",
+        "_expireAfterUse",
+        "_expirationDate",
+        "_expectedSize",
+        "_persist",
+        "_parameters",
+    )
+
+    _slots_cache = {}
+
+    @classmethod
+    def _slot_names(cls):
+        if cls not in AbstractDROP._slots_cache:
+            AbstractDROP._slots_cache[cls] = tuple(
+                name
+                for c in cls.__mro__
+                for name in getattr(c, "__slots__", ())
+                if name not in ("__dict__", "__weakref__")
+            )
+        return AbstractDROP._slots_cache[cls]
 
     def __getstate__(self):
-        state = self.__dict__.copy()
-        for attr_name in AbstractDROP._known_locks + AbstractDROP._known_rlocks:
-            del state[attr_name]
+        state = {
+            name: getattr(self, name)
+            for name in self._slot_names()
+            if hasattr(self, name)
+        }
+        state.update(self.__dict__)
         del state["_listeners"]
+        del state["_listenerTable"]
         return state
 
     def __setstate__(self, state):
-        for attr_name in AbstractDROP._known_locks:
-            state[attr_name] = threading.Lock()
-        for attr_name in AbstractDROP._known_rlocks:
-            state[attr_name] = threading.RLock()
-
-        self.__dict__.update(state)
+        slots = self._slot_names()
+        for name, value in state.items():
+            if name in slots:
+                object.__setattr__(self, name, value)
+            else:
+                self.__dict__[name] = value
 
         import collections
 
         self._listeners = collections.defaultdict(list)
+        self._listenerTable = {}
+
+    # Locks are shared with other DROPs, see _DROP_LOCKS
+    @property
+    def _statusLock(self):
+        return _DROP_LOCKS[hash(self._uid) % len(_DROP_LOCKS)]
+
+    _refLock = _finishedProducersLock = _relationshipsLock = _statusLock
 
     @track_current_drop
     def __init__(self, oid, uid, **kwargs):
@@ -214,8 +306,9 @@ class AbstractDROP(EventFirer, EventHandler):
         # Copy it since we're going to modify it
         kwargs = dict(kwargs)
         # So far only these three are mandatory
-        self._oid = str(oid)
-        self._uid = str(uid)
+        # UIDs are interned since they are also used as keys elsewhere
+        self._oid = sys.intern(str(oid))
+        self._uid = sys.intern(str(uid))
 
         # The physical graph drop type. This is determined
         # by the drop category when generating the drop spec
@@ -244,16 +337,16 @@ class AbstractDROP(EventFirer, EventHandler):
         # Obviously the normal way of doing this is using a dictionary, but
         # for the time being and while testing the integration with TBU's ceda
         # library we need to expose a list.
-        self._consumers_uids = set()
-        self._consumers = ListAsDict(self._consumers_uids)
-        self._producers_uids = set()
-        self._producers = ListAsDict(self._producers_uids)
+        # The actual containers are created when the first DROP is added
+        self._consumers_uids = _NO_UIDS
+        self._consumers = _NO_DROPS
+        self._producers_uids = _NO_UIDS
+        self._producers = _NO_DROPS
 
-        # Set holding the state of the producers that have finished their
+        # List holding the state of the producers that have finished their
         # execution. Once all producers have finished, this DROP moves
         # itself to the COMPLETED state
-        self._finishedProducers = []
-        self._finishedProducersLock = threading.Lock()
+        self._finishedProducers = _NO_DROPS
 
         # Streaming consumers are objects that consume the data written in
         # this DROP *as it gets written*, and therefore don't have to
@@ -264,15 +357,13 @@ class AbstractDROP(EventFirer, EventHandler):
         # not because it's technically impossible.
         # See comment above in self._consumers/self._producers for separate set
         # with uids
-        self._streamingConsumers_uids = set()
-        self._streamingConsumers = ListAsDict(self._streamingConsumers_uids)
+        self._streamingConsumers_uids = _NO_UIDS
+        self._streamingConsumers = _NO_DROPS
 
         self._refCount = 0
-        self._refLock = threading.Lock()
         self._location = None
         self._parent = None
         self._status = None
-        self._statusLock = threading.RLock()
 
         # Current and target phases.
         # Phases represent the resiliency of data. An initial phase of PLASMA
@@ -303,6 +394,12 @@ class AbstractDROP(EventFirer, EventHandler):
         self._merkleData = []
         self._reproducibility = REPRO_DEFAULT
 
+        # Data hashes used by the reproducibility data of some DataDROPs.
+        # Like the checksum, the hash is built up as data is written through
+        # the DROP, and only computed from the stored data otherwise
+        self._dataHash = None
+        self._dataDigest = None
+
         # The DataIO instance we use in our write method. It's initialized to
         # None because it's lazily initialized in the write method, since data
         # might be written externally and not through this DROP
@@ -372,9 +469,11 @@ class AbstractDROP(EventFirer, EventHandler):
             self._expireAfterUse = False
 
         # Useful to have access to all EAGLE parameters without a prior knowledge
-        self._parameters = dict(kwargs)
+        # kwargs is our own copy already, and DROPs without parameters share
+        # an empty default (see the parameters property)
+        if kwargs:
+            self._parameters = kwargs
         self.autofill_environment_variables()
-        kwargs.update(self._parameters)
         # Sub-class initialization; mark ourselves as INITIALIZED after that
         self.initialize(**kwargs)
         self._status = (
@@ -384,13 +483,16 @@ class AbstractDROP(EventFirer, EventHandler):
     _members_cache = {}
 
     def _get_members(self):
+        """
+        Returns the dlg parameters declared by this DROP's class and its bases
+        """
         cls = self.__class__
         if cls not in AbstractDROP._members_cache:
             members = [
                 (name, val)
                 for c in cls.__mro__[:-1]
                 for name, val in vars(c).items()
-                if not (inspect.isfunction(val) or isinstance(val, property))
+                if isinstance(val, _DLG_PARAM_TYPES)
             ]
             # logger.info("GOT MEMBEEEERS: %r", members)
 
@@ -487,7 +589,7 @@ class AbstractDROP(EventFirer, EventHandler):
         Pops the specified key arg from kwargs else returns the default
         """
         if key not in kwargs:
-            logger.debug("Defaulting %s to %s in %r", key, str(default), self)
+            logger.debug("Defaulting %s to %s in %r", key, default, self)
         return kwargs.pop(key, default)
 
     def __hash__(self):
@@ -780,12 +882,21 @@ class AbstractDROP(EventFirer, EventHandler):
         the event being sent. On top of that, the `uid` and `oid` attributes are
         also added, carrying the uid and oid of the current DROP, respectively.
         """
-        kwargs["oid"] = self.oid
-        kwargs["uid"] = self.uid
-        kwargs["session_id"] = self._dlg_session_id
-        kwargs["name"] = self.name
-        kwargs["lg_key"] = self.lg_key
-        self._fireEvent(eventType, **kwargs)
+        listeners = self._listenersFor(eventType)
+        if not listeners:
+            return
+
+        e = Event(eventType)
+        for k, v in kwargs.items():
+            setattr(e, k, v)
+        e.oid = self._oid
+        e.uid = self._uid
+        e.session_id = self._dlg_session_id
+        e.name = self.name
+        e.lg_key = self.lg_key
+
+        for l in listeners:
+            l.handleEvent(e)
 
     @property
     def phase(self):
@@ -886,6 +997,22 @@ class AbstractDROP(EventFirer, EventHandler):
                 except:
                     self._parent = prevParent
 
+    def _addRelated(self, name, drop):
+        """
+        Adds `drop` to the relationship container called `name` (e.g.,
+        `_consumers`), creating the container first if needed.
+        """
+        related = getattr(self, name)
+        if not isinstance(related, ListAsDict):
+            with self._relationshipsLock:
+                related = getattr(self, name)
+                if not isinstance(related, ListAsDict):
+                    uids = set()
+                    related = ListAsDict(uids)
+                    setattr(self, name + "_uids", uids)
+                    setattr(self, name, related)
+        related.append(drop)
+
     def get_consumers_nodes(self):
         """
         Gets the physical node address(s) of the consumer of this drop.
@@ -901,7 +1028,7 @@ class AbstractDROP(EventFirer, EventHandler):
 
         :see: `self.addConsumer()`
         """
-        return self._consumers[:]
+        return list(self._consumers)
 
     @track_current_drop
     def addConsumer(self, consumer, back=True):
@@ -933,7 +1060,7 @@ class AbstractDROP(EventFirer, EventHandler):
         if cuid in self._consumers_uids:
             return
         # logger.debug("Adding new consumer %r to %r", consumer.oid, self.oid)
-        self._consumers.append(consumer)
+        self._addRelated("_consumers", consumer)
 
         # Subscribe the consumer to events sent when this DROP moves to
         # COMPLETED. This way the consumer will be notified that its input has
@@ -959,7 +1086,7 @@ class AbstractDROP(EventFirer, EventHandler):
 
         :see: `self.addProducer()`
         """
-        return self._producers[:]
+        return list(self._producers)
 
     @track_current_drop
     def addProducer(self, producer, back=True):
@@ -978,7 +1105,7 @@ class AbstractDROP(EventFirer, EventHandler):
         if puid in self._producers_uids:
             return
 
-        self._producers.append(producer)
+        self._addRelated("_producers", producer)
 
         # Automatic back-reference
         if back and hasattr(producer, "addOutput"):
@@ -1011,6 +1138,8 @@ class AbstractDROP(EventFirer, EventHandler):
 
         finished = False
         with self._finishedProducersLock:
+            if not self._finishedProducers:
+                self._finishedProducers = []
             self._finishedProducers.append(drop_state)
             nFinished = len(self._finishedProducers)
             nProd = len(self._producers)
@@ -1046,7 +1175,7 @@ class AbstractDROP(EventFirer, EventHandler):
 
         :see: `self.addStreamingConsumer()`
         """
-        return self._streamingConsumers[:]
+        return list(self._streamingConsumers)
 
     @track_current_drop
     def addStreamingConsumer(self, streamingConsumer, back=True):
@@ -1075,7 +1204,7 @@ class AbstractDROP(EventFirer, EventHandler):
             self,
             streamingConsumer,
         )
-        self._streamingConsumers.append(streamingConsumer)
+        self._addRelated("_streamingConsumers", streamingConsumer)
 
         # Automatic back-reference
         if back and hasattr(streamingConsumer, "addStreamingInput"):
@@ -1194,7 +1323,10 @@ class AbstractDROP(EventFirer, EventHandler):
 
     @property
     def parameters(self):
-        return self._parameters
+        try:
+            return self._parameters
+        except AttributeError:
+            return _NO_PARAMETERS
 
 
 # Dictionary mapping 1-to-many DROPLinkType constants to the corresponding methods
@@ -31,7 +31,7 @@ import re
 from typing import Any
 import numpy as np
 
-from dlg.data.io import OpenMode
+from dlg.data.io import FileIO, OpenMode
 
 from typing import TYPE_CHECKING
 
@@ -55,17 +55,11 @@ def save_pickle(drop: "DataDROP", data: Any):
 
 def load_pickle(drop: "DataDROP") -> Any:
     """Loads a pkl formatted data object stored in a DataDROP.
+    The object is deserialised straight from the DROP's buffer, which for
+    in-memory DROPs avoids any intermediate copies of the data.
     Note: does not support streaming mode.
     """
-    buf = io.BytesIO()
-    desc = drop.open()
-    while True:
-        data = drop.read(desc)
-        if not data:
-            break
-        buf.write(data)
-    drop.close(desc)
-    return pickle.loads(buf.getbuffer())
+    return pickle.loads(drop.buffer())
 
 
 def save_npy(drop: "DataDROP", ndarray: np.ndarray, allow_pickle=False):
@@ -86,14 +80,62 @@ def save_numpy(drop: "DataDROP", ndarray: np.ndarray):
     save_npy(drop, ndarray)
 
 
+def _npy_from_buffer(buf, allow_pickle=False) -> np.ndarray:
+    """
+    Creates a numpy ndarray from a buffer holding data in npy format. Whenever
+    possible the resulting array is a view over `buf` rather than a copy of its
+    contents, and is thus read-only if `buf` is.
+    """
+    view = memoryview(buf)
+    header_len_size = {1: 2, 2: 4}.get(view[6] if len(view) > 6 else None)
+    if header_len_size is None:
+        # Not something we can map directly, let numpy deal with it
+        return np.load(io.BytesIO(view), allow_pickle=allow_pickle)
+
+    data_offset = (
+        np.lib.format.MAGIC_LEN
+        + header_len_size
+        + int.from_bytes(
+            view[np.lib.format.MAGIC_LEN : np.lib.format.MAGIC_LEN + header_len_size],
+            "little",
+        )
+    )
+    header = io.BytesIO(view[:data_offset])
+    version = np.lib.format.read_magic(header)
+    if version == (1, 0):
+        shape, fortran_order, dtype = np.lib.format.read_array_header_1_0(header)
+    else:
+        shape, fortran_order, dtype = np.lib.format.read_array_header_2_0(header)
+    if dtype.hasobject:
+        # Object arrays are pickled, there's nothing to map
+        return np.load(io.BytesIO(view), allow_pickle=allow_pickle)
+
+    count = int(np.prod(shape, dtype=np.int64))
+    array = np.frombuffer(view, dtype=dtype, count=count, offset=data_offset)
+    if fortran_order:
+        return array.reshape(shape[::-1]).transpose()
+    return array.reshape(shape)
+
+
 def load_npy(drop: "DataDROP", allow_pickle=False) -> np.ndarray:
     """
-    Loads a numpy ndarray from a drop in npy format
+    Loads a numpy ndarray from a drop in npy format.
+    For DROPs that support it (e.g., in-memory DROPs) the array is a read-only
+    view of the DROP's data rather than a copy. FileDROPs with `use_mmap` set
+    are loaded as read-only arrays over a memory mapping of the file, which
+    count as the DROP being read while they (or views of them) are alive, like
+    `DataDROP.buffer`. Arrays loaded from a private
+    copy of the data (e.g., FileDROPs without `use_mmap`) are writable.
     """
     dropio = drop.getIO()
+    if isinstance(dropio, FileIO) and dropio.use_mmap:
+        return _npy_from_buffer(drop.buffer(), allow_pickle=allow_pickle)
+
     dropio.open(OpenMode.OPEN_READ)
-    res = np.load(io.BytesIO(dropio.buffer()), allow_pickle=allow_pickle)
-    dropio.close()
+    try:
+        res = _npy_from_buffer(dropio.buffer(), allow_pickle=allow_pickle)
+    finally:
+        dropio.close()
     return res
 
 
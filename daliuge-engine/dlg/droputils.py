@@ -24,7 +24,6 @@ Utility methods and classes to be used when interacting with DROPs
 """
 
 import collections
-import io
 import time
 import logging
 import re
@@ -125,16 +124,16 @@ def allDropContents(drop, bufsize=65536) -> bytes:
     """
     Returns all the data contained in a given DROP
     """
-    buf = io.BytesIO()
+    chunks = []
     desc = drop.open()
 
     while True:
         data = drop.read(desc, bufsize)
         if not data:
             break
-        buf.write(data)
+        chunks.append(data)
     drop.close(desc)
-    return buf.getvalue()
+    return b"".join(chunks)
 
 
 def copyDropContents(source: "DataDROP", target: "DataDROP", bufsize: int = 65536):
@@ -219,6 +218,29 @@ def getDownstreamObjects(drop):
     return downObjs
 
 
+def getCriticalPathLengths(drops, weight):
+    """
+    Returns a dictionary with the length of the longest path from each DROP
+    in the graph pointed by `drops` to any of its leaf nodes. `weight` is a
+    function returning the contribution of a single DROP to a path's length.
+    """
+    lengths = {}
+    toVisit = [(drop, False) for drop in listify(drops)]
+    while toVisit:
+        drop, expanded = toVisit.pop()
+        if drop.uid in lengths:
+            continue
+        downObjs = getDownstreamObjects(drop)
+        if expanded:
+            lengths[drop.uid] = weight(drop) + max(
+                (lengths.get(d.uid, 0) for d in downObjs), default=0
+            )
+        else:
+            toVisit.append((drop, True))
+            toVisit.extend((d, False) for d in downObjs if d.uid not in lengths)
+    return lengths
+
+
 def getLeafNodes(drops):
     """
     Returns a list of all the "leaf nodes" of the graph pointed by `drops`.
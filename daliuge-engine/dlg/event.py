@@ -22,8 +22,9 @@
 
 from collections import defaultdict
 import logging
+import threading
 from abc import ABC, abstractmethod
-from typing import Optional, Union
+from typing import Iterable, Optional, Tuple, Union
 
 logger = logging.getLogger(__name__)
 
@@ -36,16 +37,43 @@ class Event(object):
     of having subclasses of the `Event` class), and therefore this class makes
     sure that at least that field exists. Any other piece of information can be
     attached to individual instances of this class, depending on the event type.
+
+    The fields carried by most events are stored in slots, so events fired by
+    DROPs don't need a dictionary of attributes unless they carry extra
+    information.
     """
 
+    __slots__ = (
+        "type",
+        "oid",
+        "uid",
+        "session_id",
+        "name",
+        "lg_key",
+        "status",
+        "execStatus",
+        "__dict__",
+    )
+
     def __init__(self, type: str):
         self.type = type
 
+    def _attrs(self):
+        attrs = {
+            name: getattr(self, name)
+            for name in Event.__slots__[:-1]
+            if hasattr(self, name)
+        }
+        attrs.update(self.__dict__)
+        return attrs
+
     def __repr__(self, *args, **kwargs):
-        return "<Event %r>" % (self.__dict__)
+        return "<Event %r>" % (self._attrs())
 
 
 class EventHandler(ABC):
+    __slots__ = ()
+
     @abstractmethod
     def handleEvent(self, e: Event) -> None:
         pass
@@ -67,11 +95,16 @@ class EventFirer(object):
 
     __ALL_EVENTS = object()
 
+    __slots__ = ("_listeners", "_listenerTable")
+
     def __init__(self):
         # Union string key with object to handle __ALL_EVENTS above
         self._listeners: defaultdict[
             Union[str, object], list[EventHandler]
         ] = defaultdict(list)
+        # The listeners to call for each event type, including those
+        # subscribed to all events. Built lazily, and reset on (un)subscription
+        self._listenerTable: dict[str, tuple[EventHandler, ...]] = {}
 
     def subscribe(
         self, listener: EventHandler, eventType: Optional[str] = None
@@ -89,6 +122,7 @@ class EventFirer(object):
         # )
         eventType = eventType or EventFirer.__ALL_EVENTS
         self._listeners[eventType].append(listener)
+        self._listenerTable = {}
 
     def unsubscribe(
         self, listener: EventHandler, eventType: Optional[str] = None
@@ -106,6 +140,23 @@ class EventFirer(object):
         eventType = eventType or EventFirer.__ALL_EVENTS
         if listener in self._listeners[eventType]:
             self._listeners[eventType].remove(listener)
+            self._listenerTable = {}
+
+    def _listenersFor(self, eventType: str) -> Tuple[EventHandler, ...]:
+        """
+        Returns the listeners that should receive events of `eventType`.
+        """
+        # Subscriptions replace the table rather than modifying it, so a table
+        # built from outdated listeners is never kept
+        table = self._listenerTable
+        try:
+            return table[eventType]
+        except KeyError:
+            listeners = tuple(self._listeners.get(eventType, ())) + tuple(
+                self._listeners.get(EventFirer.__ALL_EVENTS, ())
+            )
+            table[eventType] = listeners
+            return listeners
 
     def _fireEvent(self, eventType: str, **attrs):
         """
@@ -116,11 +167,7 @@ class EventFirer(object):
         """
 
         # Which listeners should we call?
-        listeners: list[EventHandler] = []
-        if eventType in self._listeners:
-            listeners += self._listeners[eventType]
-        if EventFirer.__ALL_EVENTS in self._listeners:
-            listeners += self._listeners[EventFirer.__ALL_EVENTS]
+        listeners = self._listenersFor(eventType)
         if not listeners:
             logger.debug("No listeners found for eventType=%s", eventType)
             return
@@ -134,3 +181,72 @@ class EventFirer(object):
 
         for l in listeners:
             l.handleEvent(e)
+
+
+class CoalescingEventHandler(EventHandler):
+    """
+    An event handler that hands the events it receives down to `handler` in
+    batches, every `period` seconds, from a background thread.
+
+    Within a batch only the latest event of each of the `coalesced` types is
+    kept for each DROP, so intermediate status changes are not seen by
+    `handler`. This is meant for listeners that don't need to react to every
+    event straight away, like logging, and takes them out of the path of the
+    threads firing the events.
+    """
+
+    def __init__(
+        self,
+        handler: EventHandler,
+        period: float = 0.1,
+        coalesced: Iterable[str] = ("status", "execStatus"),
+    ):
+        self._handler = handler
+        self._period = period
+        self._coalesced = frozenset(coalesced)
+        self._pending = {}
+        self._counter = 0
+        self._lock = threading.Lock()
+        self._finished = threading.Event()
+        self._thread = None
+
+    def handleEvent(self, e: Event) -> None:
+        with self._lock:
+            if e.type in self._coalesced:
+                key = (e.type, getattr(e, "uid", None))
+                # Move it to the end to keep events in firing order
+                self._pending.pop(key, None)
+            else:
+                self._counter += 1
+                key = self._counter
+            self._pending[key] = e
+
+    def flush(self):
+        """
+        Hands all pending events down to the wrapped handler.
+        """
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for e in pending.values():
+            try:
+                self._handler.handleEvent(e)
+            except Exception:
+                logger.exception("Error while handling %r", e)
+
+    def _run(self):
+        while not self._finished.wait(self._period):
+            self.flush()
+        self.flush()
+
+    def start(self):
+        self._finished.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="EventCoalescer", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._finished.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
@@ -25,8 +25,10 @@ full JSON representation.
 """
 
 import collections
+import functools
 import importlib
 import logging
+from concurrent.futures import ThreadPoolExecutor
 
 from dlg.common.reproducibility.constants import ReproducibilityFlags
 
@@ -68,10 +70,37 @@ __TOMANY = {
 # Same for above, but for n-to-1 relationships
 __TOONE = {DROPLinkType.PARENT: "parent"}
 
+# The names under which relationships appear in DROP specifications
+_TOMANY_NAMES = tuple(__TOMANY.values())
+_TOONE_NAMES = tuple(__TOONE.values())
+
 # Both also contain the reverse mapping
 __TOMANY.update({v: k for k, v in __TOMANY.items()})
 __TOONE.update({v: k for k, v in __TOONE.items()})
 
+# STORAGE_TYPES are deprecated, but here for backwards compatibility
+STORAGE_TYPES = {
+    "Memory": InMemoryDROP,
+    "SharedMemory": SharedMemoryDROP,
+    "File": FileDROP,
+    "NGAS": NgasDROP,
+    "null": NullDROP,
+    "json": JsonDROP,
+    "Plasma": PlasmaDROP,
+    "PlasmaFlight": PlasmaFlightDROP,
+    "ParameterSet": ParameterSetDROP,
+    "EnvironmentVariables": EnvironmentVarDROP,
+}
+try:
+    from .data.drops.s3_drop import S3DROP
+
+    STORAGE_TYPES["S3"] = S3DROP
+except ImportError:
+    pass
+
+# Number of DROPs created by each task when creating DROPs in parallel
+CREATION_BATCH_SIZE = 1000
+
 logger = logging.getLogger(__name__)
 
 
@@ -192,14 +221,39 @@ def loadDropSpecs(dropSpecList):
     Slices off graph-wise reproducibility data for later use
     """
 
-    # Step #1: Check the DROP specs and collect them
     dropSpecs = {}
+    referencedOids = set()
     reprodata = None
     if dropSpecList is None:
         raise InvalidGraphException("DropSpec is empty %r" % dropSpecList)
     if dropSpecList[-1].get("rmode"):
         reprodata = dropSpecList.pop()
-    for n, dropSpec in enumerate(dropSpecList):
+    loadDropSpecBatch(dropSpecList, dropSpecs, referencedOids)
+
+    logger.debug("Found %d DROP definitions", len(dropSpecs))
+
+    # All relationships must point to DROPs in the list
+    missingOids = referencedOids.difference(dropSpecs)
+    if missingOids:
+        raise KeyError(
+            "DROPs referenced but not found in the graph: %r" % (missingOids,)
+        )
+
+    # Done!
+    return dropSpecs, reprodata
+
+
+def loadDropSpecBatch(dropSpecList, dropSpecs, referencedOids, offset=0):
+    """
+    Checks the DROP definitions from `dropSpecList` and adds them to the
+    `dropSpecs` dictionary, keyed on their OIDs, in a single pass. The OIDs
+    referenced by their relationships are added to the `referencedOids` set
+    so callers loading a graph in several batches can check, once all
+    batches are loaded, that they all point to known DROPs. `offset` is the
+    position of the first DROP of the batch within the whole graph and is
+    used only for error reporting.
+    """
+    for n, dropSpec in enumerate(dropSpecList, offset):
         # "categoryType" and 'oid' are mandatory
         check_dropspec(n, dropSpec)
         dropType = dropSpec["categoryType"].lower()
@@ -208,108 +262,114 @@ def loadDropSpecs(dropSpecList):
         cf(dropSpec, dryRun=True)
         dropSpecs[dropSpec["oid"]] = dropSpec
 
-    logger.debug("Found %d DROP definitions", len(dropSpecs))
+        for rel in _TOMANY_NAMES:
+            if rel in dropSpec:
+                referencedOids.update(_getOid(oid) for oid in dropSpec[rel])
+        for rel in _TOONE_NAMES:
+            if rel in dropSpec:
+                referencedOids.add(_getOid(dropSpec[rel]))
 
-    # Step #2: check relationships
-    # TODO: shouldn't this loop be done the other way around, going through all __TOMANY
-    # and __TOONE and directly address the respective dropSpec attribute?
-    for dropSpec in dropSpecList:
-        # 1-N relationships
-        for rel in dropSpec:
-            if rel in __TOMANY:
-                # A KeyError will be raised if a oid has been specified in the
-                # relationship list but doesn't exist in the list of DROPs
-                for oid in dropSpec[rel]:
-                    oid = list(oid.keys())[0] if isinstance(oid, dict) else oid
-                    if oid in dropSpecs:
-                        dropSpecs[oid]
-                    else:
-                        raise KeyError
 
-            # N-1 relationships
-            elif rel in __TOONE:
-                port = (
-                    list(dropSpecs[rel].keys())
-                    if isinstance(dropSpecs[rel], dict)
-                    else dropSpecs[rel]
-                )
-                # See comment above
-                dropSpecs[port]
-
-    # Done!
-    return dropSpecs, reprodata
+def _getOid(rel):
+    """Returns the OID from a relationship, which can be a {oid: port} dict"""
+    return next(iter(rel)) if isinstance(rel, dict) else rel
 
 
-def createGraphFromDropSpecList(dropSpecList, session=None):
-    logger.debug("Found %d DROP definitions", len(dropSpecList))
-
-    # Step #1: create the actual DROPs
-    drops = collections.OrderedDict()
-    logger.info("Creating %d drops", len(dropSpecList))
-    for n, dropSpec in enumerate(dropSpecList):
+def _createDrops(dropSpecs, session):
+    """Creates the DROPs for the given (n, dropSpec) pairs"""
+    session_id = session.sessionId if session else ""
+    drops = []
+    for n, dropSpec in dropSpecs:
         check_dropspec(n, dropSpec)
-        #        dropType = dropSpec.pop("categoryType")
-        # backwards compatibility
         dropType = dropSpec["categoryType"]
-        # if dropType.lower() in ["application", "app"]:
-        #     dropType = "dropclass"
-        # if dropType.lower() == "data":
-        #     dropType = "dropclass"
-
         cf = __CREATION_FUNCTIONS[dropType.lower()]
-        session_id = session.sessionId if session else ""
         drop = cf(dropSpec, session_id=session_id)
         if session is not None:
             # Now using per-drop reproducibility setting.
             drop.reproducibility_level = ReproducibilityFlags(
                 int(dropSpec.get("reprodata", {}).get("rmode", "0"))
             )
-            # session.reprodata['rmode']
-        drops[drop.oid] = drop
+        drops.append(drop)
+    return drops
+
+
+def _getRelationshipMethod(drop, lhDrop, relFuncName):
+    try:
+        return getattr(drop, relFuncName)
+    except AttributeError:
+        logger.error(
+            '%r cannot be linked to %r due to missing method "%s"',
+            drop,
+            lhDrop,
+            relFuncName,
+        )
+        raise
+
+
+def createGraphFromDropSpecList(dropSpecList, session=None, max_workers=1):
+    """
+    Creates the DROPs described in `dropSpecList` and links them together,
+    returning the roots of the resulting graph. If `max_workers` is bigger
+    than one, DROPs are created in batches by that many threads; this only
+    pays off when creating DROPs involves I/O (e.g., setting up files or
+    connecting to remote storage).
+    """
+    dropSpecList = list(dropSpecList)
+    logger.debug("Found %d DROP definitions", len(dropSpecList))
+
+    # Step #1: create the actual DROPs
+    logger.info("Creating %d drops", len(dropSpecList))
+    specs = list(enumerate(dropSpecList))
+    if max_workers > 1 and len(specs) > CREATION_BATCH_SIZE:
+        batches = [
+            specs[i : i + CREATION_BATCH_SIZE]
+            for i in range(0, len(specs), CREATION_BATCH_SIZE)
+        ]
+        with ThreadPoolExecutor(max_workers) as executor:
+            created = [
+                drop
+                for batch in executor.map(
+                    lambda batch: _createDrops(batch, session), batches
+                )
+                for drop in batch
+            ]
+    else:
+        created = _createDrops(specs, session)
+    del specs
+
+    # The OID -> DROP index used to establish relationships
+    drops = {drop.oid: drop for drop in created}
 
     # Step #2: establish relationships
     logger.info("Establishing relationships between drops")
-    for dropSpec in dropSpecList:
-        # 'oid' is mandatory
-        oid = dropSpec["oid"]
-        drop = drops[oid]
+    for dropSpec, drop in zip(dropSpecList, created):
 
-        for attr in dropSpec:
-            # 1-N relationships
-            if attr in __TOMANY:
-                link = __TOMANY[attr]
-                for rel in dropSpec[attr]:
-                    oid = list(rel.keys())[0] if isinstance(rel, dict) else rel
-                    if oid in drops:
-                        lhDrop = drops[oid]
-                    else:
-                        continue
-                    relFuncName = LINKTYPE_1TON_APPEND_METHOD[link]
-                    try:
-                        relFunc = getattr(drop, relFuncName)
-                    except AttributeError:
-                        logger.error(
-                            '%r cannot be linked to %r due to missing method "%s"',
-                            drop,
-                            lhDrop,
-                            relFuncName,
-                        )
-                        raise
-                    relFunc(lhDrop)
-
-            # N-1 relationships
-            elif attr in __TOONE:
-                link = __TOONE[attr]
-                rel = dropSpec[attr]
-                rel = list(rel.keys())[0] if isinstance(rel, dict) else rel
-                lhDrop = drops[rel]
-                propName = LINKTYPE_NTO1_PROPERTY[link]
-                setattr(drop, propName, lhDrop)
+        # 1-N relationships
+        for attr in _TOMANY_NAMES:
+            if attr not in dropSpec:
+                continue
+            relFuncName = LINKTYPE_1TON_APPEND_METHOD[__TOMANY[attr]]
+            relFunc = None
+            for rel in dropSpec[attr]:
+                lhDrop = drops.get(_getOid(rel))
+                if lhDrop is None:
+                    continue
+                if relFunc is None:
+                    relFunc = _getRelationshipMethod(drop, lhDrop, relFuncName)
+                relFunc(lhDrop)
+
+        # N-1 relationships
+        for attr in _TOONE_NAMES:
+            if attr not in dropSpec:
+                continue
+            lhDrop = drops[_getOid(dropSpec[attr])]
+            propName = LINKTYPE_NTO1_PROPERTY[__TOONE[attr]]
+            setattr(drop, propName, lhDrop)
 
     # We're done! Return the roots of the graph to the caller
     logger.info("Calculating graph roots")
     roots: list[AbstractDROP] = []
-    for drop in drops.values():
+    for drop in created:
         if not droputils.getUpstreamObjects(drop):
             roots.append(drop)
     logger.info("%d graph roots found, bye-bye!", len(roots))
@@ -317,39 +377,30 @@ def createGraphFromDropSpecList(dropSpecList, session=None):
     return roots
 
 
+@functools.lru_cache(maxsize=None)
+def _loadClass(className):
+    """
+    Returns the class called `className`. Graphs usually contain many DROPs
+    of a few different classes, so each class is resolved only once.
+    """
+    parts = className.split(".")
+
+    # Support old "dfms..." package names (pre-Oct2017)
+    if parts[0] == "dfms":
+        parts[0] = "dlg"
+
+    module = importlib.import_module(".".join(parts[:-1]))
+    return getattr(module, parts[-1])
+
+
 def _createData(dropSpec, dryRun=False, session_id=None):
     oid, uid = _getIds(dropSpec)
-    kwargs = _getKwargs(dropSpec)
 
     if dropSpec["categoryType"] == "Data":
-        dataClassName = dropSpec["dropclass"]
-        parts = dataClassName.split(".")
-        module = importlib.import_module(".".join(parts[:-1]))
-        storageType = getattr(module, parts[-1])
+        storageType = _loadClass(dropSpec["dropclass"])
     else:
-        # STORAGE_TYPES are deprecated, but here for backwards compatibility
-
         # Fall back to old behaviour or to FileDROP
         # if nothing else is specified
-        STORAGE_TYPES = {
-            "Memory": InMemoryDROP,
-            "SharedMemory": SharedMemoryDROP,
-            "File": FileDROP,
-            "NGAS": NgasDROP,
-            "null": NullDROP,
-            "json": JsonDROP,
-            "Plasma": PlasmaDROP,
-            "PlasmaFlight": PlasmaFlightDROP,
-            "ParameterSet": ParameterSetDROP,
-            "EnvironmentVariables": EnvironmentVarDROP,
-        }
-
-        try:
-            from .data.drops.s3_drop import S3DROP
-
-            STORAGE_TYPES["S3"] = S3DROP
-        except ImportError:
-            pass
         if "storage" in dropSpec:
             storageType = STORAGE_TYPES[dropSpec["storage"]]
             # pass
@@ -357,6 +408,7 @@ def _createData(dropSpec, dryRun=False, session_id=None):
             storageType = FileDROP
     if dryRun:
         return
+    kwargs = _getKwargs(dropSpec)
     if "self" in kwargs:
         kwargs.pop("self")
     return storageType(oid, uid, dlg_session_id=session_id, **kwargs)
@@ -364,54 +416,39 @@ def _createData(dropSpec, dryRun=False, session_id=None):
 
 def _createContainer(dropSpec, dryRun=False, session_id=None):
     oid, uid = _getIds(dropSpec)
-    kwargs = _getKwargs(dropSpec)
 
     # if no 'container' is specified, we default to ContainerDROP
     if "dropclass" in dropSpec:
-        containerTypeName = dropSpec["dropclass"]
-        parts = containerTypeName.split(".")
-
-        # Support old "dfms..." package names (pre-Oct2017)
-        if parts[0] == "dfms":
-            parts[0] = "dlg"
-
-        module = importlib.import_module(".".join(parts[:-1]))
-        containerType = getattr(module, parts[-1])
+        containerType = _loadClass(dropSpec["dropclass"])
     else:
         containerType = ContainerDROP
 
     if dryRun:
         return
 
+    kwargs = _getKwargs(dropSpec)
     return containerType(oid, uid, dlg_session_id=session_id, **kwargs)
 
 
 def _createSocket(dropSpec, dryRun=False, session_id=None):
     oid, uid = _getIds(dropSpec)
-    kwargs = _getKwargs(dropSpec)
 
     if dryRun:
         return
+    kwargs = _getKwargs(dropSpec)
     return SocketListenerApp(oid, uid, dlg_session_id=session_id, **kwargs)
 
 
 def _createApp(dropSpec, dryRun=False, session_id=None):
     oid, uid = _getIds(dropSpec)
-    kwargs = _getKwargs(dropSpec)
 
     if "dropclass" in dropSpec:
         appName = dropSpec["dropclass"]
     elif "Application" in dropSpec:
         appName = dropSpec["Application"]
-    parts = appName.split(".")
-
-    # Support old "dfms..." package names (pre-Oct2017)
-    if parts[0] == "dfms":
-        parts[0] = "dlg"
 
     try:
-        module = importlib.import_module(".".join(parts[:-1]))
-        appType = getattr(module, parts[-1])
+        appType = _loadClass(appName)
     except (ImportError, AttributeError, ValueError):
         raise InvalidGraphException(
             "drop %s specifies non-existent application: %s" % (oid, appName)
@@ -419,22 +456,20 @@ def _createApp(dropSpec, dryRun=False, session_id=None):
 
     if dryRun:
         return
+    kwargs = _getKwargs(dropSpec)
     return appType(oid, uid, dlg_session_id=session_id, **kwargs)
 
 
 def _getIds(dropSpec):
     # uid is copied from oid if not explicitly given
     oid = dropSpec["oid"]
-    uid = oid
-    if "uid" in dropSpec:
-        uid = dropSpec["uid"]
+    uid = dropSpec.get("uid", oid)
     return oid, uid
 
 
-def _getKwargs(dropSpec):
-    kwargs = dict(dropSpec)
-
-    REMOVE = [
+# Specification keys that are not passed down to DROPs
+_REMOVED_KWARGS = frozenset(
+    (
         "oid",
         "uid",
         "Application",
@@ -443,18 +478,21 @@ def _getKwargs(dropSpec):
         "dataclass",
         "data",
         "Data",
-    ]
-    for kw in REMOVE:
-        if kw in kwargs:
-            del kwargs[kw]
-
-    RENAME = {
-        "precious": "persist",
-    }
-    for find, replace in RENAME.items():
+    )
+)
+
+# Specification keys that are passed down to DROPs under a different name
+_RENAMED_KWARGS = {
+    "precious": "persist",
+}
+
+
+def _getKwargs(dropSpec):
+    kwargs = {k: v for k, v in dropSpec.items() if k not in _REMOVED_KWARGS}
+
+    for find, replace in _RENAMED_KWARGS.items():
         if find in kwargs:
-            kwargs[replace] = kwargs[find]
-            del kwargs[find]
+            kwargs[replace] = kwargs.pop(find)
 
     for name, spec in dropSpec.get("applicationArgs", dict()).items():
         kwargs[name] = spec["value"]
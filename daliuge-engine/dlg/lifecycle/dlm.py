@@ -118,6 +118,8 @@ configured (and/or hardcoded) DLM
 @author: rtobar
 """
 
+import collections
+import heapq
 import logging
 import random
 import string
@@ -131,9 +133,14 @@ from .. import droputils
 from ..ddap_protocol import DROPStates, DROPPhases, AppDROPStates
 from ..drop import AbstractDROP
 from ..data.drops.container import ContainerDROP
+from ..data.drops.memory import InMemoryDROP
+from ..event import CoalescingEventHandler, EventFirer
 
 logger = logging.getLogger(__name__)
 
+# Consumers in these states are done using their inputs
+_FINISHED_EXEC_STATES = (AppDROPStates.FINISHED, AppDROPStates.ERROR)
+
 
 class DataLifecycleManagerBackgroundTask(threading.Thread):
     """
@@ -182,6 +189,16 @@ class DROPGarbageCollector(DataLifecycleManagerBackgroundTask):
         dlm.deleteExpiredDrops()
 
 
+class DROPSpiller(DataLifecycleManagerBackgroundTask):
+    """
+    A thread that spills in-memory DROPs to disk when the node runs low on
+    memory
+    """
+
+    def doTask(self, dlm):
+        dlm.spillDrops()
+
+
 class DROPMover(DataLifecycleManagerBackgroundTask):
     """
     A thread that automatically moves DROPs between layers of the HSM.
@@ -204,20 +221,55 @@ class DropEventListener(object):
         elif event.type == "status":
             if event.status == DROPStates.COMPLETED:
                 self._dlm.handleCompletedDrop(event.uid)
+            elif event.status == DROPStates.EXPIRED:
+                self._dlm.handleExpiredDrop(event.uid)
+        elif event.type == "execStatus":
+            self._dlm.handleFinishedConsumer(event.uid, event.execStatus)
 
 
 class DataLifecycleManager:
     """
     An object that deals with automatic data drop replication and deletion.
+
+    Instead of periodically scanning all the DROPs it has ever seen, the DLM
+    indexes COMPLETED DROPs as it is notified about them: DROPs with a lifespan
+    are kept in a heap sorted by expiration date, and expire-after-use DROPs
+    keep track of the consumers that are still to finish, which are updated
+    as consumers notify their execution status. The periodic checks thus
+    only look at DROPs that are due to expire. The existence of COMPLETED
+    DROPs is checked in a round-robin fashion, up to `max_existence_checks`
+    DROPs on each check.
+
+    If `spill_period` is given the DLM also checks the memory usage of the node
+    with that period, and while more than `spill_threshold` of the memory is
+    in use it spills the data of the least recently accessed COMPLETED
+    InMemoryDROPs to the filesystem store of its HSM.
+
+    The DLM keeps its records in `drop_registry`, by default an in-memory
+    registry. A persistent registry (see `registry.RDBMSRegistry`) lets it
+    recover the phases, replicas and access history of DROPs across restarts.
     """
 
     def __init__(
-        self, check_period=0, cleanup_period=0, enable_drop_replication=False
+        self,
+        check_period=0,
+        cleanup_period=0,
+        enable_drop_replication=False,
+        event_coalescing_period=0,
+        max_existence_checks=1000,
+        spill_period=0,
+        spill_threshold=0.9,
+        drop_registry=None,
     ):
-        self._reg = registry.InMemoryRegistry()
+        self._reg = drop_registry or registry.InMemoryRegistry()
         self._listener = DropEventListener(self)
+        # Optionally receive DROP events in batches from a background thread
+        if event_coalescing_period > 0:
+            self._listener = CoalescingEventHandler(
+                self._listener, event_coalescing_period
+            )
         self._enable_drop_replication = enable_drop_replication
-        if enable_drop_replication:
+        if enable_drop_replication or spill_period:
             self._hsm = manager.HierarchicalStorageManager()
         else:
             self._hsm = None
@@ -228,14 +280,33 @@ class DataLifecycleManager:
         # here
         self._drops: dict[str, AbstractDROP] = {}
 
+        # Indexes driving the periodic checks, all keyed by DROP UID. UIDs of
+        # DROPs removed from self._drops are dropped from them lazily
+        self._lock = threading.Lock()
+        self._expirations = []  # heap of (expirationDate, uid)
+        self._expirable = set()  # expire-after-use DROPs ready to expire
+        self._pendingConsumers = {}  # data uid -> uids of unfinished consumers
+        self._awaitedBy = collections.defaultdict(set)  # consumer -> data uids
+        self._subscribedConsumers = {}  # consumers we listen to on our own
+        self._polledConsumers = {}  # consumers that can't notify us
+        self._expired = set()  # EXPIRED DROPs waiting to be deleted
+        self._existenceChecks = collections.deque()
+        self._max_existence_checks = max_existence_checks
+        self._spillCandidates = {}  # uid -> time at which it completed
+
         self._check_period = check_period
         self._cleanup_period = cleanup_period
+        self._spill_period = spill_period
+        self._spill_threshold = spill_threshold
         self._drop_checker = None
         self._drop_garbage_collector = None
+        self._drop_spiller = None
         self._finishedEvent = threading.Event()
 
     def startup(self):
         # Spawn the background threads
+        if isinstance(self._listener, CoalescingEventHandler):
+            self._listener.start()
         if self._check_period:
             self._drop_checker = DROPChecker(
                 "DropChecker", self, self._check_period
@@ -246,6 +317,9 @@ class DataLifecycleManager:
                 "DropGarbageCollector", self, self._cleanup_period
             )
             self._drop_garbage_collector.start()
+        if self._spill_period:
+            self._drop_spiller = DROPSpiller("DropSpiller", self, self._spill_period)
+            self._drop_spiller.start()
 
     def cleanup(self):
         logger.info("Cleaning up the DLM")
@@ -256,10 +330,19 @@ class DataLifecycleManager:
             self._drop_checker.join()
         if self._drop_garbage_collector:
             self._drop_garbage_collector.join()
+        if self._drop_spiller:
+            self._drop_spiller.join()
 
         # Unsubscribe to all events coming from the DROPs
         for drop in self._drops.values():
-            drop.unsubscribe(self)
+            drop.unsubscribe(self._listener)
+        with self._lock:
+            consumers = list(self._subscribedConsumers.values())
+        for consumer in consumers:
+            consumer.unsubscribe(self._listener, "execStatus")
+        if isinstance(self._listener, CoalescingEventHandler):
+            self._listener.stop()
+        self._reg.close()
 
     #
     # Support for 'with' keyword
@@ -277,32 +360,30 @@ class DataLifecycleManager:
         drop.status = DROPStates.DELETED
 
     def deleteExpiredDrops(self):
-        for drop in list(self._drops.values()):
-            if drop.status == DROPStates.EXPIRED:
+        with self._lock:
+            expired, self._expired = self._expired, set()
+        for uid in expired:
+            drop = self._drops.get(uid)
+            if drop is not None and drop.status == DROPStates.EXPIRED:
                 self._deleteDrop(drop)
 
     def expireCompletedDrops(self):
         now = time.time()
-        for drop in self._drops.values():
-
-            if drop.status != DROPStates.COMPLETED:
-                continue
-
-            # Expire-after-use: mark as expired if all consumers
-            # are finished using this DROP
-            if not drop.persist and drop.expireAfterUse:
-                allDone = all(
-                    c.execStatus
-                    in [AppDROPStates.FINISHED, AppDROPStates.ERROR]
-                    for c in drop.consumers
-                )
-                if not allDone:
-                    continue
-
-            # Otherwise, we check the expiration date
-            # (if no lifespan was specified for the DROP, its expiration
-            # date will be -1 and it will be skipped)
-            elif drop.expirationDate == -1 or now <= drop.expirationDate:
+        self._pollConsumers()
+
+        # Expire-after-use DROPs whose consumers are all finished, and those
+        # whose expiration date has passed (DROPs without a lifespan have
+        # an expiration date of -1 and are never added to the heap)
+        with self._lock:
+            candidates, self._expirable = self._expirable, set()
+            expirations = self._expirations
+            while expirations and expirations[0][0] < now:
+                candidates.add(heapq.heappop(expirations)[1])
+
+        retry = []
+        for uid in candidates:
+            drop = self._drops.get(uid)
+            if drop is None or drop.status != DROPStates.COMPLETED:
                 continue
 
             if drop.isBeingRead():
@@ -311,22 +392,53 @@ class DataLifecycleManager:
                     "will skip expiration for the time being",
                     drop,
                 )
+                retry.append(uid)
                 continue
 
             # Finally!
             logger.debug("Marking %r as EXPIRED", drop)
             drop.status = DROPStates.EXPIRED
+            with self._lock:
+                self._expired.add(uid)
+
+        if retry:
+            with self._lock:
+                self._expirable.update(retry)
+
+    def _pollConsumers(self):
+        """Checks the consumers that cannot notify us when they finish"""
+        finished = []
+        with self._lock:
+            for uid, consumer in list(self._polledConsumers.items()):
+                if uid not in self._awaitedBy:
+                    self._polledConsumers.pop(uid, None)
+                elif consumer.execStatus in _FINISHED_EXEC_STATES:
+                    self._polledConsumers.pop(uid, None)
+                    finished.append((uid, consumer.execStatus))
+        for uid, execStatus in finished:
+            self.handleFinishedConsumer(uid, execStatus)
 
     def _disappeared(self, drop):
         return drop.status != DROPStates.DELETED and not drop.exists()
 
     def deleteLostDrops(self):
 
+        # Check a sample of the COMPLETED DROPs, in turns
+        with self._lock:
+            checks = self._existenceChecks
+            n = min(len(checks), self._max_existence_checks)
+            sample = [checks.popleft() for _ in range(n)]
+
         toRemove = []
-        for drop in self._drops.values():
+        for uid in sample:
+            drop = self._drops.get(uid)
+            if drop is None or drop.status == DROPStates.DELETED:
+                continue
 
             # We only care about disappeared drops
-            if not self._disappeared(drop):
+            if drop.exists():
+                with self._lock:
+                    self._existenceChecks.append(uid)
                 continue
 
             toRemove.append(drop.uid)
@@ -344,7 +456,10 @@ class DataLifecycleManager:
                 for uid in uids:
                     if uid == drop.uid:
                         continue
-                    siblingDrop = self._drops[uid]
+                    siblingDrop = self._drops.get(uid)
+                    if siblingDrop is None:
+                        # e.g., recorded in a persistent registry before a restart
+                        continue
                     if not self._disappeared(siblingDrop):
                         replicas.append(siblingDrop)
                     else:
@@ -380,7 +495,74 @@ class DataLifecycleManager:
 
         # All those objects identified as lost have to go now
         for uid in toRemove:
-            del self._drops[uid]
+            self._drops.pop(uid, None)
+
+    def spillDrops(self):
+        """
+        Spills the data of the least recently accessed COMPLETED InMemoryDROPs
+        to the slowest store of the HSM until the memory in use in this node
+        goes below the spilling threshold. Returns the number of bytes spilled
+        """
+        memory = self._hsm.getFastestStore()
+        memory.updateSpaces()
+        total = memory.getTotalSpace()
+        excess = total - memory.getAvailableSpace() - self._spill_threshold * total
+        if excess <= 0:
+            return 0
+
+        # Colder DROPs first, DROPs that haven't been read since they were
+        # completed count as accessed at completion time
+        def lastAccess(item):
+            uid, completed = item
+            drop = self._drops.get(uid)
+            if drop is None:
+                return completed
+            return max(completed, self._reg.getLastAccess(drop.oid))
+
+        with self._lock:
+            candidates = sorted(self._spillCandidates.items(), key=lastAccess)
+
+        store = self._hsm.getSlowestStore()
+        store.updateSpaces()
+        spilled = 0
+        for uid, _ in candidates:
+            if spilled >= excess:
+                break
+            drop = self._drops.get(uid)
+            if drop is None or not drop.spillable:
+                with self._lock:
+                    self._spillCandidates.pop(uid, None)
+                continue
+            size = drop.size or 0
+            if drop.isBeingRead() or size > store.getAvailableSpace() - spilled:
+                continue
+            try:
+                if self._spillDrop(drop, store):
+                    spilled += size
+            except Exception:
+                logger.exception("Problem while spilling %r", drop)
+
+        logger.info(
+            "Spilled %d bytes to %s to reduce memory usage by %d bytes",
+            spilled,
+            store,
+            excess,
+        )
+        return spilled
+
+    def _spillDrop(self, drop, store):
+        spillDrop = store.createDrop(
+            drop.oid, drop.uid, expectedSize=drop.size, persist=False
+        )
+        droputils.copyDropContents(drop, spillDrop)
+        if spillDrop.status != DROPStates.COMPLETED:
+            spillDrop.setCompleted()
+        if not drop.spill(spillDrop):
+            spillDrop.delete()
+            return False
+        with self._lock:
+            self._spillCandidates.pop(drop.uid, None)
+        return True
 
     def moveDropsAround(self):
         """
@@ -453,23 +635,78 @@ class DataLifecycleManager:
         drop.phase = DROPPhases.GAS
         drop.subscribe(self._listener)
         self._reg.addDrop(drop)
+        if drop.status == DROPStates.COMPLETED:
+            self._watchCompletedDrop(drop)
 
-        # TODO: We currently use a background thread that scans
-        #       all DROPs for their status and compares its expiration date
-        #       with the current time in order to determine which DROPs must be
-        #       moved to EXPIRED. We might want to explore other alternatives to
-        #       perform this task, like using threading.Timers (probably not) or
-        #       any other that doesn't mean looping over all DROPs
+    def _watchCompletedDrop(self, drop):
+        """
+        Indexes a COMPLETED DROP so it is considered for expiration (if it has
+        a lifespan, or once all its consumers finish) and existence checks
+        """
+        uid = drop.uid
+        with self._lock:
+            self._existenceChecks.append(uid)
+            if self._spill_period and isinstance(drop, InMemoryDROP):
+                self._spillCandidates[uid] = time.time()
+
+        if not drop.persist and drop.expireAfterUse:
+            # Make sure we hear about consumers finishing before looking at
+            # their current status, so we don't miss any of them
+            consumers = drop.consumers
+            with self._lock:
+                for c in consumers:
+                    if c.uid in self._drops or c.uid in self._subscribedConsumers:
+                        continue
+                    if isinstance(c, EventFirer):
+                        self._subscribedConsumers[c.uid] = c
+                        c.subscribe(self._listener, "execStatus")
+                    else:
+                        self._polledConsumers[c.uid] = c
+                pending = set()
+                for c in consumers:
+                    if c.uid in self._polledConsumers or (
+                        c.execStatus not in _FINISHED_EXEC_STATES
+                    ):
+                        pending.add(c.uid)
+                        self._awaitedBy[c.uid].add(uid)
+                if pending:
+                    self._pendingConsumers[uid] = pending
+                else:
+                    self._expirable.add(uid)
+
+        elif drop.expirationDate != -1:
+            with self._lock:
+                heapq.heappush(self._expirations, (drop.expirationDate, uid))
 
     def remove_drops(self, drop_oids):
         """
-        Remove drops from DLM's monitoring
+        Remove drops from DLM's monitoring, and from the registry
         """
+        removed = {drop.oid for uid, drop in self._drops.items() if uid in drop_oids}
         self._drops = {
             oid: drop
             for oid, drop in self._drops.items()
             if oid not in drop_oids
         }
+        # Other instances of a DROP might still be around
+        removed.difference_update(drop.oid for drop in self._drops.values())
+        self._reg.removeDrops(removed)
+        with self._lock:
+            self._expirations = [e for e in self._expirations if e[1] not in drop_oids]
+            heapq.heapify(self._expirations)
+            self._existenceChecks = collections.deque(
+                uid for uid in self._existenceChecks if uid not in drop_oids
+            )
+            self._expirable.difference_update(drop_oids)
+            self._expired.difference_update(drop_oids)
+            for uid in drop_oids:
+                self._spillCandidates.pop(uid, None)
+                self._pendingConsumers.pop(uid, None)
+                self._awaitedBy.pop(uid, None)
+                self._polledConsumers.pop(uid, None)
+                consumer = self._subscribedConsumers.pop(uid, None)
+                if consumer is not None:
+                    consumer.unsubscribe(self._listener, "execStatus")
 
     def handleOpenedDrop(self, oid, uid):
         drop = self._drops[uid]
@@ -480,13 +717,17 @@ class DataLifecycleManager:
         """
         :param string uid:
         """
+        drop = self._drops.get(uid)
+        if drop is None:
+            return
+        self._watchCompletedDrop(drop)
+
         # Check the kind of storage used by this DROP. If it's already persisted
         # in a persistent storage media we don't need to save it again
 
         if not self._enable_drop_replication:
             return
 
-        drop = self._drops[uid]
         if drop.persist and self.isReplicable(drop):
             logger.debug(
                 "Replicating %r because it's marked to be persisted", drop
@@ -496,6 +737,27 @@ class DataLifecycleManager:
             except:
                 logger.exception("Problem while replicating %r", drop)
 
+    def handleExpiredDrop(self, uid):
+        with self._lock:
+            self._expired.add(uid)
+
+    def handleFinishedConsumer(self, uid, execStatus):
+        """
+        Records that consumer `uid` has finished, moving the expire-after-use
+        DROPs that were waiting only for it to the list of expirable DROPs
+        """
+        if execStatus not in _FINISHED_EXEC_STATES:
+            return
+        with self._lock:
+            for dataUid in self._awaitedBy.pop(uid, ()):
+                pending = self._pendingConsumers.get(dataUid)
+                if pending is None:
+                    continue
+                pending.discard(uid)
+                if not pending:
+                    del self._pendingConsumers[dataUid]
+                    self._expirable.add(dataUid)
+
     def isReplicable(self, drop):
         return not isinstance(drop, ContainerDROP)
 
@@ -537,6 +799,7 @@ class DataLifecycleManager:
         self._drops[newUid] = newDrop
         self._reg.addDropInstance(newDrop)
         self._reg.setDropPhase(drop, DROPPhases.SOLID)
+        self._watchCompletedDrop(newDrop)
 
     def getDropUids(self, drop):
         return self._reg.getDropUids(drop)
@@ -46,6 +46,12 @@ class HierarchicalStorageManager(object):
         logger.debug("Adding store to HSM: %s", str(newStore))
         self._stores.append(newStore)
 
+    def getFastestStore(self):
+        """
+        :return store.AbstractStore:
+        """
+        return self._stores[0]
+
     def getSlowestStore(self):
         """
         :return store.AbstractStore:
@@ -133,7 +133,8 @@ class FileSystemStore(AbstractStore):
         self._setAvailableSpace(availableSpace)
 
     def createDrop(self, oid, uid, **kwargs):
-        kwargs["dirname"] = self._savingDir
+        filename = FileDROP.non_fname_chars.sub("_", uid)
+        kwargs["filepath"] = os.path.join(self._savingDir, filename)
         return FileDROP(oid, uid, **kwargs)
 
     def __str__(self):
@@ -151,9 +152,11 @@ class MemoryStore(AbstractStore):
         self.updateSpaces()
 
     def _updateSpaces(self):
+        # "available" also accounts for memory that can be reclaimed right away
+        # (e.g., the page cache), unlike "free"
         vmem = psutil.virtual_memory()
         self._setTotalSpace(vmem.total)
-        self._setAvailableSpace(vmem.free)
+        self._setAvailableSpace(vmem.available)
 
     def createDrop(self, oid, uid, **kwargs):
         return InMemoryDROP(oid, uid, **kwargs)
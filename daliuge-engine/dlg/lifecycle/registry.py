@@ -20,19 +20,22 @@
 #    MA 02111-1307  USA
 #
 """
-Module containing the base class and a simple implementation of the registry
+Module containing the base class and the implementations of the registry
 used by the DLM to keep track of which DROPs are where, and therefore in which
 phase they currently are
 
 The registry simply (for the time being) keeps a record of:
  * Which DROPs (i.e., which oids) are out there
  * For each DROP, which instances(i.e., which uids) are out there
+ * For each DROP, the last few times it has been accessed for reading
 
 @author: rtobar
 """
 
+import collections
 import importlib
 import logging
+import threading
 import time
 from abc import abstractmethod, ABCMeta
 
@@ -103,15 +106,33 @@ class Registry:
         never been accessed
         """
 
+    @abstractmethod
+    def removeDrops(self, oids):
+        """
+        Removes the given DROPs, together with their instances and access
+        times, from the registry
+        """
+
+    def close(self):
+        """
+        Releases the resources used by this registry
+        """
+
     def _checkDropIsInRegistry(self, oid):
         if not oid in self._drops:
             raise Exception("DROP %s is not present in the registry" % (oid))
 
 
 class InMemoryRegistry(Registry):
-    def __init__(self):
+    """
+    A registry that keeps its records in memory. Only the last
+    `access_history` access times of each DROP are kept.
+    """
+
+    def __init__(self, access_history=10):
         super(InMemoryRegistry, self).__init__()
         self._drops = {}
+        self._access_history = access_history
 
     def addDrop(self, drop):
         """
@@ -122,6 +143,7 @@ class InMemoryRegistry(Registry):
         dropRow.oid = drop.oid
         dropRow.phase = drop.phase
         dropRow.instances = {drop.uid: drop}
+        dropRow.accessTimes = collections.deque(maxlen=self._access_history)
         self._drops[dropRow.oid] = dropRow
 
     def addDropInstance(self, drop):
@@ -149,13 +171,59 @@ class InMemoryRegistry(Registry):
 
     def getLastAccess(self, oid):
         if oid in self._drops and self._drops[oid].accessTimes:
-            return self._drops[oid].accesTimes[-1]
+            return self._drops[oid].accessTimes[-1]
         else:
             return -1
 
+    def removeDrops(self, oids):
+        for oid in oids:
+            self._drops.pop(oid, None)
+
 
 class RDBMSRegistry(Registry):
-    def __init__(self, dbModuleName, *connArgs):
+    """
+    A registry that keeps its records in a relational database accessed through
+    the DB-API module `dbModuleName` (sqlite3 by default), connecting to it with
+    `connArgs`. The records kept in the database outlive the process, so DROPs
+    added again after a restart (e.g., when a NodeManager is restarted and the
+    same graph is redeployed) keep their phase, instances and access history.
+
+    If `flush_period` is given, writes are buffered and flushed in batches with
+    that period, or whenever `batch_size` writes are pending. Writes that fail
+    are kept, and retried by the next flush, but not by further writes until
+    `retry_delay` seconds have passed. If they fail again they are written one
+    by one, and the ones that still fail are discarded. Only the last
+    `access_history` access times of each DROP are kept. Unless `create_schema`
+    is False the tables and indexes used by the registry are created if they
+    don't exist yet.
+    """
+
+    # The tables and indexes used by the registry. Apart from primary keys,
+    # the instances of a DROP are looked up by oid, and DROPs by phase
+    _schema = (
+        "CREATE TABLE IF NOT EXISTS dlg_drop ("
+        "oid varchar(64) PRIMARY KEY, phase integer)",
+        "CREATE TABLE IF NOT EXISTS dlg_dropinstance ("
+        "uid varchar(64) PRIMARY KEY, oid varchar(64), dataRef varchar(256))",
+        "CREATE TABLE IF NOT EXISTS dlg_dropaccesstime ("
+        "oid varchar(64), accessTime double precision)",
+        "CREATE INDEX IF NOT EXISTS dlg_drop_phase ON dlg_drop (phase)",
+        "CREATE INDEX IF NOT EXISTS dlg_dropinstance_oid ON dlg_dropinstance (oid)",
+        "CREATE INDEX IF NOT EXISTS dlg_dropaccesstime_oid "
+        "ON dlg_dropaccesstime (oid, accessTime)",
+    )
+
+    retry_delay = 10
+
+    def __init__(
+        self,
+        dbModuleName="sqlite3",
+        *connArgs,
+        flush_period=0,
+        batch_size=1000,
+        access_history=10,
+        create_schema=True,
+    ):
         try:
             self._dbmod = importlib.import_module(dbModuleName)
             self._paramstyle = self._dbmod.paramstyle
@@ -166,77 +234,229 @@ class RDBMSRegistry(Registry):
             )
             raise
 
+        # A single connection is shared by all threads, serialized by our lock
+        self._connKwargs = {}
+        if dbModuleName == "sqlite3":
+            self._connKwargs["check_same_thread"] = False
+        self._lock = threading.RLock()
+        self._conn = None
+        self._pending = []
+        self._failed = []
+        self._retry_time = 0
+        self._trim = set()
+        self._batch_size = batch_size if flush_period else 1
+        self._access_history = access_history
+
+        if create_schema:
+            for sql in self._schema:
+                self._pending.append((sql, ()))
+        self.flush()
+        self._load()
+
+        self._closed = threading.Event()
+        self._flusher = None
+        if flush_period:
+            self._flusher = threading.Thread(
+                target=self._flushPeriodically,
+                args=(flush_period,),
+                name="RegistryFlusher",
+                daemon=True,
+            )
+            self._flusher.start()
+
     def _connect(self):
-        return self._dbmod.connect(*self._connArgs)
-
-    # The following tables should be defined in the database we're pointing at
-    #
-    # dlg_drop:
-    #   oid   (PK)
-    #   phase (int)
-    #
-    # dlg_dropinstance:
-    #   uid     (PK)
-    #   oid     (FK)
-    #   dataRef ()
-    #
-    # dlg_dropaccesstime:
-    #   oid (FK, PK)
-    #   accessTime (PK)
-
-    # A small helper class to make all methods transactional, and to create
-    # connections when needed
-    class transactional(object):
-        def __init__(self, registry, conn):
-            self._connect = registry._connect
-            self._conn = conn
-            self._connCreated = False
-
-        def __enter__(self):
-            if self._conn is None:
-                self._conn = self._connect()
-                self._connCreated = True
-            return self._conn
-
-        def __exit__(self, typ, value, traceback):
-            if not self._connCreated:
-                return
-            if typ is None:
-                self._conn.commit()
-            else:
-                self._conn.rollback()
-                return False
+        return self._dbmod.connect(*self._connArgs, **self._connKwargs)
+
+    def _load(self):
+        """Loads the phases and access history recorded in the database"""
+        self._drops = {}
+        self._accessTimes = {}
+        with self._lock:
+            cur = self._cursor()
+            self.execute(cur, "SELECT oid, phase FROM dlg_drop")
+            for oid, phase in cur.fetchall():
+                self._drops[oid] = phase
+            self.execute(
+                cur,
+                "SELECT oid, accessTime FROM dlg_dropaccesstime ORDER BY accessTime",
+            )
+            for oid, accessTime in cur.fetchall():
+                self._accessHistory(oid).append(float(accessTime))
+            cur.close()
+        logger.info("Loaded %d DROPs from the registry", len(self._drops))
 
-            self._conn.close()
+    def _cursor(self):
+        if self._conn is None:
+            self._conn = self._connect()
+        return self._conn.cursor()
+
+    def _accessHistory(self, oid):
+        history = self._accessTimes.get(oid)
+        if history is None:
+            history = collections.deque(maxlen=self._access_history)
+            self._accessTimes[oid] = history
+        return history
 
     def execute(self, cursor, sql, values=()):
         sql, values = prepare_sql(sql, self._paramstyle, values)
         cursor.execute(sql, values)
 
-    def addDrop(self, drop, conn=None):
-        with self.transactional(self, conn) as conn:
-            cur = conn.cursor()
-            self.execute(
-                cur,
-                "INSERT INTO dlg_drop (oid, phase) VALUES ({0},{1})",
-                (drop.oid, drop.phase),
+    def _write(self, sql, values):
+        with self._lock:
+            self._pending.append((sql, values))
+            self._flushIfNeeded()
+
+    def _flushIfNeeded(self):
+        # Writes don't keep retrying failed flushes
+        if (
+            len(self._pending) + len(self._failed) >= self._batch_size
+            and time.time() >= self._retry_time
+        ):
+            self._flush(raise_errors=False)
+
+    def flush(self):
+        """
+        Writes all pending changes into the database in a single transaction.
+        If that fails the changes are kept for the next flush (or written one
+        by one if they had failed already), and the error is raised
+        """
+        self._flush(raise_errors=True)
+
+    def _flush(self, raise_errors):
+        with self._lock:
+            if not self._failed and not self._pending and not self._trim:
+                return
+
+            # Access histories are trimmed down to the ones we keep in memory
+            retrying = bool(self._failed)
+            pending = self._failed + self._pending
+            for oid in self._trim:
+                history = self._accessTimes[oid]
+                if len(history) == history.maxlen:
+                    pending.append(
+                        (
+                            "DELETE FROM dlg_dropaccesstime "
+                            "WHERE oid = {0} AND accessTime < {1}",
+                            (oid, history[0]),
+                        )
+                    )
+            self._failed = []
+            self._pending = []
+            self._trim = set()
+
+            try:
+                cur = self._cursor()
+                try:
+                    for sql, values in pending:
+                        self.execute(cur, sql, values)
+                    self._conn.commit()
+                finally:
+                    cur.close()
+            except Exception:
+                # Nothing was written. Try again later on a new connection in
+                # case this one is broken, but only once: the batch might hold
+                # writes that will never succeed
+                self._disconnect(rollback=True)
+                if retrying:
+                    self._retry_time = 0
+                    self._writeOneByOne(pending)
+                else:
+                    self._retry_time = time.time() + self.retry_delay
+                    self._failed = pending
+                if raise_errors:
+                    raise
+                logger.exception(
+                    "Error while writing %d changes into the registry", len(pending)
+                )
+            else:
+                self._retry_time = 0
+
+    def _writeOneByOne(self, writes):
+        """Writes each of `writes` on its own, discarding the ones that fail"""
+        discarded = []
+        try:
+            cur = self._cursor()
+        except Exception:
+            logger.exception(
+                "Cannot connect to the registry, discarding %d changes", len(writes)
             )
-            self.addDropInstance(drop, conn)
+            return
+        try:
+            for sql, values in writes:
+                try:
+                    self.execute(cur, sql, values)
+                    self._conn.commit()
+                except Exception:
+                    discarded.append((sql, values))
+                    try:
+                        self._conn.rollback()
+                    except Exception:
+                        pass
+        finally:
             cur.close()
+        if discarded:
+            logger.error(
+                "Discarded %d changes that couldn't be written into the registry, "
+                "the first one being %r",
+                len(discarded),
+                discarded[0],
+            )
 
-    def addDropInstance(self, drop, conn=None):
-        with self.transactional(self, conn) as conn:
-            cur = conn.cursor()
-            self.execute(
-                cur,
+    def _disconnect(self, rollback=False):
+        conn, self._conn = self._conn, None
+        if conn is None:
+            return
+        try:
+            if rollback:
+                conn.rollback()
+            conn.close()
+        except Exception:
+            logger.debug("Error while closing registry connection", exc_info=True)
+
+    def _flushPeriodically(self, period):
+        while not self._closed.wait(period):
+            self._flush(raise_errors=False)
+
+    def close(self):
+        self._closed.set()
+        if self._flusher:
+            self._flusher.join()
+        with self._lock:
+            self._flush(raise_errors=False)
+            # Changes that failed get their last chance
+            if self._failed:
+                self._flush(raise_errors=False)
+            self._disconnect()
+
+    def addDrop(self, drop):
+        with self._lock:
+            if drop.oid in self._drops:
+                self._write(
+                    "UPDATE dlg_drop SET phase = {0} WHERE oid = {1}",
+                    (drop.phase, drop.oid),
+                )
+            else:
+                self._write(
+                    "INSERT INTO dlg_drop (oid, phase) VALUES ({0},{1})",
+                    (drop.oid, drop.phase),
+                )
+            self._drops[drop.oid] = drop.phase
+            self.addDropInstance(drop)
+
+    def addDropInstance(self, drop):
+        with self._lock:
+            self._checkDropIsInRegistry(drop.oid)
+            # Instances recorded before a restart are replaced
+            self._write("DELETE FROM dlg_dropinstance WHERE uid = {0}", (drop.uid,))
+            self._write(
                 "INSERT INTO dlg_dropinstance (oid, uid, dataRef) VALUES ({0},{1},{2})",
                 (drop.oid, drop.uid, drop.dataURL),
             )
-            cur.close()
 
-    def getDropUids(self, drop, conn=None):
-        with self.transactional(self, conn) as conn:
-            cur = conn.cursor()
+    def getDropUids(self, drop):
+        with self._lock:
+            self.flush()
+            cur = self._cursor()
             self.execute(
                 cur, "SELECT uid FROM dlg_dropinstance WHERE oid = {0}", (drop.oid,)
             )
@@ -244,36 +464,39 @@ class RDBMSRegistry(Registry):
             cur.close()
             return [r[0] for r in rows]
 
-    def setDropPhase(self, drop, phase, conn=None):
-        with self.transactional(self, conn) as conn:
-            cur = conn.cursor()
-            self.execute(
-                cur,
+    def setDropPhase(self, drop, phase):
+        with self._lock:
+            self._drops[drop.oid] = phase
+            self._write(
                 "UPDATE dlg_drop SET phase = {0} WHERE oid = {1}",
-                (drop.oid, drop.phase),
+                (phase, drop.oid),
             )
-            cur.close()
 
-    def recordNewAccess(self, oid, conn=None):
-        with self.transactional(self, conn) as conn:
-            cur = conn.cursor()
-            self.execute(
-                cur,
+    def recordNewAccess(self, oid):
+        now = time.time()
+        with self._lock:
+            self._checkDropIsInRegistry(oid)
+            self._accessHistory(oid).append(now)
+            self._trim.add(oid)
+            self._write(
                 "INSERT INTO dlg_dropaccesstime (oid, accessTime) VALUES ({0},{1})",
-                (oid, self._dbmod.TimestampFromTicks(time.time())),
+                (oid, now),
             )
-            cur.close()
 
-    def getLastAccess(self, oid, conn=None):
-        with self.transactional(self, conn) as conn:
-            cur = conn.cursor()
-            self.execute(
-                cur,
-                "SELECT accessTime FROM dlg_dropaccesstime WHERE oid = {0} ORDER BY accessTime DESC LIMIT 1",
-                (oid,),
-            )
-            row = cur.fetchone()
-            cur.close()
-            if row is None:
-                return -1
-            return row[0]
+    def getLastAccess(self, oid):
+        history = self._accessTimes.get(oid)
+        if history:
+            return history[-1]
+        return -1
+
+    def removeDrops(self, oids):
+        with self._lock:
+            for oid in oids:
+                self._drops.pop(oid, None)
+                self._accessTimes.pop(oid, None)
+                self._trim.discard(oid)
+                for table in ("dlg_drop", "dlg_dropinstance", "dlg_dropaccesstime"):
+                    self._pending.append(
+                        ("DELETE FROM %s WHERE oid = {0}" % table, (oid,))
+                    )
+            self._flushIfNeeded()
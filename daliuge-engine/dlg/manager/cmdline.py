@@ -383,6 +383,34 @@ def dlgNM(parser, args):
         action="store_true",
         help="Turn on data drop automatic replication (off by default)",
     )
+    parser.add_option(
+        "--dlm-spill-period",
+        type="float",
+        help="Time in seconds between background DLM checks of the node's memory usage, which spill in-memory drops to disk when above --dlm-spill-threshold (defaults to 0, no spilling)",
+        default=0,
+    )
+    parser.add_option(
+        "--dlm-spill-threshold",
+        type="float",
+        help="Fraction of the node's memory in use above which the DLM spills in-memory drops to disk (defaults to 0.9)",
+        default=0.9,
+    )
+    parser.add_option(
+        "--dlm-registry",
+        help="Database where the DLM keeps its drop registry so it can be recovered after a restart, e.g., the path to an SQLite file (defaults to an in-memory registry)",
+        default=None,
+    )
+    parser.add_option(
+        "--dlm-registry-module",
+        help="DB-API module used to connect to the --dlm-registry database (defaults to sqlite3)",
+        default="sqlite3",
+    )
+    parser.add_option(
+        "--dlm-registry-flush-period",
+        type="float",
+        help="Time in seconds between batched writes into the --dlm-registry database, 0 writes immediately (defaults to 1)",
+        default=1,
+    )
     parser.add_option(
         "--dlg-path",
         action="store",
@@ -423,6 +451,44 @@ def dlgNM(parser, args):
         dest="use_processes",
         help="Use processes instead of threads to execute app drops, defaults to False",
     )
+    parser.add_option(
+        "--shared-memory",
+        action="store_true",
+        dest="use_shared_memory",
+        help="With --processes, exchange the data of local drops with the worker processes through shared memory instead of RPC, defaults to False",
+    )
+    parser.add_option(
+        "--preload-modules",
+        action="store",
+        type="string",
+        dest="preload_modules",
+        help="With --processes, comma-separated modules imported by every worker process when it starts",
+        default="",
+    )
+    parser.add_option(
+        "--max-dispatch-threads",
+        action="store",
+        type="int",
+        dest="max_dispatch_threads",
+        help="Max number of apps dispatched for execution at once, the rest wait in a ready-queue. <= 0 means use the value of --max-threads. Default is 0.",
+        default=0,
+    )
+    parser.add_option(
+        "--event-coalescing-period",
+        action="store",
+        type="float",
+        dest="event_coalescing_period",
+        help="Deliver DROP events to the DLM and logging listeners in batches every this many seconds, keeping only the latest status change of each DROP. <= 0 means deliver them immediately. Default is 0.",
+        default=0,
+    )
+    parser.add_option(
+        "--graph-creation-workers",
+        action="store",
+        type="int",
+        dest="graph_creation_workers",
+        help="Number of threads creating the drops of a graph when it is deployed. Only worth raising when creating drops does I/O. Default is 1.",
+        default=1,
+    )
     (options, args) = parser.parse_args(args)
 
     # No logging setup at this point yet
@@ -433,6 +499,7 @@ def dlgNM(parser, args):
         options.dlm_check_period = 0
         options.dlm_cleanup_period = 0
         options.dlm_enable_replication = False
+        options.dlm_spill_period = 0
 
     # Add DM-specific options
     # Note that the host we use to expose the NodeManager itself through Pyro is
@@ -443,6 +510,11 @@ def dlgNM(parser, args):
         "dlm_check_period": options.dlm_check_period,
         "dlm_cleanup_period": options.dlm_cleanup_period,
         "dlm_enable_replication": options.dlm_enable_replication,
+        "dlm_spill_period": options.dlm_spill_period,
+        "dlm_spill_threshold": options.dlm_spill_threshold,
+        "dlm_registry": options.dlm_registry,
+        "dlm_registry_module": options.dlm_registry_module,
+        "dlm_registry_flush_period": options.dlm_registry_flush_period,
         "dlgPath": options.dlgPath,
         "host": options.host,
         "error_listener": options.errorListener,
@@ -451,6 +523,11 @@ def dlgNM(parser, args):
         ),
         "max_threads": options.max_threads,
         "use_processes": options.use_processes,
+        "use_shared_memory": options.use_shared_memory,
+        "preload_modules": [m for m in options.preload_modules.split(",") if m],
+        "max_dispatch_threads": options.max_dispatch_threads,
+        "event_coalescing_period": options.event_coalescing_period,
+        "graph_creation_workers": options.graph_creation_workers,
         "logdir": options.logdir,
     }
     options.dmAcronym = "NM"
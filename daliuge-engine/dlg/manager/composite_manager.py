@@ -107,6 +107,40 @@ def group_by_node(uids, graph):
     return uids_by_node
 
 
+def merge_graph_status_summaries(summaries):
+    """
+    Merges the graph status summaries of a number of DMs, given as a dictionary
+    keyed by DM host, into a single summary. The version of the merged summary
+    is made of the versions of each DM.
+    """
+    merged = {
+        "version": {},
+        "total": 0,
+        "status": collections.Counter(),
+        "execStatus": collections.Counter(),
+        "node": collections.defaultdict(collections.Counter),
+        "lg_key": collections.defaultdict(collections.Counter),
+    }
+
+    # Statuses are dictionary keys, which become strings when going through JSON
+    def counts(c):
+        return {int(status): n for status, n in c.items()}
+
+    for host, summary in summaries.items():
+        merged["version"][host] = summary["version"]
+        merged["total"] += summary["total"]
+        merged["status"].update(counts(summary["status"]))
+        merged["execStatus"].update(counts(summary["execStatus"]))
+        for key in ("node", "lg_key"):
+            for value, c in summary[key].items():
+                merged[key][value].update(counts(c))
+    for key in ("node", "lg_key"):
+        merged[key] = {value: dict(c) for value, c in merged[key].items()}
+    merged["status"] = dict(merged["status"])
+    merged["execStatus"] = dict(merged["execStatus"])
+    return merged
+
+
 class CompositeManager(DROPManager):
     """
     A DROPManager that in turn manages DROPManagers (sigh...).
@@ -255,11 +289,8 @@ class CompositeManager(DROPManager):
         return dm_is_there
 
     def dmAt(self, host, port=None):
-        if not self.check_dm(host, port):
-            raise SubManagerException(
-                f"Manager expected but not running in {host}:{port}"
-            )
-
+        # Clients reuse pooled connections to the manager, and only wait for it
+        # to be reachable when they fail to connect
         port = port or self._dmPort
         return NodeManagerClient(host, port, 10)
 
@@ -521,6 +552,45 @@ class CompositeManager(DROPManager):
         )
         return allStatus
 
+    def _getGraphStatusSummary(self, dm, host, sessionId):
+        return {host: dm.getGraphStatusSummary(sessionId)}
+
+    def getGraphStatusSummary(self, sessionId):
+        summaries = {}
+        self.replicate(
+            sessionId,
+            self._getGraphStatusSummary,
+            "getting graph status summary",
+            collect=summaries,
+        )
+        return merge_graph_status_summaries(summaries)
+
+    def _getGraphStatusChanges(self, since, filters, dm, host, sessionId):
+        return {host: dm.getGraphStatusChanges(sessionId, since.get(host), **filters)}
+
+    def getGraphStatusChanges(
+        self, sessionId, since=None, status=None, node=None, lg_key=None
+    ):
+        # Our version is made of the versions of each underlying DM
+        allChanges = {}
+        self.replicate(
+            sessionId,
+            functools.partial(
+                self._getGraphStatusChanges,
+                since or {},
+                {"status": status, "node": node, "lg_key": lg_key},
+            ),
+            "getting graph status changes",
+            collect=allChanges,
+        )
+        changes = {}
+        for hostChanges in allChanges.values():
+            changes.update(hostChanges["changes"])
+        return {
+            "version": {host: c["version"] for host, c in allChanges.items()},
+            "changes": changes,
+        }
+
     def _getGraph(self, dm, host, sessionId):
         return dm.getGraph(sessionId)
 
@@ -83,12 +83,41 @@ class DROPManager(object):
         session `sessionId`.
         """
 
+    def addGraphSpecStream(self, sessionId, dropSpecs):
+        """
+        Like `addGraphSpec`, but `dropSpecs` is an iterable yielding DROP
+        specifications (e.g., as they are decoded from an upload) rather than
+        a list. Managers that can consume it incrementally should override
+        this method; by default the whole graph specification is collected
+        first.
+        """
+        return self.addGraphSpec(sessionId, list(dropSpecs))
+
     @abc.abstractmethod
     def getGraphStatus(self, sessionId):
         """
         Returns the status of the graph being executed in session `sessionId`.
         """
 
+    @abc.abstractmethod
+    def getGraphStatusSummary(self, sessionId):
+        """
+        Returns the number of DROPs in each status in session `sessionId`,
+        overall and per node and lg_key, together with the version of its graph
+        status.
+        """
+
+    @abc.abstractmethod
+    def getGraphStatusChanges(
+        self, sessionId, since=None, status=None, node=None, lg_key=None
+    ):
+        """
+        Returns the status of the DROPs in session `sessionId` that changed after
+        version `since` of its graph status (all DROPs if not given), together
+        with the current version. DROPs can be further filtered by the given
+        lists of `status`, `node` and `lg_key` values.
+        """
+
     @abc.abstractmethod
     def getGraph(self, sessionId):
         """
@@ -27,6 +27,8 @@ thus represents the bottom of the DROP management hierarchy.
 import abc
 import collections
 import copy
+import dataclasses
+import importlib
 import logging
 from psutil import cpu_count
 import os
@@ -34,23 +36,31 @@ import queue
 import signal
 import sys
 import threading
-import time
 import typing
 from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, Future
 
 from . import constants
 from .drop_manager import DROPManager
+from .shared_memory_manager import (
+    DlgSharedMemoryManager,
+    SharedMemoryDropProxy,
+    SharedMemoryProxyInfo,
+)
 from .session import Session
 
 from .. import rpc, utils
 from ..ddap_protocol import DROPStates
-from ..apps.app_base import AppDROP, DropRunner
+from ..event import CoalescingEventHandler
+from ..apps.app_base import AppDROP, DropRunner, ReadyQueueDispatcher
+from ..data.drops.data_base import DataDROP
 from ..exceptions import (
+    NoDropException,
     NoSessionException,
     SessionAlreadyExistsException,
     DaliugeException,
 )
 from ..lifecycle.dlm import DataLifecycleManager
+from ..lifecycle.registry import RDBMSRegistry
 
 logger = logging.getLogger(__name__)
 
@@ -133,31 +143,77 @@ class NodeManagerThreadDropRunner(NodeManagerDropRunner):
     def run_drop(self, app_drop: AppDROP) -> Future:
         return self._thread_pool.submit(app_drop.run)
 
+    def submit(self, func, *args, **kwargs) -> Future:
+        return self._thread_pool.submit(func, *args, **kwargs)
+
     def close(self):
         self._thread_pool.shutdown(wait=True)
 
 
 class NodeManagerProcessDropRunner(NodeManagerDropRunner):
+    """
+    Runs app drops in a pool of worker processes. Workers access the inputs and
+    outputs of their apps through DropProxy objects, which by default transfer
+    all data over RPC. If a `memory_manager` is given, the data of local drops
+    is exchanged through shared memory instead: inputs are exported into
+    blocks the first time a worker reads them, and released once all their
+    consumers are finished. Workers read them without copying, and the data
+    written to outputs
+    is collected in blocks that are committed into the actual drops once the
+    app finishes (outputs with streaming consumers still go through RPC).
+
+    Workers are long-lived and keep whatever the apps they ran imported (see
+    for instance the function cache of PyFuncApp), so apps are sent to an idle
+    worker that already ran apps with the same affinity key (their function,
+    or their class) if there is one, or otherwise to the least busy worker.
+    The modules in `preload_modules` are imported by every worker when it
+    starts, in which case all workers are started upfront.
+    """
+
     # Process isolated properties - should only be accessed in @classmethods
     # to ensure that they are global to a single process only
     _rpc_client: typing.Optional[rpc.RPCClient]
     _rpc_endpoint: typing.Tuple[str, int]
 
-    def __init__(self, max_workers: int):
+    def __init__(
+        self,
+        max_workers: int,
+        memory_manager: typing.Optional[DlgSharedMemoryManager] = None,
+        preload_modules: typing.Sequence[str] = (),
+    ):
         self._max_workers = max_workers
-        self._process_pool: typing.Optional[ProcessPoolExecutor] = None
+        # One single-process pool per worker, so we can choose where apps run
+        self._workers: typing.List[ProcessPoolExecutor] = []
+        self._workers_lock = threading.Lock()
+        self._pending: typing.List[int] = []
+        self._warm: typing.List[typing.Set[str]] = []
+        self._memory_manager = memory_manager
+        self._commit_pool: typing.Optional[ThreadPoolExecutor] = None
+        self._preload_modules = list(preload_modules)
 
     def start(self, rpc_endpoint):
         logger.info("Initializing process pool with %d workers", self._max_workers)
 
-        self._process_pool = ProcessPoolExecutor(
-            max_workers=self._max_workers,
-            initializer=NodeManagerProcessDropRunner._setup_process,
-            initargs=(rpc_endpoint,),
-        )
+        self._workers = [
+            ProcessPoolExecutor(
+                max_workers=1,
+                initializer=NodeManagerProcessDropRunner._setup_process,
+                initargs=(rpc_endpoint, self._preload_modules),
+            )
+            for _ in range(self._max_workers)
+        ]
+        self._pending = [0] * self._max_workers
+        self._warm = [set() for _ in range(self._max_workers)]
+        if self._memory_manager:
+            self._commit_pool = ThreadPoolExecutor(max_workers=self._max_workers)
+
+        # Processes are otherwise started on demand
+        if self._preload_modules:
+            for worker in self._workers:
+                worker.submit(int).result()
 
     @classmethod
-    def _setup_process(cls, rpc_endpoint):
+    def _setup_process(cls, rpc_endpoint, preload_modules=()):
         signal.signal(signal.SIGTERM, signal.SIG_IGN)
         signal.signal(signal.SIGINT, signal.SIG_IGN)
 
@@ -168,6 +224,45 @@ class NodeManagerProcessDropRunner(NodeManagerDropRunner):
         # (instead of the normal `shutdown()`)
         cls._rpc_client.start()
 
+        for name in preload_modules:
+            try:
+                importlib.import_module(name)
+            except Exception:
+                logger.exception("Error while preloading module %s", name)
+
+    def _choose_worker(self, key):
+        with self._workers_lock:
+            workers = range(len(self._workers))
+            warm = [i for i in workers if key in self._warm[i]]
+            idle_warm = [i for i in warm if not self._pending[i]]
+            if idle_warm:
+                i = idle_warm[0]
+            else:
+                i = min(workers, key=lambda i: (self._pending[i], i not in warm))
+            self._pending[i] += 1
+            if key is not None:
+                self._warm[i].add(key)
+            return i
+
+    def _task_done(self, i):
+        with self._workers_lock:
+            self._pending[i] -= 1
+
+    def _submit(self, key, func, *args, **kwargs) -> Future:
+        i = self._choose_worker(key)
+        future = self._workers[i].submit(func, *args, **kwargs)
+        future.add_done_callback(lambda _: self._task_done(i))
+        return future
+
+    @staticmethod
+    def _affinity_key(app_drop):
+        # Apps running the same function (or class) find it already imported
+        key = getattr(app_drop, "func_key", None)
+        if key is None:
+            cls = type(app_drop)
+            key = f"{cls.__module__}.{cls.__qualname__}"
+        return key
+
     def run_drop(self, app_drop: AppDROP):
         inputs_proxy_info, outputs_proxy_info = NodeManagerProcessDropRunner._get_proxy_infos(app_drop)
 
@@ -179,29 +274,126 @@ class NodeManagerProcessDropRunner(NodeManagerDropRunner):
         copied_drop._inputs = collections.OrderedDict()
         copied_drop._outputs = collections.OrderedDict()
 
-        return self._process_pool.submit(
-            NodeManagerProcessDropRunner._run_app_drop,
+        key = self._affinity_key(app_drop)
+        if self._memory_manager is None:
+            return self._submit(
+                key,
+                NodeManagerProcessDropRunner._run_app_drop,
+                copied_drop, inputs_proxy_info, outputs_proxy_info,
+            )
+
+        inputs_proxy_info = [
+            self._input_proxy_info(drop, info)
+            for drop, info in zip(app_drop.inputs, inputs_proxy_info)
+        ]
+        outputs_proxy_info = [
+            self._output_proxy_info(drop, info)
+            for drop, info in zip(app_drop.outputs, outputs_proxy_info)
+        ]
+        future = self._submit(
+            key,
+            NodeManagerProcessDropRunner._run_app_drop_with_shared_memory,
             copied_drop, inputs_proxy_info, outputs_proxy_info,
         )
+        shared_inputs = [
+            drop
+            for drop, info in zip(app_drop.inputs, inputs_proxy_info)
+            if isinstance(info, SharedMemoryProxyInfo)
+        ]
+        return self._commit_pool.submit(
+            self._commit_outputs, future, app_drop, shared_inputs, outputs_proxy_info
+        )
+
+    def _input_proxy_info(self, drop, info):
+        # Workers have the drop exported into shared memory when they first read it
+        if isinstance(drop, DataDROP) and drop.status == DROPStates.COMPLETED:
+            return SharedMemoryProxyInfo(*dataclasses.astuple(info))
+        return info
+
+    def _output_proxy_info(self, drop, info):
+        # Streaming consumers need to see the data as it is written
+        if isinstance(drop, DataDROP) and not drop.streamingConsumers:
+            name = self._memory_manager.create_block(drop._dlg_session_id)
+            return SharedMemoryProxyInfo(*dataclasses.astuple(info), name)
+        return info
+
+    def _release_inputs(self, app_drop, shared_inputs):
+        for drop in shared_inputs:
+            # Consumers living in other nodes don't read our shared memory
+            consumers = {
+                c.uid for c in drop.consumers if not isinstance(c, rpc.DropProxy)
+            }
+            self._memory_manager.consumer_finished(drop, app_drop.uid, consumers)
+
+    def _commit_outputs(self, future, app_drop, shared_inputs, outputs_proxy_info):
+        outputs = {o.uid: o for o in app_drop.outputs}
+        pending = {
+            info.uid: info
+            for info in outputs_proxy_info
+            if isinstance(info, SharedMemoryProxyInfo)
+        }
+        try:
+            try:
+                result, sizes = future.result()
+            finally:
+                self._release_inputs(app_drop, shared_inputs)
+            for uid in list(pending):
+                info = pending.pop(uid)
+                self._memory_manager.commit_block(
+                    outputs[uid], info.block_name, sizes[uid]
+                )
+            return result
+        finally:
+            # Blocks of failed apps are never committed
+            for info in pending.values():
+                self._memory_manager.release_block(info.session_id, info.block_name)
+
+    def submit(self, func, *args, **kwargs) -> Future:
+        return self._submit(None, func, *args, **kwargs)
 
     @classmethod
     def _run_app_drop(cls, app_drop, inputs_proxy_info, outputs_proxy_info):
         cls._setup_drop_proxies(app_drop, inputs_proxy_info, outputs_proxy_info)
         return app_drop.run()
 
+    @classmethod
+    def _run_app_drop_with_shared_memory(
+        cls, app_drop, inputs_proxy_info, outputs_proxy_info
+    ):
+        cls._setup_drop_proxies(app_drop, inputs_proxy_info, outputs_proxy_info)
+        proxies = [
+            p
+            for p in app_drop.inputs + app_drop.outputs
+            if isinstance(p, SharedMemoryDropProxy)
+        ]
+        try:
+            result = app_drop.run()
+            # The NodeManager needs to know how much was written to each block
+            sizes = {
+                o.uid: o.size
+                for o in app_drop.outputs
+                if isinstance(o, SharedMemoryDropProxy)
+            }
+            return result, sizes
+        finally:
+            for proxy in proxies:
+                proxy.release()
+
     @classmethod
     def _setup_drop_proxies(
         cls, app_drop: AppDROP, inputs_proxy_info, outputs_proxy_info
     ):
         app_drop._rpc_endpoint = cls._rpc_endpoint
         for input_proxy_info in inputs_proxy_info:
-            app_drop.addInput(
-                rpc.DropProxy(cls._rpc_client, input_proxy_info), back=False
-            )
+            app_drop.addInput(cls._drop_proxy(input_proxy_info), back=False)
         for output_proxy_info in outputs_proxy_info:
-            app_drop.addOutput(
-                rpc.DropProxy(cls._rpc_client, output_proxy_info), back=False
-            )
+            app_drop.addOutput(cls._drop_proxy(output_proxy_info), back=False)
+
+    @classmethod
+    def _drop_proxy(cls, proxy_info):
+        if isinstance(proxy_info, SharedMemoryProxyInfo):
+            return SharedMemoryDropProxy(cls._rpc_client, proxy_info)
+        return rpc.DropProxy(cls._rpc_client, proxy_info)
 
     @classmethod
     def _get_proxy_infos(cls, app_drop):
@@ -210,7 +402,10 @@ class NodeManagerProcessDropRunner(NodeManagerDropRunner):
         return inputs, outputs
 
     def close(self):
-        self._process_pool.shutdown(wait=True)
+        for worker in self._workers:
+            worker.shutdown(wait=True)
+        if self._commit_pool:
+            self._commit_pool.shutdown(wait=True)
         logger.info("Process pool closed")
 
 
@@ -235,20 +430,42 @@ class NodeManagerBase(DROPManager):
         dlm_check_period=0,
         dlm_cleanup_period=0,
         dlm_enable_replication=False,
+        dlm_spill_period=0,
+        dlm_spill_threshold=0.9,
+        dlm_registry=None,
+        dlm_registry_module="sqlite3",
+        dlm_registry_flush_period=1,
         dlgPath=None,
         error_listener=None,
         event_listeners=[],
         max_threads=0,
         use_processes=False,
+        use_shared_memory=False,
+        preload_modules=(),
         logdir=utils.getDlgLogsDir(),
+        max_dispatch_threads=0,
+        event_coalescing_period=0,
+        graph_creation_workers=1,
     ):
+        drop_registry = None
+        if dlm_registry:
+            drop_registry = RDBMSRegistry(
+                dlm_registry_module,
+                dlm_registry,
+                flush_period=dlm_registry_flush_period,
+            )
         self._dlm = DataLifecycleManager(
             check_period=dlm_check_period,
             cleanup_period=dlm_cleanup_period,
             enable_drop_replication=dlm_enable_replication,
+            event_coalescing_period=event_coalescing_period,
+            spill_period=dlm_spill_period,
+            spill_threshold=dlm_spill_threshold,
+            drop_registry=drop_registry,
         )
         self._sessions = {}
         self.logdir = logdir
+        self.graph_creation_workers = graph_creation_workers
 
         # dlgPath may contain code added by the user with possible
         # DROP applications
@@ -280,22 +497,44 @@ class NodeManagerBase(DROPManager):
 
         self._drop_runner: NodeManagerDropRunner
         if use_processes:
-            self._drop_runner = NodeManagerProcessDropRunner(max_threads)
+            memory_manager = None
+            if use_shared_memory:
+                self._memoryManager = memory_manager = DlgSharedMemoryManager()
+            self._drop_runner = NodeManagerProcessDropRunner(
+                max_threads, memory_manager, preload_modules
+            )
         else:
             self._drop_runner = NodeManagerThreadDropRunner(max_threads)
 
+        # Apps that become ready are queued here, critical-path first, and
+        # only as many as the drop runner can run are dispatched at once
+        if max_dispatch_threads <= 0:
+            max_dispatch_threads = max_threads
+        self._dispatcher = ReadyQueueDispatcher(max_dispatch_threads)
+
         # Event handler that only logs status changes
         debugging = logger.isEnabledFor(logging.DEBUG)
         self._logging_event_listener = LogEvtListener() if debugging else None
+        if debugging and event_coalescing_period > 0:
+            self._logging_event_listener = CoalescingEventHandler(
+                self._logging_event_listener, event_coalescing_period
+            )
 
     def start(self, rpc_endpoint):
         super().start()
         self._drop_runner.start(rpc_endpoint)
         self._dlm.startup()
+        if isinstance(self._logging_event_listener, CoalescingEventHandler):
+            self._logging_event_listener.start()
 
     def shutdown(self):
         self._dlm.cleanup()
+        self._dispatcher.shutdown()
         self._drop_runner.close()
+        if hasattr(self, "_memoryManager"):
+            self._memoryManager.shutdown_all()
+        if isinstance(self._logging_event_listener, CoalescingEventHandler):
+            self._logging_event_listener.stop()
         super().shutdown()
 
     def deliver_event(self, evt):
@@ -340,10 +579,26 @@ class NodeManagerBase(DROPManager):
         self._check_session_id(sessionId)
         self._sessions[sessionId].addGraphSpec(graphSpec)
 
+    def addGraphSpecStream(self, sessionId, dropSpecs):
+        self._check_session_id(sessionId)
+        self._sessions[sessionId].addGraphSpecStream(dropSpecs)
+
     def getGraphStatus(self, sessionId):
         self._check_session_id(sessionId)
         return self._sessions[sessionId].getGraphStatus()
 
+    def getGraphStatusSummary(self, sessionId):
+        self._check_session_id(sessionId)
+        return self._sessions[sessionId].getGraphStatusSummary()
+
+    def getGraphStatusChanges(
+        self, sessionId, since=None, status=None, node=None, lg_key=None
+    ):
+        self._check_session_id(sessionId)
+        return self._sessions[sessionId].getGraphStatusChanges(
+            since or 0, status, node, lg_key
+        )
+
     def getGraph(self, sessionId):
         self._check_session_id(sessionId)
         #  TODO: Ensure returns reproducibility data.
@@ -352,6 +607,9 @@ class NodeManagerBase(DROPManager):
     def getLogDir(self):
         return self.logdir
 
+    def getDispatchStats(self):
+        return self._dispatcher.stats()
+
     def deploySession(self, sessionId, completedDrops=[]):
         self._check_session_id(sessionId)
         session = self._sessions[sessionId]
@@ -361,6 +619,8 @@ class NodeManagerBase(DROPManager):
         def foreach(drop):
             drop.autofill_environment_variables()
             drop._drop_runner = self._drop_runner
+            if isinstance(drop, AppDROP):
+                drop._dispatcher = self._dispatcher
             self._dlm.addDrop(drop)
 
             # Remote event forwarding
@@ -451,6 +711,31 @@ class NodeManagerBase(DROPManager):
         self._check_session_id(sessionId)
         return self._sessions[sessionId].call_drop(uid, method, *args)
 
+    def get_drop_methods(self, sessionId, uid):
+        self._check_session_id(sessionId)
+        return self._sessions[sessionId].get_drop_methods(uid)
+
+    def read_drop_data(self, sessionId, uid, descriptor, count):
+        self._check_session_id(sessionId)
+        return self._sessions[sessionId].read_drop_data(uid, descriptor, count)
+
+    def get_drop_data(self, sessionId, uid, offset=0, count=-1):
+        self._check_session_id(sessionId)
+        return self._sessions[sessionId].get_drop_data(uid, offset, count)
+
+    def export_drop_data(self, sessionId, uid):
+        """
+        Exports the data of a drop into a shared memory block for the worker
+        processes running its consumers
+        """
+        self._check_session_id(sessionId)
+        if not hasattr(self, "_memoryManager"):
+            raise DaliugeException("Shared memory is not used by this NodeManager")
+        drops = self._sessions[sessionId].drops
+        if uid not in drops:
+            raise NoDropException(uid)
+        return self._memoryManager.export_drop(drops[uid])
+
 
 class ZMQPubSubMixIn(object):
     """
@@ -468,6 +753,10 @@ class ZMQPubSubMixIn(object):
     Queue object (self._subscriptions), enabling any local thread to indicate a
     new peer to subscribe to in a thread-safe manner.
 
+    None of these threads busy-wait: queues are read with blocking calls, and
+    the reception thread polls its sockets together with a pipe that is written
+    to whenever a new subscription is queued or the mixin is shut down.
+
     Note that we investigated not using Queue objects to communicate between
     threads, and use inproc:// ZeroMQ sockets instead. This works, but at a
     cost: all threads putting values into these sockets would need to check,
@@ -482,6 +771,9 @@ class ZMQPubSubMixIn(object):
         "subscription", "endpoint finished_evt"
     )
 
+    # Maximum number of events sent together in a single message
+    max_event_batch = 1000
+
     def __init__(self, host, events_port):
         self._events_host = host
         self._events_port = events_port
@@ -493,6 +785,10 @@ class ZMQPubSubMixIn(object):
         self._events_out = queue.Queue()
         self._subscriptions = queue.Queue()
 
+        # Wakes up the event receiver thread, which otherwise blocks waiting for
+        # ZeroMQ messages, when there are new subscriptions or on shutdown
+        self._recv_wakeup_r, self._recv_wakeup_w = os.pipe()
+
         # Starts background threads, but wait until their sockets are created
         timeout = 30
         self._event_publisher = self._start_thread(
@@ -516,12 +812,20 @@ class ZMQPubSubMixIn(object):
             )
         return t
 
+    def _wakeup_receiver(self):
+        os.write(self._recv_wakeup_w, b"x")
+
     def shutdown(self):
         super(ZMQPubSubMixIn, self).shutdown()
         self._pubsub_running = False
+        self._events_in.put(None)
+        self._events_out.put(None)
+        self._wakeup_receiver()
         self._event_deliverer.join()
         self._event_publisher.join()
         self._event_receiver.join()
+        os.close(self._recv_wakeup_r)
+        os.close(self._recv_wakeup_w)
         logger.info("ZeroMQ event publisher/subscriber finished")
 
     def publish_event(self, evt):
@@ -534,6 +838,7 @@ class ZMQPubSubMixIn(object):
         self._subscriptions.put(
             ZMQPubSubMixIn.subscription(endpoint, finished_evt)
         )
+        self._wakeup_receiver()
         if not finished_evt.wait(timeout):
             raise DaliugeException(
                 "ZMQ subscription not achieved within %d seconds" % (timeout,)
@@ -553,32 +858,29 @@ class ZMQPubSubMixIn(object):
         logger.info("Publishing events via ZeroMQ on %s", endpoint)
         sock_created.set()
 
-        while self._pubsub_running:
-            try:
-                obj = self._events_out.get_nowait()
-            except queue.Empty:
-                time.sleep(0.01)
-                continue
-
-            while self._pubsub_running:
+        # Block until there are events, then send all those that are queued
+        # (up to max_event_batch) in a single message. A None marks the end
+        finished = False
+        while not finished:
+            batch = [self._events_out.get()]
+            while len(batch) < self.max_event_batch:
                 try:
-                    pub.send_pyobj(
-                        obj, flags=zmq.NOBLOCK
-                    )  # @UndefinedVariable
+                    batch.append(self._events_out.get_nowait())
+                except queue.Empty:
                     break
-                except zmq.error.Again:
-                    logger.debug("Got an 'Again' when publishing event")
-                    time.sleep(0.01)
-                    continue
+            finished = None in batch
+            events = [evt for evt in batch if evt is not None]
+            if events:
+                pub.send_pyobj(events)
         pub.close()
 
     def _deliver_events(self):
-        while self._pubsub_running:
-            try:
-                evt = self._events_in.get_nowait()
+        while True:
+            events = self._events_in.get()
+            if events is None:
+                break
+            for evt in events:
                 self.deliver_event(evt)
-            except queue.Empty:
-                time.sleep(0.01)
 
     def _receive_events(self, sock_created):
         import zmq
@@ -588,50 +890,66 @@ class ZMQPubSubMixIn(object):
         sub_endpoints = set()
         sub.setsockopt(zmq.SUBSCRIBE, b"")  # @UndefinedVariable
         sub_monitor = sub.get_monitor_socket()
+        poller = zmq.Poller()
+        poller.register(sub, zmq.POLLIN)
+        poller.register(sub_monitor, zmq.POLLIN)
+        poller.register(self._recv_wakeup_r, zmq.POLLIN)
         sock_created.set()
 
         pending_connections = {}
         while self._pubsub_running:
-            # A new subscription has been requested
-            try:
-                subscription = self._subscriptions.get_nowait()
-                if subscription.endpoint in sub_endpoints:
-                    subscription.finished_evt.set()
-                else:
-                    sub.connect(subscription.endpoint)
-                    pending_connections[
-                        subscription.endpoint
-                    ] = subscription.finished_evt
-            except queue.Empty:
-                pass
-
-            try:
-                msg = recv_monitor_message(sub_monitor, flags=zmq.NOBLOCK)
-                if msg["event"] != zmq.EVENT_CONNECTED:
-                    continue
-                endpoint = utils.b2s(msg["endpoint"])
-                sub_endpoints.add(endpoint)
-                finished_evt = pending_connections.pop(endpoint)
-                finished_evt.set()
-            except zmq.error.Again:
-                pass
-
-            try:
-                evt = sub.recv_pyobj(flags=zmq.NOBLOCK)  # @UndefinedVariable
-                self._events_in.put(evt)
-            except zmq.error.Again:
-                time.sleep(0.01)
-            except Exception:
-                # Figure out what to do here
-                logger.exception(
-                    "Something bad happened in %s:%d to ZMQ :'(",
-                    self._events_host,
-                    self._events_port,
-                )
-                break
+            ready = dict(poller.poll())
+
+            # New subscriptions have been requested
+            if self._recv_wakeup_r in ready:
+                os.read(self._recv_wakeup_r, 4096)
+                while True:
+                    try:
+                        subscription = self._subscriptions.get_nowait()
+                    except queue.Empty:
+                        break
+                    if subscription.endpoint in sub_endpoints:
+                        subscription.finished_evt.set()
+                    else:
+                        sub.connect(subscription.endpoint)
+                        pending_connections[
+                            subscription.endpoint
+                        ] = subscription.finished_evt
+
+            if sub_monitor in ready:
+                while True:
+                    try:
+                        msg = recv_monitor_message(sub_monitor, flags=zmq.NOBLOCK)
+                    except zmq.error.Again:
+                        break
+                    if msg["event"] != zmq.EVENT_CONNECTED:
+                        continue
+                    endpoint = utils.b2s(msg["endpoint"])
+                    sub_endpoints.add(endpoint)
+                    finished_evt = pending_connections.pop(endpoint, None)
+                    if finished_evt:
+                        finished_evt.set()
+
+            if sub in ready:
+                try:
+                    while True:
+                        events = sub.recv_pyobj(flags=zmq.NOBLOCK)
+                        if not isinstance(events, list):
+                            events = [events]
+                        self._events_in.put(events)
+                except zmq.error.Again:
+                    pass
+                except Exception:
+                    # Figure out what to do here
+                    logger.exception(
+                        "Something bad happened in %s:%d to ZMQ :'(",
+                        self._events_host,
+                        self._events_port,
+                    )
+                    break
 
         # Flush pending connection events to avoid callers hanging out forever
-        for evt in pending_connections:
+        for evt in pending_connections.values():
             evt.set()
 
         sub_monitor.close()
@@ -669,6 +987,10 @@ class NodeManager(NodeManagerBase, EventMixIn, RpcMixIn):
         self._context = RpcMixIn.create_context()
         super().start(self.rpc_endpoint)
 
+    def destroySession(self, sessionId):
+        super().destroySession(sessionId)
+        self.forget_drop_methods(sessionId)
+
     def shutdown(self):
         super(NodeManager, self).shutdown()
         self._context.term()
@@ -177,10 +177,22 @@ class ManagerRestServer(RestServer):
             "/api/sessions/<sessionId>/graph/status",
             callback=self.getGraphStatus,
         )
+        app.get(
+            "/api/sessions/<sessionId>/graph/status/summary",
+            callback=self.getGraphStatusSummary,
+        )
+        app.get(
+            "/api/sessions/<sessionId>/graph/status/changes",
+            callback=self.getGraphStatusChanges,
+        )
         app.post(
             "/api/sessions/<sessionId>/graph/append",
             callback=self.addGraphParts,
         )
+        app.post(
+            "/api/sessions/<sessionId>/graph/stream",
+            callback=self.addGraphPartsStream,
+        )
         app.get(
             "/api/sessions/<sessionId>/repro/data",
             callback=self.getSessionReproData,
@@ -325,9 +337,29 @@ class ManagerRestServer(RestServer):
     def getGraphStatus(self, sessionId):
         return self.dm.getGraphStatus(sessionId)
 
-    # TODO: addGraphParts v/s addGraphSpec
     @daliuge_aware
-    def addGraphParts(self, sessionId):
+    def getGraphStatusSummary(self, sessionId):
+        return self.dm.getGraphStatusSummary(sessionId)
+
+    @daliuge_aware
+    def getGraphStatusChanges(self, sessionId):
+        # "since" is the version returned by a previous call, other parameters
+        # are comma-separated lists of values to filter by
+        params = bottle.request.params
+        since = json.loads(params["since"]) if "since" in params else None
+        filters = {
+            name: params[name].split(",") if params.get(name) else None
+            for name in ("status", "node", "lg_key")
+        }
+        if filters["status"]:
+            filters["status"] = [int(s) for s in filters["status"]]
+        return self.dm.getGraphStatusChanges(sessionId, since, **filters)
+
+    def _graph_content(self):
+        """
+        Returns a stream with the (uncompressed) graph content of the current
+        request, or None if its content type is not supported
+        """
         # WARNING: TODO: Somehow, the content_type can be overwritten to 'text/plain'
         logger.debug("Graph content type: %s", bottle.request.content_type)
         if (
@@ -335,21 +367,39 @@ class ManagerRestServer(RestServer):
             and "text/plain" not in bottle.request.content_type
         ):
             bottle.response.status = 415
-            return
+            return None
 
         # We also accept gzipped content
         hdrs = bottle.request.headers
         logger.debug("Graph hdr: %s", {k: v for k, v in hdrs.items()})
         if hdrs.get("Content-Encoding", None) == "gzip":
-            json_content = utils.ZlibUncompressedStream(bottle.request.body)
-        else:
-            json_content = bottle.request.body
+            return utils.ZlibUncompressedStream(bottle.request.body)
+        return bottle.request.body
+
+    # TODO: addGraphParts v/s addGraphSpec
+    @daliuge_aware
+    def addGraphParts(self, sessionId):
+        json_content = self._graph_content()
+        if json_content is None:
+            return
 
         graph_parts = bottle.json_loads(json_content.read())
 
         return self.dm.addGraphSpec(sessionId, graph_parts)
         # return {"graph_parts": graph_parts}
 
+    @daliuge_aware
+    def addGraphPartsStream(self, sessionId):
+        # The (possibly chunked) body is decoded one DROP spec at a time while
+        # the manager consumes it, instead of being loaded as a whole
+        json_content = self._graph_content()
+        if json_content is None:
+            return
+
+        return self.dm.addGraphSpecStream(
+            sessionId, utils.JSONArrayReader(json_content)
+        )
+
     # ===========================================================================
     # non-REST methods
     # ===========================================================================
@@ -408,7 +458,7 @@ class NMRestServer(ManagerRestServer):
         # we currently return the sessionIds, more things might be added in the
         # future
         logger.debug("NM REST call: status")
-        return {"sessions": self.sessions()}
+        return {"sessions": self.sessions(), "dispatch": self.dm.getDispatchStats()}
 
     @daliuge_aware
     def getLogFile(self, sessionId):
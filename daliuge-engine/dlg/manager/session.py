@@ -25,6 +25,7 @@ Module containing the logic of a session -- a given graph execution
 
 import collections
 import inspect
+import itertools
 import json
 import logging
 import os
@@ -43,7 +44,6 @@ from .. import utils
 from ..common.reproducibility.constants import ReproducibilityFlags, ALL_RMODES
 from ..ddap_protocol import DROPLinkType, DROPRel, DROPStates
 from ..drop import (
-    AbstractDROP,
     LINKTYPE_1TON_APPEND_METHOD,
     LINKTYPE_1TON_BACK_APPEND_METHOD,
 )
@@ -69,22 +69,30 @@ class SessionStates:
     PRISTINE, BUILDING, DEPLOYING, RUNNING, FINISHED, CANCELLED = range(6)
 
 
+# DROPs still to be completed (or skipped) when a session finishes (or ends)
+_UNFINISHED_DROP_STATES = (DROPStates.INITIALIZED, DROPStates.WRITING)
+
+# DROPs left alone when a session is cancelled
+_FINAL_DROP_STATES = (DROPStates.ERROR, DROPStates.COMPLETED, DROPStates.CANCELLED)
+
+
 class LeavesCompletionListener(object):
     def __init__(self, leaves, session):
         self._session = session
         self._nexpected = len(leaves)
-        self._completed = 0
+        # next() on a count is atomic, so leaves completing concurrently on
+        # different threads each see a different number without locking
+        self._completed = itertools.count(1)
 
     def handleEvent(self, evt):
-        # TODO: be thread-safe
-        self._completed += 1
+        completed = next(self._completed)
         logger.debug(
             "%d/%d leaf drops completed on session %s",
-            self._completed,
+            completed,
             self._nexpected,
             self._session.sessionId,
         )
-        if self._completed == self._nexpected:
+        if completed == self._nexpected:
             self._session.finish()
 
 
@@ -130,6 +138,134 @@ class EndListener(object):
         self._session.end()
 
 
+class GraphStatusTracker(object):
+    """
+    Keeps track of the status (and execStatus) of the DROPs of a session as
+    their events arrive. On top of the status of each DROP it keeps the number
+    of DROPs in each status, overall and per node and lg_key, and the version
+    at which each DROP last changed, so summaries and the changes since a given
+    version can be obtained without traversing the graph. DROPs are also
+    indexed by their current status, so those in a given status can be found
+    without visiting the rest.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = 0
+        self._drops = {}  # oid -> [status, execStatus, node, lg_key]
+        self._changed = collections.OrderedDict()  # oid -> version, oldest first
+        self._status = collections.Counter()
+        self._execStatus = collections.Counter()
+        self._nodes = collections.defaultdict(collections.Counter)
+        self._lg_keys = collections.defaultdict(collections.Counter)
+        self._index = {}  # oid -> (position in which it was added, drop)
+        self._byStatus = collections.defaultdict(set)  # status -> oids
+
+    def _count(self, entry, delta):
+        status, execStatus, node, lg_key = entry
+        self._status[status] += delta
+        self._nodes[node][status] += delta
+        self._lg_keys[lg_key][status] += delta
+        if execStatus is not None:
+            self._execStatus[execStatus] += delta
+
+    def _update(self, oid, status=None, execStatus=None):
+        entry = self._drops.get(oid)
+        if entry is None:
+            return
+        self._count(entry, -1)
+        if status is not None:
+            self._byStatus[entry[0]].discard(oid)
+            self._byStatus[status].add(oid)
+            entry[0] = status
+        if execStatus is not None:
+            entry[1] = execStatus
+        self._count(entry, 1)
+        self._version += 1
+        self._changed[oid] = self._version
+        self._changed.move_to_end(oid)
+
+    def add(self, drop, node):
+        """Starts tracking `drop`, which is deployed in `node`"""
+        execStatus = drop.execStatus if isinstance(drop, AppDROP) else None
+        entry = [drop.status, execStatus, node, drop.lg_key]
+        with self._lock:
+            self._drops[drop.oid] = entry
+            self._index[drop.oid] = (len(self._index), drop)
+            self._byStatus[entry[0]].add(drop.oid)
+            self._count(entry, 1)
+            self._version += 1
+            self._changed[drop.oid] = self._version
+        drop.subscribe(self, "status")
+        if execStatus is not None:
+            drop.subscribe(self, "execStatus")
+
+    def handleEvent(self, evt):
+        with self._lock:
+            if evt.type == "status":
+                self._update(evt.oid, status=evt.status)
+            else:
+                self._update(evt.oid, execStatus=evt.execStatus)
+
+    def drops(self, statuses=None, exclude=()):
+        """
+        Returns the DROPs currently in one of the given `statuses` (any by
+        default) and not in any of the `exclude` ones, in the order in which
+        they were added
+        """
+        with self._lock:
+            if statuses is None:
+                statuses = self._byStatus.keys()
+            oids = [
+                oid
+                for status in statuses
+                if status not in exclude
+                for oid in self._byStatus.get(status, ())
+            ]
+            return [drop for _, drop in sorted(self._index[oid] for oid in oids)]
+
+    def summary(self):
+        """
+        Returns the current version, and the number of DROPs in each status,
+        overall and per node and lg_key
+        """
+        with self._lock:
+            return {
+                "version": self._version,
+                "total": len(self._drops),
+                "status": dict(+self._status),
+                "execStatus": dict(+self._execStatus),
+                "node": {k: dict(+c) for k, c in self._nodes.items() if +c},
+                "lg_key": {k: dict(+c) for k, c in self._lg_keys.items() if +c},
+            }
+
+    def changes(self, since=0, status=None, node=None, lg_key=None):
+        """
+        Returns the current version, and the status of the DROPs that changed
+        after version `since`, optionally only those with one of the given
+        `status`, `node` or `lg_key` values
+        """
+        status = set(status or ())
+        node = {str(n) for n in node or ()}
+        lg_key = {str(k) for k in lg_key or ()}
+        changes = {}
+        with self._lock:
+            for oid in reversed(self._changed):
+                if self._changed[oid] <= since:
+                    break
+                entry_status, execStatus, entry_node, entry_lg_key = self._drops[oid]
+                if (
+                    (status and entry_status not in status)
+                    or (node and str(entry_node) not in node)
+                    or (lg_key and str(entry_lg_key) not in lg_key)
+                ):
+                    continue
+                changes[oid] = {"status": entry_status}
+                if execStatus is not None:
+                    changes[oid]["execStatus"] = execStatus
+            return {"version": self._version, "changes": changes}
+
+
 track_current_session = utils.object_tracking("session")
 
 
@@ -163,6 +299,7 @@ class Session(object):
         self._drops = {}  # key: oid, value: actual drop object
         self._statusLock = threading.Lock()
         self._roots = []
+        self._leaves = []
         self._proxyinfo = []
         self._worker = None
         self._status = SessionStates.PRISTINE
@@ -171,6 +308,7 @@ class Session(object):
         self._dropsubs = {}
         self._graphreprodata = None
         self._reprofinished = False
+        self._statusTracker = GraphStatusTracker()
 
         # create the session directory and change CWD
         self._sessionDir = f"{utils.getDlgWorkDir()}/{sessionId}"
@@ -230,6 +368,10 @@ class Session(object):
     def roots(self):
         return self._roots
 
+    @property
+    def leaves(self):
+        return self._leaves
+
     @property
     def drops(self):
         return self._drops
@@ -277,14 +419,7 @@ class Session(object):
         uniquely identified by their OID at this point.
         """
 
-        status = self.status
-        if status not in (SessionStates.PRISTINE, SessionStates.BUILDING):
-            raise InvalidSessionState(
-                "Can't add graphs to this session since it isn't in the PRISTINE or BUILDING status: %d"
-                % (status)
-            )
-
-        self.status = SessionStates.BUILDING
+        self._startBuilding()
 
         # This will check the consistency of each dropSpec
         # logger.debug("Trying to add graphSpec: %s", [x.keys() for x in graphSpec])
@@ -301,6 +436,82 @@ class Session(object):
 
         logger.debug("Added a graph definition with %d DROPs", len(graphSpecDict))
 
+    @track_current_session
+    def addGraphSpecStream(self, dropSpecs, batch_size=1000):
+        """
+        Like `addGraphSpec`, but `dropSpecs` is an iterable (e.g., a
+        `JSONArrayReader` decoding a graph as it is uploaded) rather than a
+        list. DROP specifications are checked and added to the session in
+        batches of `batch_size` as they are consumed, so the whole graph spec
+        doesn't need to be held in memory in any other form. Like with
+        `addGraphSpec` the operation fails as a whole: if any DROP
+        specification is inconsistent, or if relationships point to DROPs
+        not found in `dropSpecs`, the DROPs already added by this call are
+        removed from the session again.
+        """
+        self._startBuilding()
+
+        addedOids = []
+        referencedOids = set()
+
+        def add_batch(batch):
+            graphSpecDict = {}
+            graph_loader.loadDropSpecBatch(
+                batch, graphSpecDict, referencedOids, offset=len(addedOids)
+            )
+            duplicates = graphSpecDict.keys() & self._graph.keys()
+            if duplicates:
+                raise InvalidGraphException(
+                    "Trying to add drops with OIDs that already exist: %r"
+                    % (duplicates,)
+                )
+            self._graph.update(graphSpecDict)
+            addedOids.extend(graphSpecDict)
+
+        # The last element could be the graph-wide reproducibility data, so
+        # we always keep one element back until the stream is exhausted
+        batch = []
+        last = None
+        try:
+            for dropSpec in dropSpecs:
+                if last is not None:
+                    batch.append(last)
+                    if len(batch) == batch_size:
+                        add_batch(batch)
+                        batch = []
+                last = dropSpec
+            if last is None:
+                raise InvalidGraphException("DropSpec is empty")
+            reprodata = None
+            if last.get("rmode"):
+                reprodata = last
+            else:
+                batch.append(last)
+            add_batch(batch)
+
+            missingOids = referencedOids.difference(addedOids)
+            if missingOids:
+                raise KeyError(
+                    "DROPs referenced but not found in the graph: %r" % (missingOids,)
+                )
+        except Exception:
+            for oid in addedOids:
+                del self._graph[oid]
+            raise
+
+        self._graphreprodata = reprodata
+        logger.debug("Added a graph definition with %d DROPs", len(addedOids))
+
+    def _startBuilding(self):
+        status = self.status
+        if status not in (SessionStates.PRISTINE, SessionStates.BUILDING):
+            raise InvalidSessionState(
+                "Can't add graphs to this session since it isn't in the PRISTINE or BUILDING status: %d"
+                % (status)
+            )
+
+        self.status = SessionStates.BUILDING
+
     @track_current_session
     def linkGraphParts(self, lhOID, rhOID, linkType, force=False):
         """
@@ -329,6 +540,15 @@ class Session(object):
 
         graph_loader.addLink(linkType, lhDropSpec, rhOID, force=force)
 
+    def _estimatedExecutionTime(self, drop):
+        if not isinstance(drop, AppDROP):
+            return 0
+        spec = self._graph.get(drop.oid, {})
+        try:
+            return float(spec.get("execution_time", spec.get("weight", 0)) or 0)
+        except (TypeError, ValueError):
+            return 0
+
     @track_current_session
     def deploy(self, completedDrops=[], event_listeners=[], foreach=None):
         """
@@ -369,7 +589,9 @@ class Session(object):
         logger.info("Creating DROPs for session %s", self._sessionId)
 
         self._roots = graph_loader.createGraphFromDropSpecList(
-            self._graph.values(), session=self
+            self._graph.values(),
+            session=self,
+            max_workers=self._nm.graph_creation_workers if self._nm else 1,
         )
         logger.info("%d drops successfully created", len(self._graph))
 
@@ -393,11 +615,20 @@ class Session(object):
                 drop.subscribe(l)
             #  Register each drop for reproducibility listening
             drop.subscribe(repro_listener, "reproducibility")
+            self._statusTracker.add(drop, self._graph.get(drop.oid, {}).get("node"))
 
         logger.info("Stored all drops, proceeding with further customization")
 
+        # Apps on the critical path are dispatched first once they are ready
+        path_lengths = droputils.getCriticalPathLengths(
+            self._roots, self._estimatedExecutionTime
+        )
+        for drop in self._drops.values():
+            if isinstance(drop, AppDROP):
+                drop._dispatch_priority = path_lengths.get(drop.uid, 0)
+
         # Add listeners that will move the session to FINISHED state
-        leaves = droputils.getLeafNodes(self._roots)
+        self._leaves = leaves = droputils.getLeafNodes(self._roots)
         logger.info("Adding completion listener to leaf drops")
 
         # The leaves completion listener will trigger session completed
@@ -420,7 +651,7 @@ class Session(object):
         # Foreach
         if foreach:
             logger.info("Invoking 'foreach' on each drop")
-            for drop, _ in droputils.breadFirstTraverse(self._roots):
+            for drop in self._drops.values():
                 foreach(drop)
             logger.info("'foreach' invoked for each drop")
 
@@ -459,10 +690,8 @@ class Session(object):
         self.finish()
 
     def trigger_drops(self, uids):
-        for drop, downStreamDrops in droputils.breadFirstTraverse(self._roots):
-            downStreamDrops[:] = [
-                dsDrop for dsDrop in downStreamDrops if isinstance(dsDrop, AbstractDROP)
-            ]
+        uids = set(uids)
+        for drop in self._drops.values():
             if drop.uid in uids:
                 if isinstance(drop, InputFiredAppDROP):
                     drop.async_execute()
@@ -567,25 +796,20 @@ class Session(object):
     def finish(self):
         self.status = SessionStates.FINISHED
         logger.info("Session %s finished", self._sessionId)
-        for drop, downStreamDrops in droputils.breadFirstTraverse(self._roots):
-            downStreamDrops[:] = [
-                dsDrop for dsDrop in downStreamDrops if isinstance(dsDrop, AbstractDROP)
-            ]
-            if drop.status in (DROPStates.INITIALIZED, DROPStates.WRITING):
+        for drop in self._statusTracker.drops(_UNFINISHED_DROP_STATES):
+            # It might have moved on since the index was consulted
+            if drop.status in _UNFINISHED_DROP_STATES:
                 drop.setCompleted()
 
     @track_current_session
     def end(self):
         self.status = SessionStates.FINISHED
         logger.info("Session %s ended", self._sessionId)
-        for drop, downStreamDrops in droputils.breadFirstTraverse(self._roots):
-            downStreamDrops[:] = [
-                dsDrop for dsDrop in downStreamDrops if isinstance(dsDrop, AbstractDROP)
-            ]
-            if drop.status in (DROPStates.INITIALIZED, DROPStates.WRITING):
+        for drop in self._statusTracker.drops(_UNFINISHED_DROP_STATES):
+            if drop.status in _UNFINISHED_DROP_STATES:
                 drop.skip()
 
-    def getGraphStatus(self):
+    def _checkGraphStatusAvailable(self):
         if self.status not in (
             SessionStates.RUNNING,
             SessionStates.FINISHED,
@@ -595,17 +819,31 @@ class Session(object):
                 "The session is currently not running, cannot get graph status"
             )
 
-        # We shouldn't traverse the full graph because there might be nodes
-        # attached to our DROPs that are actually part of other DM (and have been
-        # wired together by the DIM after deploying each individual graph on
-        # each of the DMs).
-        # We recognize such nodes because they are actually not an instance of
-        # AbstractDROP (they are DropProxy instances).
+    def getGraphStatusSummary(self):
+        """
+        Returns the number of DROPs of this session in each status, overall and
+        per node and lg_key, together with the version of the graph status
+        """
+        self._checkGraphStatusAvailable()
+        return self._statusTracker.summary()
+
+    def getGraphStatusChanges(self, since=0, status=None, node=None, lg_key=None):
+        """
+        Returns the status of the DROPs of this session that changed after
+        version `since` of the graph status (all DROPs by default), together
+        with the current version. DROPs can be further filtered by the given
+        lists of `status`, `node` and `lg_key` values.
+        """
+        self._checkGraphStatusAvailable()
+        return self._statusTracker.changes(since, status, node, lg_key)
+
+    def getGraphStatus(self):
+        self._checkGraphStatusAvailable()
+
+        # Only our own DROPs are reported, not the DropProxy instances attached
+        # to them that point to DROPs living in other DMs
         statusDict = collections.defaultdict(dict)
-        for drop, downStreamDrops in droputils.breadFirstTraverse(self._roots):
-            downStreamDrops[:] = [
-                dsDrop for dsDrop in downStreamDrops if isinstance(dsDrop, AbstractDROP)
-            ]
+        for drop in self._drops.values():
             if isinstance(drop, AppDROP):
                 statusDict[drop.oid]["execStatus"] = drop.execStatus
             statusDict[drop.oid]["status"] = drop.status
@@ -619,15 +857,8 @@ class Session(object):
             raise InvalidSessionState(
                 "Can't cancel this session in its current status: %d" % (status)
             )
-        for drop, downStreamDrops in droputils.breadFirstTraverse(self._roots):
-            downStreamDrops[:] = [
-                dsDrop for dsDrop in downStreamDrops if isinstance(dsDrop, AbstractDROP)
-            ]
-            if drop.status not in (
-                DROPStates.ERROR,
-                DROPStates.COMPLETED,
-                DROPStates.CANCELLED,
-            ):
+        for drop in self._statusTracker.drops(exclude=_FINAL_DROP_STATES):
+            if drop.status not in _FINAL_DROP_STATES:
                 drop.cancel()
         self.status = SessionStates.CANCELLED
         logger.info("Session %s cancelled", self._sessionId)
@@ -653,6 +884,68 @@ class Session(object):
         except AttributeError:
             return False
 
+    def get_drop_methods(self, uid):
+        """
+        Returns the names of the public methods of the given drop. Clients
+        can cache this to tell methods from properties without a round trip
+        """
+        if uid not in self._drops:
+            raise NoDropException(uid)
+        cls = type(self._drops[uid])
+        return [
+            name
+            for name in dir(cls)
+            if not name.startswith("_")
+            and inspect.isroutine(inspect.getattr_static(cls, name))
+        ]
+
+    def read_drop_data(self, uid, descriptor, count):
+        """
+        Reads up to `count` bytes from the given descriptor of a drop,
+        previously obtained via `open`. Unlike a single `read` call, this
+        method keeps reading until `count` bytes are collected or the end of
+        the data is reached, so callers get large frames back.
+        """
+        if uid not in self._drops:
+            raise NoDropException(uid)
+        drop = self._drops[uid]
+        frames = []
+        remaining = count
+        while remaining > 0:
+            data = drop.read(descriptor, remaining)
+            if not data:
+                break
+            frames.append(bytes(data))
+            remaining -= len(data)
+        return b"".join(frames)
+
+    def get_drop_data(self, uid, offset=0, count=-1):
+        """
+        Returns the bytes of the given drop, starting at `offset`, and up to
+        `count` bytes (or until the end of the data if `count` is negative).
+        """
+        if uid not in self._drops:
+            raise NoDropException(uid)
+        drop = self._drops[uid]
+        desc = drop.open()
+        try:
+            while offset > 0:
+                skipped = drop.read(desc, min(offset, 4 * 1024**2))
+                if not skipped:
+                    return b""
+                offset -= len(skipped)
+            if count < 0:
+                frames = []
+                while True:
+                    data = drop.read(desc, 4 * 1024**2)
+                    if not data:
+                        break
+                    frames.append(bytes(data))
+                return b"".join(frames)
+            return self.read_drop_data(uid, desc, count)
+        finally:
+            drop.close(desc)
+
     def get_drop_property(self, uid, prop_name):
         if uid not in self._drops:
             raise NoDropException(uid)
@@ -22,9 +22,20 @@
 
 """
 Module contains shared memory manager which handles shared memory for a multi-threaded NodeManager.
+
+It also implements the shared memory data plane used when app drops run in worker processes: the
+data of drops local to the node is exchanged with the workers through shared memory blocks, while
+only control calls travel over RPC.
 """
+import dataclasses
+import itertools
 import logging
+import threading
+import typing
+from concurrent.futures import Future
 
+from dlg import rpc
+from dlg.data.io import DataIO, OpenMode
 from dlg.shared_memory import DlgSharedMemory
 
 LOGGER = logging.getLogger(__name__)
@@ -49,6 +60,11 @@ class DlgSharedMemoryManager:
 
     def __init__(self):
         self.drop_names = {}
+        # Blocks used to exchange drop data with worker processes
+        self._blocks_lock = threading.Lock()
+        self._session_blocks = {}  # session_id -> set of block names
+        self._exported = {}  # (session_id, uid) -> Future with (block name, size)
+        self._finished_consumers = {}  # (session_id, uid) -> set of consumer uids
 
     def register_session(self, name):
         """
@@ -73,11 +89,13 @@ class DlgSharedMemoryManager:
         if session_id in self.drop_names.keys():
             for drop in self.drop_names[session_id]:
                 _cleanup_block(session_id, drop)
+        self._release_session_blocks(session_id)
 
     def destroy_session(self, session_id):
         if session_id in self.drop_names.keys():
             for drop in self.drop_names[session_id]:
                 _cleanup_block(session_id, drop)
+        self._release_session_blocks(session_id)
 
     def shutdown_all(self):
         """
@@ -86,7 +104,245 @@ class DlgSharedMemoryManager:
         for session_id in self.drop_names:
             self.destroy_session(session_id)
         self.drop_names = {}
+        for session_id in list(self._session_blocks):
+            self._release_session_blocks(session_id)
 
     def __del__(self):
-        if len(self.drop_names) > 0:
+        if len(self.drop_names) > 0 or self._session_blocks:
             self.shutdown_all()
+
+    def _track_block(self, session_id, name):
+        with self._blocks_lock:
+            self._session_blocks.setdefault(str(session_id), set()).add(name)
+
+    def _release_session_blocks(self, session_id):
+        with self._blocks_lock:
+            names = self._session_blocks.pop(str(session_id), ())
+            self._exported = {
+                k: v for k, v in self._exported.items() if k[0] != str(session_id)
+            }
+            self._finished_consumers = {
+                k: v
+                for k, v in self._finished_consumers.items()
+                if k[0] != str(session_id)
+            }
+        for name in names:
+            _unlink_block(name)
+
+    def export_drop(self, drop):
+        """
+        Copies the contents of `drop` into a shared memory block so worker
+        processes can read them without going through RPC, and returns the
+        name of the block and the size of the data. Drops are exported only
+        once, until all their consumers are finished (see `consumer_finished`)
+        or the session is destroyed.
+        """
+        key = (str(drop._dlg_session_id), drop.uid)
+        with self._blocks_lock:
+            export = self._exported.get(key)
+            exporting = export is None
+            if exporting:
+                export = self._exported[key] = Future()
+        if not exporting:
+            return export.result()
+
+        # Other exports and releases don't wait for the copy
+        try:
+            data = memoryview(drop.buffer()).cast("B")
+            size = data.nbytes
+            block = DlgSharedMemory(None, max(size, 1))
+            try:
+                block.buf[:size] = data
+            finally:
+                data.release()
+                block.close()
+            self._track_block(drop._dlg_session_id, block.name)
+        except Exception as e:
+            with self._blocks_lock:
+                self._exported.pop(key, None)
+            export.set_exception(e)
+            raise
+        export.set_result((block.name, size))
+        return block.name, size
+
+    def consumer_finished(
+        self, drop, consumer_uid, consumer_uids: typing.AbstractSet[str]
+    ):
+        """
+        Records that `consumer_uid`, out of the `consumer_uids` that read `drop`
+        through shared memory, finished. Once all of them are, the block the
+        drop was exported into (if any) is released.
+        """
+        key = (str(drop._dlg_session_id), drop.uid)
+        with self._blocks_lock:
+            finished = self._finished_consumers.setdefault(key, set())
+            finished.add(consumer_uid)
+            if not finished >= consumer_uids:
+                return
+            del self._finished_consumers[key]
+            export = self._exported.pop(key, None)
+        if export is not None and export.done() and not export.exception():
+            name, _ = export.result()
+            self.release_block(drop._dlg_session_id, name)
+
+    def create_block(self, session_id):
+        """
+        Creates an empty shared memory block for a worker process to write
+        into, and returns its name
+        """
+        block = DlgSharedMemory(None)
+        block.close()
+        self._track_block(session_id, block.name)
+        return block.name
+
+    def commit_block(self, drop, name, size):
+        """
+        Writes the first `size` bytes of the given block into `drop`, then
+        unlinks the block
+        """
+        block = DlgSharedMemory(name)
+        try:
+            if size:
+                data = block.buf[:size]
+                try:
+                    drop.write(data)
+                finally:
+                    data.release()
+        finally:
+            block.close()
+            self.release_block(drop._dlg_session_id, name)
+
+    def release_block(self, session_id, name):
+        """Unlinks a block created with `create_block`"""
+        with self._blocks_lock:
+            self._session_blocks.get(str(session_id), set()).discard(name)
+        _unlink_block(name)
+
+
+def _unlink_block(name):
+    mem = DlgSharedMemory(name)
+    mem.close()
+    mem.unlink()
+
+
+@dataclasses.dataclass(frozen=True)
+class SharedMemoryProxyInfo(rpc.ProxyInfo):
+    """
+    Information needed to create a SharedMemoryDropProxy: on top of a regular
+    proxy it carries the name of the block the drop's data is written into.
+    Drops being read have no block until they are first read, when they are
+    exported into one.
+    """
+
+    block_name: typing.Optional[str] = None
+
+
+class SharedMemoryBlockIO(DataIO):
+    """
+    A DataIO over a shared memory block owned by a SharedMemoryDropProxy.
+    Reads return zero-copy views of the block, writes are appended to it.
+    """
+
+    def __init__(self, proxy):
+        super().__init__()
+        self._proxy = proxy
+        self._pos = 0
+
+    def _open(self, **kwargs):
+        self._pos = 0
+        return self._proxy.block
+
+    def _read(self, count=65536, **kwargs):
+        size = self._proxy.size
+        end = size if count < 0 else min(self._pos + count, size)
+        data = self._desc.buf[self._pos : end].toreadonly()
+        self._pos = end
+        return data
+
+    def _write(self, data, **kwargs) -> int:
+        return self._proxy.write(data)
+
+    def _close(self, **kwargs):
+        pass
+
+    def _size(self, **kwargs) -> int:
+        return self._proxy.size
+
+    def exists(self) -> bool:
+        return True
+
+    def delete(self):
+        pass
+
+    def buffer(self) -> memoryview:
+        return self._proxy.buffer()
+
+
+class SharedMemoryDropProxy(rpc.DropProxy):
+    """
+    A DropProxy whose data lives in a shared memory block instead of being
+    transferred over RPC. Inputs are read straight from the block the
+    NodeManager exports them into when they are first read, and writes to
+    outputs are appended to a block the NodeManager commits into the actual
+    drop once the application finishes. Everything else is still forwarded
+    through RPC.
+    """
+
+    def __init__(self, rpc_client, proxy_info: SharedMemoryProxyInfo):
+        super().__init__(rpc_client, proxy_info)
+        self._block = None
+        self._ios = {}
+        self._descriptors = itertools.count()
+
+    @property
+    def block(self) -> DlgSharedMemory:
+        """The block with the data of the drop"""
+        if self._block is None:
+            name, size = self._proxy_info.block_name, 0
+            if name is None:
+                name, size = self.rpc_client.export_remote_drop_data(
+                    *self._remote_args()
+                )
+            block = DlgSharedMemory(name)
+            # The block of an output is created empty but with some capacity
+            block.truncate(size)
+            self._block = block
+        return self._block
+
+    @property
+    def size(self) -> int:
+        return self.block.size
+
+    def open(self, **kwargs):
+        descriptor = next(self._descriptors)
+        self._ios[descriptor] = self.getIO()
+        self._ios[descriptor].open(OpenMode.OPEN_READ)
+        return descriptor
+
+    def read(self, descriptor, count=65536, **kwargs):
+        return self._ios[descriptor].read(count)
+
+    def close(self, descriptor, **kwargs):
+        self._ios.pop(descriptor).close()
+
+    def buffer(self):
+        return self.block.buf[: self.size].toreadonly()
+
+    def write(self, data, **kwargs):
+        return self.block.append(data)
+
+    def getIO(self):
+        return SharedMemoryBlockIO(self)
+
+    def release(self):
+        """Unmaps the block, unless there are still views of it around"""
+        if self._block is None:
+            return
+        try:
+            self._block.close()
+        except BufferError:
+            # The mapping goes away together with the last of those views
+            pass
+
+    def __repr__(self):
+        return f"<SharedMemoryDropProxy with {self._proxy_info}"
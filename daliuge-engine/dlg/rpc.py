@@ -27,18 +27,22 @@ technologies we support.
 """
 
 import collections
+import concurrent.futures
 import dataclasses
 import logging
-import queue
 import threading
 
 import gevent
+import gevent.event
 import zerorpc
 
 from . import utils
 
 logger = logging.getLogger(__name__)
 
+# Size of the frames in which DropProxy objects transfer drop data
+DROP_DATA_FRAME_SIZE = 4 * 1024**2
+
 
 class RPCObject(object):
     """Base class for all RCP clients and server"""
@@ -53,6 +57,80 @@ class RPCObject(object):
 class RPCClientBase(RPCObject):
     """Base class for all RPC clients"""
 
+    def __init__(self, *args, **kwargs):
+        super(RPCClientBase, self).__init__(*args, **kwargs)
+        # Method names of remote drops, keyed by session and (host, port, uid)
+        self._drop_methods = collections.defaultdict(dict)
+
+    def _get_drop_methods(self, client, hostname, port, session_id, uid):
+        session_methods = self._drop_methods[session_id]
+        key = (hostname, port, uid)
+        methods = session_methods.get(key)
+        if methods is None:
+            methods = frozenset(client.get_drop_methods(session_id, uid))
+            session_methods[key] = methods
+        return methods
+
+    def forget_drop_methods(self, session_id):
+        """Drops the cached method names of remote drops of the given session"""
+        self._drop_methods.pop(session_id, None)
+
+    def call_remote_drop(self, hostname, port, session_id, uid, name, *args):
+        client, closer = self.get_rpc_client(hostname.split(":")[0], port)
+        try:
+            return client.call_drop(session_id, uid, name, *args)
+        finally:
+            closer()
+
+    def read_remote_drop_data(
+        self, hostname, port, session_id, uid, descriptor, count
+    ):
+        """
+        Reads up to `count` bytes from an open descriptor of a remote drop
+        """
+        client, closer = self.get_rpc_client(hostname.split(":")[0], port)
+        try:
+            return client.read_drop_data(session_id, uid, descriptor, count)
+        finally:
+            closer()
+
+    def read_remote_drop_data_async(
+        self, hostname, port, session_id, uid, descriptor, count
+    ):
+        """
+        Like `read_remote_drop_data`, but returns a Future with the data
+        instead of waiting for it
+        """
+        client, closer = self.get_rpc_client(hostname.split(":")[0], port)
+        future = client.call_async("read_drop_data", session_id, uid, descriptor, count)
+        future.add_done_callback(lambda _: closer())
+        return future
+
+    def get_remote_drop_data(
+        self, hostname, port, session_id, uid, offset=0, count=-1
+    ):
+        """
+        Returns the contents of a remote drop (or a byte range of it) in a
+        single transfer
+        """
+        client, closer = self.get_rpc_client(hostname.split(":")[0], port)
+        try:
+            return client.get_drop_data(session_id, uid, offset, count)
+        finally:
+            closer()
+
+    def export_remote_drop_data(self, hostname, port, session_id, uid):
+        """
+        Has a drop exported into a shared memory block by its (local) node
+        manager, and returns the name of the block and the size of the data
+        """
+        client, closer = self.get_rpc_client(hostname.split(":")[0], port)
+        try:
+            name, size = client.export_drop_data(session_id, uid)
+            return name, size
+        finally:
+            closer()
+
     def get_drop_attribute(self, hostname, port, session_id, uid, name):
 
         hostname = hostname.split(":")[0]
@@ -78,12 +156,10 @@ class RPCClientBase(RPCObject):
             def __call__(self, *args):
                 return client.call_drop(session_id, uid, name, *args)
 
-        # Shortcut to avoid extra calls
-        known_methods = ()
-        # known_methods = ('open', 'read', 'write', 'close')
         closeit = False
         try:
-            if name in known_methods or client.has_method(session_id, uid, name):
+            methods = self._get_drop_methods(client, hostname, port, session_id, uid)
+            if name in methods:
                 return remote_method()
             closeit = True
             return client.get_drop_property(session_id, uid, name)
@@ -100,16 +176,76 @@ class RPCServerBase(RPCObject):
         self._rpc_port = port
 
 
+class _ZeroRPCChannel(object):
+    """
+    Requests for a ZeroRPC client running on its own thread, together with
+    the gevent watcher used to wake that thread's event loop up.
+    """
+
+    def __init__(self):
+        self.requests = collections.deque()
+        self.ready = threading.Event()
+        self.error = None
+        self._lock = threading.Lock()
+        self._wakeup = None
+        self._closed = False
+
+    def open(self, loop, callback):
+        """Called from the client thread, with the loop that must be woken"""
+        self._wakeup = loop.async_()
+        self._wakeup.start(callback)
+        self.ready.set()
+
+    def fail(self, error):
+        """Called from the client thread if the client couldn't be started"""
+        with self._lock:
+            self._closed = True
+        self.error = error
+        self.ready.set()
+
+    def wait_ready(self, timeout):
+        """Waits for the client thread to open this channel, or fail to"""
+        if not self.ready.wait(timeout):
+            raise RuntimeError(
+                "ZeroRPC client didn't start within %d seconds" % (timeout,)
+            )
+        if self.error is not None:
+            raise self.error
+
+    def put(self, request):
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("ZeroRPC client has been shut down")
+            self.requests.append(request)
+            self._wakeup.send()
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            if self._wakeup is not None:
+                self._wakeup.send()
+
+    def cancel_requests(self):
+        """Called from the client thread, fails requests that were never sent"""
+        with self._lock:
+            self._closed = True
+            self._wakeup.stop()
+        while self.requests:
+            self.requests.popleft().future.set_exception(
+                RuntimeError("ZeroRPC client has been shut down")
+            )
+
+
 class ZeroRPCClient(RPCClientBase):
     """ZeroRPC client support"""
 
-    request = collections.namedtuple("request", "method args queue")
-    response = collections.namedtuple("response", "value is_exception")
+    request = collections.namedtuple("request", "method args future")
 
     def __init__(self, *args, **kwargs):
         super(ZeroRPCClient, self).__init__(*args, **kwargs)
         self._zrpcclients = {}
         self._zrpcclientthreads = []
+        self._zrpcchannels = []
         self._own_context = False
         logger.debug("RPC Client created")
 
@@ -127,9 +263,12 @@ class ZeroRPCClient(RPCClientBase):
         self._zrpcclient_acquisition_lock = threading.Lock()
         self._zrpcclients = {}
         self._zrpcclientthreads = []
+        self._zrpcchannels = []
 
     def shutdown(self):
         super(ZeroRPCClient, self).shutdown()
+        for channel in self._zrpcchannels:
+            channel.close()
         for t in self._zrpcclientthreads:
             t.join(10)
             if t.is_alive():
@@ -148,25 +287,34 @@ class ZeroRPCClient(RPCClientBase):
                 return self._zrpcclients[endpoint]
 
             # We start the new client on its own thread so it uses gevent, etc.
-            # In this thread we create simply enqueue requests
-            req_queue = queue.Queue()
+            # In this thread we simply enqueue requests and wake up the
+            # client's event loop, which dispatches them right away
+            channel = _ZeroRPCChannel()
             tname_tpl, args = "zrpc(%s:%d)", (host, port)
             t = threading.Thread(
                 target=self.run_zrpcclient,
-                args=(host, port, req_queue),
+                args=(host, port, channel),
                 name=tname_tpl % args,
             )
             t.start()
+            # Shutdown takes care of the thread even if it doesn't start in time
+            self._zrpcclientthreads.append(t)
+            self._zrpcchannels.append(channel)
+            channel.wait_ready(30)
 
             class QueueingClient(object):
+                def call_async(self, method, *args):
+                    """
+                    Issues a remote call without waiting for it to finish, and
+                    returns a Future with its result. Calls issued from the
+                    same thread are sent in order, so many can be in flight.
+                    """
+                    future = concurrent.futures.Future()
+                    channel.put(ZeroRPCClient.request(method, args, future))
+                    return future
+
                 def __make_call(self, method, *args):
-                    res_queue = queue.Queue()
-                    request = ZeroRPCClient.request(method, args, res_queue)
-                    req_queue.put(request)
-                    x = res_queue.get()
-                    if x.is_exception:
-                        raise x.value
-                    return x.value
+                    return self.call_async(method, *args).result()
 
                 def call_drop(self, session_id, uid, name, *args):
                     return self.__make_call("call_drop", session_id, uid, name, *args)
@@ -177,39 +325,69 @@ class ZeroRPCClient(RPCClientBase):
                 def has_method(self, session_id, uid, name):
                     return self.__make_call("has_method", session_id, uid, name)
 
+                def get_drop_methods(self, session_id, uid):
+                    return self.__make_call("get_drop_methods", session_id, uid)
+
+                def export_drop_data(self, session_id, uid):
+                    return self.__make_call("export_drop_data", session_id, uid)
+
+                def read_drop_data(self, session_id, uid, descriptor, count):
+                    return self.__make_call(
+                        "read_drop_data", session_id, uid, descriptor, count
+                    )
+
+                def get_drop_data(self, session_id, uid, offset, count):
+                    return self.__make_call(
+                        "get_drop_data", session_id, uid, offset, count
+                    )
+
             client = QueueingClient()
             self._zrpcclients[endpoint] = client
-            self._zrpcclientthreads.append(t)
             return client
 
-    def run_zrpcclient(self, host, port, req_queue):
+    def run_zrpcclient(self, host, port, channel):
         host = host.split(":")[0]
-        client = zerorpc.Client("tcp://%s:%d" % (host, port), context=self._context)
-
-        forwarder = gevent.spawn(self.forward_requests, req_queue, client)
+        pending = gevent.event.Event()
+        try:
+            client = zerorpc.Client(
+                "tcp://%s:%d" % (host, port), context=self._context
+            )
+        except Exception as e:
+            logger.exception("Cannot create ZeroRPC client for %s:%d", host, port)
+            channel.fail(e)
+            return
+        try:
+            channel.open(gevent.get_hub().loop, pending.set)
+        except Exception as e:
+            channel.fail(e)
+            client.close()
+            return
+        forwarder = gevent.spawn(self.forward_requests, channel, pending, client)
         gevent.joinall([forwarder])
+        channel.cancel_requests()
 
         logger.info("Closing %s:%d ZeroRPC client", host, port)
         client.close()
 
-    def forward_requests(self, req_queue, client):
+    def forward_requests(self, channel, pending, client):
+        # A single greenlet sends all requests so they leave in order
         while self.rpc_running:
-            try:
-                req = req_queue.get_nowait()
-                gevent.spawn(self.queue_request, client, req)
-            except queue.Empty:
-                gevent.sleep(0.005)
+            pending.wait()
+            pending.clear()
+            while channel.requests and self.rpc_running:
+                self.queue_request(client, channel.requests.popleft())
 
     def process_response(self, req, async_response):
         try:
-            x = ZeroRPCClient.response(async_response.get_nowait(), False)
+            req.future.set_result(async_response.get_nowait())
         except Exception as e:
             if isinstance(e, gevent.Timeout):
-                raise RuntimeError("Timed out on AsyncResult.get_nowait")
-            x = ZeroRPCClient.response(e, True)
-        req.queue.put(x)
+                e = RuntimeError("Timed out on AsyncResult.get_nowait")
+            req.future.set_exception(e)
 
     def queue_request(self, client, req):
+        if not req.future.set_running_or_notify_cancel():
+            return
         # Pass "async" in a dictionary; 3.7+ fails because it's a keyword
         async_result = client.__call__(req.method, *req.args, **{"async": True})
         async_result.rawlink(lambda x: self.process_response(req, x))
@@ -317,13 +495,67 @@ class DropProxy(object):
     A proxy to a remote drop.
 
     It forwards attribute requests and procedure calls through the given RPC client.
+    Data is read in frames of `frame_size` bytes, and individual read() calls
+    are served from the last frame received, so reading a remote drop in small
+    chunks doesn't cost one remote call per chunk. While a frame is consumed
+    the next one is already requested.
     """
 
-    def __init__(self, rpc_client, proxy_info: ProxyInfo):
+    def __init__(self, rpc_client, proxy_info: ProxyInfo, frame_size=None):
         self.rpc_client = rpc_client
         self._proxy_info: ProxyInfo = proxy_info
+        self._frame_size = frame_size or DROP_DATA_FRAME_SIZE
+        self._frames = {}
         logger.debug("Created %r", self)
 
+    def _remote_args(self):
+        info = self._proxy_info
+        return info.hostname, info.port, info.session_id, info.uid
+
+    def open(self, **kwargs):
+        descriptor = self.rpc_client.call_remote_drop(*self._remote_args(), "open")
+        self._frames[descriptor] = (b"", 0, None)
+        return descriptor
+
+    def _request_frame(self, descriptor, size):
+        future = self.rpc_client.read_remote_drop_data_async(
+            *self._remote_args(), descriptor, size
+        )
+        return future, size
+
+    def read(self, descriptor, count=65536, **kwargs):
+        if count < 0:
+            # Everything up to the end of the data
+            chunks = []
+            data = self.read(descriptor, self._frame_size)
+            while data:
+                chunks.append(data)
+                data = self.read(descriptor, self._frame_size)
+            return b"".join(chunks)
+
+        frame, pos, next_frame = self._frames[descriptor]
+        if pos >= len(frame):
+            if next_frame is None:
+                next_frame = self._request_frame(
+                    descriptor, max(count, self._frame_size)
+                )
+            future, size = next_frame
+            frame, pos = future.result(), 0
+            # A short frame means we reached the end of the data
+            next_frame = None
+            if len(frame) == size:
+                next_frame = self._request_frame(descriptor, self._frame_size)
+        data = frame[pos : pos + count]
+        self._frames[descriptor] = (frame, pos + len(data), next_frame)
+        return data
+
+    def close(self, descriptor, **kwargs):
+        self._frames.pop(descriptor, None)
+        self.rpc_client.call_remote_drop(*self._remote_args(), "close", descriptor)
+
+    def buffer(self):
+        return self.rpc_client.get_remote_drop_data(*self._remote_args())
+
     def handleEvent(self, evt):
         pass
 
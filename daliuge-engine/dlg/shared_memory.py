@@ -63,6 +63,12 @@ class DlgSharedMemory:
     Writes directly to shared-memory, automatically handles resizing and fetching of pre-existing
     blocks.
     If given a name, will attempt to create a new file or return a pre-existing one.
+
+    The block keeps a logical ``size`` (the number of meaningful bytes) separate from its mapped
+    ``capacity``. ``append`` grows the capacity geometrically so that streaming N chunks into a
+    block costs amortised O(N) rather than re-creating the block on every write. Growing is done
+    in place (``ftruncate`` followed by ``mremap`` where available), so existing data is never
+    copied.
     Based heavily on Python's own shared memory implementation
     (https://github.com/python/cpython/blob/3.9/Lib/multiprocessing/shared_memory.py)
     """
@@ -73,6 +79,9 @@ class DlgSharedMemory:
     _buf = None
     _flags = os.O_RDWR
     _mode = 0o600
+    _size = 0
+    _capacity = 0
+    growth_factor = 2
 
     def __init__(self, name, size=65536):
         """
@@ -116,13 +125,12 @@ class DlgSharedMemory:
             os.ftruncate(self._fd, size)
             stats = os.fstat(self._fd)
             size = stats.st_size
-            self._mmap = mmap.mmap(self._fd, size)
+            self._map(size)
         except OSError:
             self.unlink()
             raise
 
         self._size = size
-        self._buf = memoryview(self._mmap)
 
     def __del__(self):
         try:
@@ -131,11 +139,17 @@ class DlgSharedMemory:
             pass
 
     def __repr__(self):
-        return f"{self.__class__.__name__}({self._name!r}, size={self._size})"
+        return (
+            f"{self.__class__.__name__}({self._name!r}, size={self._size}, "
+            f"capacity={self._capacity})"
+        )
 
     @property
     def buf(self):
-        """A memoryview of contents of the shared memory block."""
+        """
+        A memoryview of contents of the shared memory block.
+        It spans the whole mapped capacity; only the first ``size`` bytes are meaningful.
+        """
         return self._buf
 
     @property
@@ -145,15 +159,24 @@ class DlgSharedMemory:
 
     @property
     def size(self):
-        """Size in bytes."""
+        """Logical size in bytes."""
         return self._size
 
+    @property
+    def capacity(self):
+        """Mapped size in bytes, always greater or equal than ``size``."""
+        return self._capacity
+
     def close(self):
         """
         Closes access to the shared memory but does not destroy it.
         """
         if self._buf is not None:
-            self._buf.release()
+            try:
+                self._buf.release()
+            except BufferError:
+                # Views taken from buf keep the mapping alive until they go
+                pass
             self._buf = None
         if self._mmap is not None:
             try:
@@ -180,16 +203,104 @@ class DlgSharedMemory:
             LOGGER.debug(f"{self.name} tried to unlink twice")
             warnings.warn("Cannot unlink a shared block twice", RuntimeWarning)
 
+    def _map(self, capacity):
+        """
+        Maps the first `capacity` bytes of the block. Empty blocks can't be mapped, and get
+        an empty buffer instead.
+        """
+        self._mmap = mmap.mmap(self._fd, capacity) if capacity else None
+        self._buf = memoryview(self._mmap if capacity else bytearray())
+        self._capacity = capacity
+
+    def _remap(self, new_capacity):
+        """
+        Changes the mapped capacity of the block in place, keeping its contents.
+        Uses mmap.resize (ftruncate + mremap) where the platform supports it, otherwise
+        truncates the underlying file and maps it again. No data is copied in either case,
+        unless the block shrinks while there are outstanding views of it.
+        """
+        try:
+            self._buf.release()
+        except BufferError:
+            # Views taken from buf (e.g. numpy arrays) keep the current mapping alive
+            pass
+        if self._mmap is not None and new_capacity:
+            try:
+                self._mmap.resize(new_capacity)
+            except (BufferError, OSError, SystemError, ValueError):
+                # No mremap, or there are outstanding views of the current mapping
+                pass
+            else:
+                self._capacity = new_capacity
+                self._buf = memoryview(self._mmap)
+                return
+
+        views_alive = False
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                views_alive = True
+        if views_alive and new_capacity < self._capacity:
+            # Truncating the memory behind live views would crash their users (SIGBUS)
+            self._replace(new_capacity)
+        else:
+            os.ftruncate(self._fd, new_capacity)
+            self._map(new_capacity)
+
+    def _replace(self, capacity):
+        """
+        Moves the contents of the block into a new block of `capacity` bytes with the same
+        name, leaving the current one to the views still using it.
+        """
+        old_mmap, old_fd = self._mmap, self._fd
+        _posixshmem.shm_unlink(self._name)
+        self._fd = _posixshmem.shm_open(self._name, _O_CREX | os.O_RDWR, mode=self._mode)
+        os.close(old_fd)
+        os.ftruncate(self._fd, capacity)
+        self._map(capacity)
+        nbytes = min(self._size, capacity)
+        self._buf[:nbytes] = old_mmap[:nbytes]
+
+    def reserve(self, capacity):
+        """
+        Ensures the block can hold at least `capacity` bytes without being remapped.
+        Capacity grows by ``growth_factor`` so that repeated calls are amortised O(1).
+        The logical size is left untouched.
+        """
+        if capacity <= self._capacity:
+            return
+        self._remap(max(capacity, int(self._capacity * self.growth_factor)))
+
+    def append(self, data):
+        """
+        Writes `data` right after the current logical end of the block, growing it as needed.
+        Returns the number of bytes written.
+        """
+        nbytes = len(data)
+        end = self._size + nbytes
+        self.reserve(end)
+        self._buf[self._size : end] = data
+        self._size = end
+        return nbytes
+
+    def truncate(self, size=0):
+        """
+        Sets the logical size of the block without releasing any of its capacity.
+        """
+        if size < 0 or size > self._capacity:
+            raise ValueError(f"'size' must be between 0 and {self._capacity}")
+        self._size = size
+
     def resize(self, new_size):
         """
-        Replaces current file with larger block, containing old data.
+        Resizes the block to exactly `new_size` bytes in place, keeping its data.
+        Both the logical size and the capacity are set to `new_size`.
         """
-        old_data = bytes(self._buf)
-        self.close()
-        self.unlink()
-        self.__init__(self._name, new_size)
-        if new_size < len(old_data):
+        if new_size < 0:
+            raise ValueError("'size' must not be negative")
+        if new_size < self._size:
             warnings.warn("Shrinking shared block, may lose data", BytesWarning)
-            self._buf[:] = old_data[0:new_size]
-        else:
-            self._buf[0 : len(old_data)] = old_data
+        if new_size != self._capacity:
+            self._remap(new_size)
+        self._size = new_size
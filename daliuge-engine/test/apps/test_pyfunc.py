@@ -131,6 +131,23 @@ class TestPyFuncApp(unittest.TestCase):
 
         _PyFuncApp("a", "a", inner_function)
 
+    def test_function_cache(self):
+        """Functions are resolved once per process, also when unpickling apps"""
+
+        def inner_function(x, y):
+            return x + y
+
+        a = _PyFuncApp("a", "a", inner_function)
+        b = _PyFuncApp("b", "b", inner_function)
+        self.assertIs(a.f, b.f)
+        self.assertIs(func1, _PyFuncApp("c", "c", "func1").f)
+
+        # The function itself is not pickled
+        self.assertNotIn("f", a.__getstate__())
+        a2 = pickle.loads(pickle.dumps(a))
+        self.assertIs(a.f, a2.f)
+        self.assertEqual(3, a2.f(1, 2))
+
     def test_pickle_func(self, f=lambda x: x, input_data="hello", output_data="hello"):
         a = InMemoryDROP("a", "a")
         b = _PyFuncApp("b", "b", f)
@@ -0,0 +1,145 @@
+#
+#    ICRAR - International Centre for Radio Astronomy Research
+#    (c) UWA - The University of Western Australia, 2024
+#    Copyright by UWA (in the framework of the ICRAR)
+#    All rights reserved
+#
+#    This library is free software; you can redistribute it and/or
+#    modify it under the terms of the GNU Lesser General Public
+#    License as published by the Free Software Foundation; either
+#    version 2.1 of the License, or (at your option) any later version.
+#
+#    This library is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#    Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public
+#    License along with this library; if not, write to the Free Software
+#    Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+#    MA 02111-1307  USA
+#
+"""
+A small benchmark that measures the latency added by inter-node events. It
+runs a chain of N applications on two NodeManagers on localhost, each
+application taking its input from the other NodeManager, so every step of
+the chain waits for a dropCompleted event to cross from one NodeManager to
+the other. Applications don't sleep nor read their inputs, so the time of each
+step is dominated by event delivery.
+"""
+
+import sys
+import threading
+import time
+from optparse import OptionParser
+
+from dlg.ddap_protocol import DROPLinkType, DROPRel
+from dlg.manager.node_manager import NodeManager
+
+
+class _CompletionListener(threading.Event):
+    def handleEvent(self, _evt):
+        self.set()
+
+
+def _chain(n):
+    """
+    Builds the graph specs of a chain of `n` SleepApps for two NodeManagers,
+    together with the relationships between DROPs in different NodeManagers
+    """
+    graphs = ([], [])
+    rels = []
+    for i in range(n):
+        data = "D%d" % i
+        app = "P%d" % i
+        if i == 0:
+            graphs[0].append(
+                {
+                    "oid": data,
+                    "categoryType": "Data",
+                    "dropclass": "dlg.data.drops.memory.InMemoryDROP",
+                }
+            )
+        graphs[(i + 1) % 2].append(
+            {
+                "oid": app,
+                "categoryType": "Application",
+                "dropclass": "dlg.apps.simple.SleepApp",
+                "sleep_time": 0,
+            }
+        )
+        graphs[(i + 1) % 2].append(
+            {
+                "oid": "D%d" % (i + 1),
+                "categoryType": "Data",
+                "dropclass": "dlg.data.drops.memory.InMemoryDROP",
+                "producers": [app],
+            }
+        )
+        rels.append(DROPRel(app, DROPLinkType.CONSUMER, data))
+    return graphs, rels
+
+
+def measure(n, session_id, nms):
+    """
+    Runs a chain of `n` cross-node steps and returns the time it took to go
+    through it, in seconds
+    """
+    graphs, rels = _chain(n)
+    for i, nm in enumerate(nms):
+        other = nms[(i + 1) % 2]
+        nm.createSession(session_id)
+        nm.addGraphSpec(session_id, graphs[i])
+        nm.add_node_subscriptions(
+            session_id,
+            {("localhost", other._events_port, other._rpc_port): rels},
+        )
+    for nm in nms:
+        nm.deploySession(session_id)
+
+    first = nms[0]._sessions[session_id].drops["D0"]
+    last_nm = nms[n % 2]
+    last = last_nm._sessions[session_id].drops["D%d" % n]
+    listener = _CompletionListener()
+    last.subscribe(listener, "dropCompleted")
+
+    start = time.time()
+    first.write(b"x")
+    first.setCompleted()
+    if not listener.wait(max(60, n)):
+        raise Exception("Chain of %d steps didn't finish" % n)
+    delta = time.time() - start
+
+    for nm in nms:
+        nm.destroySession(session_id)
+    return delta
+
+
+if __name__ == "__main__":
+
+    parser = OptionParser()
+    parser.add_option(
+        "-n",
+        "--steps",
+        action="store",
+        type="string",
+        dest="steps",
+        help="Comma-separated lengths of the chains to run (default 10,50,100)",
+        default="10,50,100",
+    )
+    (options, args) = parser.parse_args(sys.argv)
+
+    nms = [
+        NodeManager(host="localhost", events_port=5653 + i, rpc_port=6766 + i)
+        for i in range(2)
+    ]
+    try:
+        for n in [int(s) for s in options.steps.split(",")]:
+            delta = measure(n, "chain-%d" % n, nms)
+            print(
+                "%5d cross-node steps: %7.3f [s], %6.2f [ms] per step"
+                % (n, delta, delta * 1000 / n)
+            )
+    finally:
+        for nm in nms:
+            nm.shutdown()
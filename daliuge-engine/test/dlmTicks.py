@@ -0,0 +1,105 @@
+#
+#    ICRAR - International Centre for Radio Astronomy Research
+#    (c) UWA - The University of Western Australia, 2024
+#    Copyright by UWA (in the framework of the ICRAR)
+#    All rights reserved
+#
+#    This library is free software; you can redistribute it and/or
+#    modify it under the terms of the GNU Lesser General Public
+#    License as published by the Free Software Foundation; either
+#    version 2.1 of the License, or (at your option) any later version.
+#
+#    This library is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#    Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public
+#    License along with this library; if not, write to the Free Software
+#    Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+#    MA 02111-1307  USA
+#
+"""
+A small benchmark that measures how long the periodic checks of the
+DataLifecycleManager take when a large number of DROPs are registered with it.
+All DROPs are COMPLETED InMemoryDROPs that don't expire during the benchmark:
+half of them are persisted, the other half expire after being used by a
+consumer that never finishes.
+"""
+
+import sys
+import time
+from optparse import OptionParser
+
+from dlg.apps.app_base import BarrierAppDROP
+from dlg.data.drops.memory import InMemoryDROP
+from dlg.lifecycle.dlm import DataLifecycleManager
+
+
+class PendingApp(BarrierAppDROP):
+    """A consumer that never runs, and therefore never finishes"""
+
+    def dropCompleted(self, uid, drop_state):
+        pass
+
+
+def measure(n, ticks):
+    """
+    Registers `n` DROPs with a new DLM and returns how long it took to do so,
+    and the average time taken by a full round of periodic checks, in seconds
+    """
+    manager = DataLifecycleManager()
+    consumer = PendingApp("consumer", "consumer")
+
+    start = time.time()
+    for i in range(n):
+        uid = str(i)
+        if i % 2:
+            drop = InMemoryDROP(uid, uid, persist=True)
+        else:
+            drop = InMemoryDROP(uid, uid)
+            drop.addConsumer(consumer)
+        manager.addDrop(drop)
+        drop.setCompleted()
+    registration = time.time() - start
+
+    start = time.time()
+    for _ in range(ticks):
+        manager.expireCompletedDrops()
+        manager.deleteLostDrops()
+        manager.deleteExpiredDrops()
+    tick = (time.time() - start) / ticks
+
+    manager.cleanup()
+    return registration, tick
+
+
+if __name__ == "__main__":
+
+    parser = OptionParser()
+    parser.add_option(
+        "-n",
+        "--drops",
+        action="store",
+        type="string",
+        dest="drops",
+        help="Comma-separated numbers of registered DROPs (default 10000,100000,1000000)",
+        default="10000,100000,1000000",
+    )
+    parser.add_option(
+        "-t",
+        "--ticks",
+        action="store",
+        type="int",
+        dest="ticks",
+        help="Number of periodic checks to average over (default 10)",
+        default=10,
+    )
+    (options, args) = parser.parse_args(sys.argv)
+
+    for n in [int(x) for x in options.drops.split(",")]:
+        registration, tick = measure(n, options.ticks)
+        print(
+            "%8d DROPs: registration %7.3f [s], %9.3f [ms] per tick"
+            % (n, registration, tick * 1000)
+        )
@@ -0,0 +1,96 @@
+#
+#    ICRAR - International Centre for Radio Astronomy Research
+#    (c) UWA - The University of Western Australia, 2024
+#    Copyright by UWA (in the framework of the ICRAR)
+#    All rights reserved
+#
+#    This library is free software; you can redistribute it and/or
+#    modify it under the terms of the GNU Lesser General Public
+#    License as published by the Free Software Foundation; either
+#    version 2.1 of the License, or (at your option) any later version.
+#
+#    This library is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#    Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public
+#    License along with this library; if not, write to the Free Software
+#    Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+#    MA 02111-1307  USA
+#
+"""
+A small benchmark that measures how long it takes to deploy physical graphs
+of different sizes in a Session. Graphs are chains of InMemoryDROPs and
+SleepApps, and the time is reported separately for adding the graph spec to
+the session (i.e., validating it) and for deploying it (i.e., creating and
+linking the DROPs).
+"""
+
+import sys
+import time
+from optparse import OptionParser
+
+from dlg.manager.session import Session
+
+
+def _chain(n):
+    """Returns the specification of a chain of `n` DROPs"""
+    graph = []
+    for i in range(n // 2):
+        graph.append(
+            {
+                "oid": "D%d" % i,
+                "categoryType": "Data",
+                "dropclass": "dlg.data.drops.memory.InMemoryDROP",
+                "consumers": ["A%d" % i],
+            }
+        )
+        app = {
+            "oid": "A%d" % i,
+            "categoryType": "Application",
+            "dropclass": "dlg.apps.simple.SleepApp",
+            "sleep_time": 0,
+        }
+        if i + 1 < n // 2:
+            app["outputs"] = ["D%d" % (i + 1)]
+        graph.append(app)
+    return graph
+
+
+def measure(n):
+    """
+    Deploys a graph with `n` DROPs in a new Session and returns the time it
+    took to add its spec and to deploy it, in seconds
+    """
+    graph = _chain(n)
+    with Session("deploy-%d" % n) as session:
+        start = time.time()
+        session.addGraphSpec(graph)
+        added = time.time()
+        session.deploy()
+        deployed = time.time()
+    return added - start, deployed - added
+
+
+if __name__ == "__main__":
+
+    parser = OptionParser()
+    parser.add_option(
+        "-n",
+        "--sizes",
+        action="store",
+        type="string",
+        dest="sizes",
+        help="Comma-separated graph sizes (default 10000,100000,1000000)",
+        default="10000,100000,1000000",
+    )
+    (options, args) = parser.parse_args(sys.argv)
+
+    for n in [int(s) for s in options.sizes.split(",")]:
+        add_time, deploy_time = measure(n)
+        print(
+            "%8d DROPs: addGraphSpec %7.2f [s], deploy %7.2f [s], "
+            "%6.1f [us] per DROP"
+            % (n, add_time, deploy_time, (add_time + deploy_time) * 1e6 / n)
+        )
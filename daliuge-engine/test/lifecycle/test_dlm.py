@@ -31,10 +31,12 @@ import tempfile
 import time
 import unittest
 
-from dlg.ddap_protocol import DROPStates, DROPPhases
+from dlg.ddap_protocol import AppDROPStates, DROPStates, DROPPhases
 from dlg.apps.app_base import BarrierAppDROP
 from dlg.data.drops.directorycontainer import DirectoryContainer
 from dlg.data.drops.file import FileDROP
+from dlg.data.drops.memory import InMemoryDROP
+from dlg import droputils
 from dlg.droputils import DROPWaiterCtx
 from dlg.lifecycle import dlm
 
@@ -59,6 +61,15 @@ class TestDataLifecycleManager(unittest.TestCase):
             drop = FileDROP("oid:A", "uid:A1", expectedSize=10)
             manager.addDrop(drop)
 
+    def test_dropRemoval(self):
+        with dlm.DataLifecycleManager() as manager:
+            a = InMemoryDROP("oid:A", "uid:A1")
+            b = InMemoryDROP("oid:B", "uid:B1")
+            manager.addDrop(a)
+            manager.addDrop(b)
+            manager.remove_drops({"uid:A1": a})
+            self.assertEqual(["oid:B"], list(manager._reg._drops))
+
     def test_dropCompleteTriggersReplication(self):
         with dlm.DataLifecycleManager(enable_drop_replication=True) as manager:
             drop = FileDROP("oid:A", "uid:A1", expectedSize=1)
@@ -182,3 +193,117 @@ class TestDataLifecycleManager(unittest.TestCase):
             self.assertFalse(a.exists())
             self.assertTrue(b.exists())
             b.delete()
+
+    def test_expireAfterUse_consumerTracking(self):
+        """
+        Expire-after-use DROPs are expired only once all their consumers are
+        finished, whether the consumers finished before or after the DROP was
+        completed, and whether they are registered with the DLM or not
+        """
+
+        class RemoteConsumer(object):
+            """Looks like a remote DROP, which can't be subscribed to"""
+
+            def __init__(self, uid):
+                self.uid = uid
+                self.execStatus = AppDROPStates.RUNNING
+
+        manager = dlm.DataLifecycleManager()
+        a = InMemoryDROP("a", "a", expireAfterUse=True, persist=False)
+        b = BarrierAppDROP("b", "b")
+        c = BarrierAppDROP("c", "c")
+        d = BarrierAppDROP("d", "d")
+        remote = RemoteConsumer("e")
+        for consumer in (b, c, d):
+            a.addConsumer(consumer)
+        a._consumers.append(remote)
+        manager.addDrop(a)
+        manager.addDrop(b)
+        b.execStatus = AppDROPStates.FINISHED
+
+        a.setCompleted()
+        self.assertEqual(DROPStates.COMPLETED, a.status)
+        for consumer in (c, d):
+            manager.expireCompletedDrops()
+            self.assertEqual(DROPStates.COMPLETED, a.status)
+            consumer.execStatus = AppDROPStates.ERROR
+        manager.expireCompletedDrops()
+        self.assertEqual(DROPStates.COMPLETED, a.status)
+        remote.execStatus = AppDROPStates.FINISHED
+        manager.expireCompletedDrops()
+        self.assertEqual(DROPStates.EXPIRED, a.status)
+
+        manager.deleteExpiredDrops()
+        self.assertEqual(DROPStates.DELETED, a.status)
+        manager.cleanup()
+
+    def test_lifespanExpiration(self):
+        manager = dlm.DataLifecycleManager()
+        drops = [
+            FileDROP(
+                "oid:%d" % i, "uid:%d" % i, expectedSize=1, lifespan=lifespan
+            )
+            for i, lifespan in enumerate((100, 0.2, -1, 0))
+        ]
+        for drop in drops:
+            manager.addDrop(drop)
+            self._writeAndClose(drop)
+        manager.expireCompletedDrops()
+        states = [drop.status for drop in drops]
+        self.assertEqual(DROPStates.EXPIRED, states[3])
+        self.assertEqual([DROPStates.COMPLETED] * 3, states[:3])
+
+        time.sleep(0.2)
+        manager.expireCompletedDrops()
+        states = [drop.status for drop in drops]
+        self.assertEqual([DROPStates.COMPLETED, DROPStates.EXPIRED], states[:2])
+        self.assertEqual(DROPStates.COMPLETED, states[2])
+        manager.cleanup()
+
+    def test_sampledExistenceChecks(self):
+        manager = dlm.DataLifecycleManager(max_existence_checks=2)
+        drops = [
+            FileDROP("oid:%d" % i, "uid:%d" % i, expectedSize=1, persist=False)
+            for i in range(5)
+        ]
+        for drop in drops:
+            manager.addDrop(drop)
+            self._writeAndClose(drop)
+            os.unlink(drop.path)
+
+        # Only a few DROPs are checked each time
+        for lost in (2, 4, 5):
+            manager.deleteLostDrops()
+            phases = [drop.phase for drop in drops]
+            self.assertEqual(lost, phases.count(DROPPhases.LOST))
+        manager.cleanup()
+
+    def test_spillDrops(self):
+        # A threshold of 0 means there is always memory pressure
+        manager = dlm.DataLifecycleManager(spill_period=100, spill_threshold=0)
+        drops = [InMemoryDROP("oid:%d" % i, "uid:%d" % i) for i in range(3)]
+        for i, drop in enumerate(drops):
+            manager.addDrop(drop)
+            drop.write(b"%d" % i)
+            drop.setCompleted()
+
+        # DROPs being read are left alone
+        reader = drops[1].open()
+        self.assertEqual(2, manager.spillDrops())
+        self.assertEqual([True, False, True], [d.spilled for d in drops])
+        drops[1].close(reader)
+        self.assertEqual(1, manager.spillDrops())
+        self.assertTrue(all(d.spilled for d in drops))
+        self.assertEqual(0, manager.spillDrops())
+
+        # Data is now read from the filesystem, and deleted from there
+        for i, drop in enumerate(drops):
+            self.assertTrue(drop.dataURL.startswith("file://"))
+            self.assertEqual(b"%d" % i, droputils.allDropContents(drop))
+        path = drops[0]._spillDrop.path
+        self.assertTrue(os.path.isfile(path))
+        drops[0].delete()
+        self.assertFalse(os.path.isfile(path))
+        for drop in drops[1:]:
+            drop.delete()
+        manager.cleanup()
@@ -21,11 +21,13 @@
 #
 import os
 import sqlite3
+import time
 import unittest
 import tempfile
 
 from dlg.data.drops.memory import InMemoryDROP
-from dlg.lifecycle.registry import RDBMSRegistry
+from dlg.ddap_protocol import DROPPhases
+from dlg.lifecycle.registry import InMemoryRegistry, RDBMSRegistry
 
 
 DBFILE = tempfile.mktemp()
@@ -103,3 +105,137 @@ class TestRDBMSRegistry(unittest.TestCase):
         registry.recordNewAccess("a")
 
         self.assertNotEqual(-1, registry.getLastAccess("a"))
+
+    def _count(self, sql):
+        conn = sqlite3.connect(DBFILE)  # @UndefinedVariable
+        cur = conn.cursor()
+        cur.execute(sql)
+        n = len(cur.fetchall())
+        cur.close()
+        conn.close()
+        return n
+
+    def test_batchedWrites(self):
+        registry = RDBMSRegistry("sqlite3", DBFILE, flush_period=100)
+        registry.addDrop(InMemoryDROP("a", "a1"))
+        registry.recordNewAccess("a")
+        self.assertEqual(0, self._count("SELECT oid FROM dlg_drop"))
+
+        # Lookups see pending writes, flushing them
+        self.assertEqual(["a1"], registry.getDropUids(InMemoryDROP("a", "a1")))
+        self.assertEqual(1, self._count("SELECT oid FROM dlg_drop"))
+        self.assertEqual(1, self._count("SELECT oid FROM dlg_dropaccesstime"))
+
+        registry.setDropPhase(InMemoryDROP("a", "a1"), DROPPhases.SOLID)
+        registry.close()
+        sql = "SELECT oid FROM dlg_drop WHERE phase = %d" % DROPPhases.SOLID
+        self.assertEqual(1, self._count(sql))
+
+    def test_accessHistory(self):
+        registry = RDBMSRegistry("sqlite3", DBFILE, access_history=2)
+        registry.addDrop(InMemoryDROP("a", "a1"))
+        for _ in range(5):
+            time.sleep(0.001)
+            registry.recordNewAccess("a")
+        registry.close()
+        self.assertEqual(2, self._count("SELECT oid FROM dlg_dropaccesstime"))
+
+        registry = InMemoryRegistry(access_history=2)
+        registry.addDrop(InMemoryDROP("a", "a1"))
+        registry.addDrop(InMemoryDROP("b", "b1"))
+        for _ in range(5):
+            registry.recordNewAccess("a")
+        self.assertEqual(-1, registry.getLastAccess("b"))
+        self.assertEqual(2, len(registry._drops["a"].accessTimes))
+
+    def test_recovery(self):
+        a1 = InMemoryDROP("a", "a1")
+        registry = RDBMSRegistry("sqlite3", DBFILE, flush_period=100)
+        registry.addDrop(a1)
+        registry.addDropInstance(InMemoryDROP("a", "a2"))
+        registry.recordNewAccess("a")
+        lastAccess = registry.getLastAccess("a")
+        registry.close()
+
+        # A new registry on the same database, e.g., after a restart,
+        # knows about the DROP and its history, and can take it again
+        registry = RDBMSRegistry("sqlite3", DBFILE)
+        self.assertEqual(lastAccess, registry.getLastAccess("a"))
+        registry.addDrop(a1)
+        self.assertEqual(["a1", "a2"], sorted(registry.getDropUids(a1)))
+        registry.close()
+
+    def test_failedFlush(self):
+        registry = RDBMSRegistry("sqlite3", DBFILE, flush_period=100)
+        registry.addDrop(InMemoryDROP("a", "a1"))
+        conn = sqlite3.connect(DBFILE)  # @UndefinedVariable
+        conn.execute("ALTER TABLE dlg_drop RENAME TO dlg_drop_moved")
+        conn.commit()
+        self.assertRaises(sqlite3.OperationalError, registry.flush)
+
+        # Failed writes are kept, and written once the database is back
+        conn.execute("ALTER TABLE dlg_drop_moved RENAME TO dlg_drop")
+        conn.commit()
+        conn.close()
+        registry.flush()
+        self.assertEqual(1, self._count("SELECT oid FROM dlg_drop"))
+        self.assertEqual(1, self._count("SELECT oid FROM dlg_dropinstance"))
+        registry.close()
+
+    def test_failingWrites(self):
+        registry = RDBMSRegistry("sqlite3", DBFILE)
+        conn = sqlite3.connect(DBFILE)  # @UndefinedVariable
+        conn.execute("ALTER TABLE dlg_dropaccesstime RENAME TO dlg_dropaccesstime2")
+        conn.commit()
+        conn.close()
+        registry.addDrop(InMemoryDROP("a", "a1"))
+        registry.recordNewAccess("a")
+
+        # Further writes don't retry the failed ones
+        registry.addDrop(InMemoryDROP("b", "b1"))
+        self.assertEqual(1, self._count("SELECT oid FROM dlg_drop"))
+
+        # Failing a second time, the writes are done one by one, and the
+        # failing ones discarded
+        self.assertRaises(sqlite3.OperationalError, registry.flush)
+        self.assertEqual(2, self._count("SELECT oid FROM dlg_drop"))
+        self.assertEqual(2, self._count("SELECT oid FROM dlg_dropinstance"))
+        self.assertEqual([], registry._failed)
+        self.assertEqual([], registry._pending)
+        registry.addDrop(InMemoryDROP("c", "c1"))
+        self.assertEqual(3, self._count("SELECT oid FROM dlg_drop"))
+        registry.close()
+
+    def test_removeDrops(self):
+        registry = RDBMSRegistry("sqlite3", DBFILE)
+        registry.addDrop(InMemoryDROP("a", "a1"))
+        registry.addDrop(InMemoryDROP("b", "b1"))
+        registry.recordNewAccess("a")
+        registry.removeDrops(["a"])
+        self.assertEqual(-1, registry.getLastAccess("a"))
+        registry.close()
+        self.assertEqual(1, self._count("SELECT oid FROM dlg_drop"))
+        self.assertEqual(1, self._count("SELECT oid FROM dlg_dropinstance"))
+        self.assertEqual(0, self._count("SELECT oid FROM dlg_dropaccesstime"))
+
+        # Removed DROPs are forgotten after a restart too
+        registry = RDBMSRegistry("sqlite3", DBFILE)
+        self.assertEqual(["b"], list(registry._drops))
+        registry.close()
+
+    def test_schemaCreation(self):
+        dbfile = tempfile.mktemp()
+        registry = RDBMSRegistry("sqlite3", dbfile)
+        registry.addDrop(InMemoryDROP("a", "a1"))
+        self.assertEqual(["a1"], registry.getDropUids(InMemoryDROP("a", "a1")))
+        registry.close()
+        conn = sqlite3.connect(dbfile)  # @UndefinedVariable
+        cur = conn.cursor()
+        cur.execute("SELECT name FROM sqlite_master WHERE type = 'index'")
+        indexes = {r[0] for r in cur.fetchall()}
+        conn.close()
+        os.unlink(dbfile)
+        self.assertTrue(
+            {"dlg_drop_phase", "dlg_dropinstance_oid", "dlg_dropaccesstime_oid"}
+            <= indexes
+        )
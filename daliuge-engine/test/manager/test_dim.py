@@ -258,6 +258,37 @@ class TestDIM(LocalDimStarter, unittest.TestCase):
             a.setCompleted()
         assertGraphStatus(sessionId, DROPStates.COMPLETED)
 
+    def test_getGraphStatusSummaryAndChanges(self):
+        sessionId = "lala"
+        self.createSessionAndAddTypicalGraph(sessionId)
+        self.dim.deploySession(sessionId)
+
+        summary = self.dim.getGraphStatusSummary(sessionId)
+        self.assertEqual(3, summary["total"])
+        self.assertEqual({DROPStates.INITIALIZED: 3}, summary["status"])
+        self.assertEqual(
+            {hostname: {DROPStates.INITIALIZED: 3}}, summary["node"]
+        )
+        changes = self.dim.getGraphStatusChanges(sessionId)
+        self.assertEqual(summary["version"], changes["version"])
+        self.assertEqual({"A", "B", "C"}, set(changes["changes"]))
+        since = changes["version"]
+        self.assertEqual({}, self.dim.getGraphStatusChanges(sessionId, since)["changes"])
+
+        a, c = [self.dm._sessions[sessionId].drops[x] for x in ("A", "C")]
+        with droputils.DROPWaiterCtx(self, c, 3):
+            a.write(os.urandom(10))
+            a.setCompleted()
+
+        summary = self.dim.getGraphStatusSummary(sessionId)
+        self.assertEqual({DROPStates.COMPLETED: 3}, summary["status"])
+        changes = self.dim.getGraphStatusChanges(sessionId, since)
+        self.assertEqual({"A", "B", "C"}, set(changes["changes"]))
+        changes = self.dim.getGraphStatusChanges(
+            sessionId, since, status=[DROPStates.ERROR]
+        )
+        self.assertEqual({}, changes["changes"])
+
     def test_doCancel(self):
         def assertGraphStatus(sessionId, expectedStatus):
             graphStatusByDim = self.dim.getGraphStatus(sessionId)
@@ -21,18 +21,22 @@
 #
 import copy
 import os
+import pickle
 import sys
 import threading
 import unittest
+from unittest import mock
 from time import sleep
 import multiprocessing
 import random
 
-from dlg import droputils
+import zmq
+
+from dlg import droputils, graph_loader, rpc
 from dlg.common import dropdict
 from dlg.ddap_protocol import DROPStates, DROPRel, DROPLinkType
 from dlg.apps.app_base import BarrierAppDROP
-from dlg.manager.node_manager import NodeManager
+from dlg.manager.node_manager import NodeManager, NodeManagerProcessDropRunner
 
 try:
     from crc32c import crc32c  # @UnusedImport
@@ -105,6 +109,14 @@ class ErroneousApp(BarrierAppDROP):
         raise Exception("Sorry, we always fail")
 
 
+def worker_pid():
+    return os.getpid()
+
+
+def is_module_loaded(name):
+    return name in sys.modules
+
+
 def nm_conninfo(n):
     return "localhost", 5553 + n, 6666 + n
 
@@ -246,6 +258,86 @@ class NodeManagerTestsBase(NMTestsMixIn):
         self._deploy_error_graph(event_listeners=[listener()])
         self.assertTrue(evt.wait(10), "Didn't receive events on time")
 
+    def test_read_remote_drop(self):
+        """Reads the data of a drop living in another NM through a DropProxy"""
+        dm1, dm2 = [self._start_dm() for _ in range(2)]
+        sessionId = f"s{random.randint(0, 1000)}"
+        quickDeploy(dm1, sessionId, add_test_reprodata([memory("A")]))
+        data = os.urandom(5000)
+        a = dm1._sessions[sessionId].drops["A"]
+        a.write(data)
+        a.setCompleted()
+
+        host, _, rpc_port = nm_conninfo(0)
+        proxy_info = rpc.ProxyInfo(host, rpc_port, sessionId, "A")
+        proxy = rpc.DropProxy(dm2, proxy_info, frame_size=1024)
+        self.assertEqual(data, droputils.allDropContents(proxy, bufsize=100))
+        desc = proxy.open()
+        self.assertEqual(data[:10], proxy.read(desc, 10))
+        self.assertEqual(data[10:], proxy.read(desc, -1))
+        self.assertEqual(b"", proxy.read(desc, -1))
+        proxy.close(desc)
+        self.assertEqual(data, proxy.buffer())
+        self.assertEqual(
+            data[1000:1500],
+            dm2.get_remote_drop_data(host, rpc_port, sessionId, "A", 1000, 500),
+        )
+        self.assertEqual(DROPStates.COMPLETED, proxy.status)
+        self.assertIn((host, rpc_port, "A"), dm2._drop_methods[sessionId])
+        dm1.destroySession(sessionId)
+        dm2.forget_drop_methods(sessionId)
+        self.assertNotIn(sessionId, dm2._drop_methods)
+
+    def test_pipelined_rpc_calls(self):
+        """Many RPC calls can be in flight at once, and results come back in order"""
+        dm1, dm2 = [self._start_dm() for _ in range(2)]
+        sessionId = f"s{random.randint(0, 1000)}"
+        quickDeploy(dm1, sessionId, add_test_reprodata([memory("A")]))
+        a = dm1._sessions[sessionId].drops["A"]
+        a.write(b"abcdefghij")
+        a.setCompleted()
+
+        host, _, rpc_port = nm_conninfo(0)
+        client, _ = dm2.get_rpc_client(host, rpc_port)
+        desc = client.call_drop(sessionId, "A", "open")
+        futures = [
+            client.call_async("read_drop_data", sessionId, "A", desc, 2)
+            for _ in range(6)
+        ]
+        self.assertEqual(
+            [b"ab", b"cd", b"ef", b"gh", b"ij", b""], [f.result() for f in futures]
+        )
+        client.call_drop(sessionId, "A", "close", desc)
+        bad_call = client.call_async("get_drop_property", sessionId, "X", "status")
+        self.assertRaises(Exception, bad_call.result)
+
+        self._dms.remove(dm2)
+        dm2.shutdown()
+        self.assertRaises(RuntimeError, client.call_async, "has_method", 1, 2, 3)
+        dm1.destroySession(sessionId)
+
+    def test_graphCreationWorkers(self):
+        """Node Managers can create the DROPs of big graphs on many threads"""
+        dm = self._start_dm(graph_creation_workers=4)
+        sessionId = f"s{random.randint(0, 1000)}"
+        n = graph_loader.CREATION_BATCH_SIZE * 2 + 1
+        graph = [memory(str(i)) for i in range(n)]
+        quickDeploy(dm, sessionId, add_test_reprodata(graph))
+        self.assertEqual(n, len(dm._sessions[sessionId].drops))
+        dm.destroySession(sessionId)
+
+    def test_rpc_client_failure(self):
+        """Clients that fail to start raise an error instead of hanging"""
+        dm1, dm2 = [self._start_dm() for _ in range(2)]
+        sessionId = f"s{random.randint(0, 1000)}"
+        quickDeploy(dm1, sessionId, add_test_reprodata([memory("A")]))
+        host, _, rpc_port = nm_conninfo(0)
+        with mock.patch.object(rpc.zerorpc, "Client", side_effect=zmq.ZMQError):
+            self.assertRaises(zmq.ZMQError, dm2.get_rpc_client, host, rpc_port)
+        client, _ = dm2.get_rpc_client(host, rpc_port)
+        self.assertTrue(client.has_method(sessionId, "A", "open"))
+        dm1.destroySession(sessionId)
+
     def _test_runGraphOneDOPerDOM(self, repeats=1):
         g1 = [memory("A")]
         g2 = [
@@ -700,4 +792,106 @@ class TestDMMultiThreading(NodeManagerTestsBase, unittest.TestCase):
 class TestDMMultiProcessing(NodeManagerTestsBase, unittest.TestCase):
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
-        self.use_processes = True
\ No newline at end of file
+        self.use_processes = True
+
+    def test_workerAffinity(self):
+        """Apps running the same function go to the same (idle) warm worker"""
+        dm = self._start_dm(threads=4)
+        pids = set()
+        for i in range(5):
+            sessionId = "s%d" % i
+            graph = [
+                {
+                    "oid": "A",
+                    "categoryType": "Application",
+                    "dropclass": "dlg.apps.pyfunc.PyFuncApp",
+                    "func_name": __name__ + ".worker_pid",
+                    "outputs": ["B"],
+                },
+                memory("B"),
+            ]
+            quickDeploy(dm, sessionId, add_test_reprodata(graph))
+            b = dm._sessions[sessionId].drops["B"]
+            with droputils.DROPWaiterCtx(self, b, 5):
+                dm.trigger_drops(sessionId, ["A"])
+            self.assertEqual(DROPStates.COMPLETED, b.status)
+            pids.add(pickle.loads(droputils.allDropContents(b)))
+        self.assertEqual(1, len(pids))
+        self.assertNotIn(os.getpid(), pids)
+
+    def test_preloadModules(self):
+        """Workers import the configured modules when they start"""
+        self.assertNotIn("colorsys", sys.modules)
+        runner = NodeManagerProcessDropRunner(2, preload_modules=["colorsys"])
+        runner.start(("localhost", 0))
+        try:
+            futures = [runner.submit(is_module_loaded, "colorsys") for _ in range(4)]
+            self.assertTrue(all(f.result(10) for f in futures))
+        finally:
+            runner.close()
+
+class TestDMSharedMemoryProcessing(NodeManagerTestsBase, unittest.TestCase):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.use_processes = True
+
+    def _start_dm(self, threads=0, **kwargs):
+        kwargs.setdefault("use_shared_memory", True)
+        return super()._start_dm(threads=threads, **kwargs)
+
+    def test_sharedMemoryDataPlane(self):
+        """
+        Data flows through shared memory blocks. Inputs are exported when first
+        read, and their blocks unlinked once all their consumers finish
+        """
+        dm = self._start_dm(threads=2)
+        sessionId = "s1"
+        graph = [
+            memory("A"),
+            sleepAndCopy("B", inputs=["A"], outputs=["C"], sleep_time=0),
+            memory("C"),
+            {
+                "oid": "D",
+                "categoryType": "Application",
+                "dropclass": "dlg.apps.simple.SleepApp",
+                "sleep_time": 0.5,
+                "inputs": ["A"],
+                "outputs": ["E"],
+            },
+            memory("E"),
+        ]
+        quickDeploy(dm, sessionId, add_test_reprodata(graph))
+        a, c, e = [dm._sessions[sessionId].drops[x] for x in ("A", "C", "E")]
+
+        memory_manager = dm._memoryManager
+        exported = []
+
+        def export_drop(drop):
+            name, size = export_drop.original(drop)
+            exported.append(name)
+            return name, size
+
+        export_drop.original = memory_manager.export_drop
+        memory_manager.export_drop = export_drop
+
+        data = os.urandom(1024**2)
+        with droputils.DROPWaiterCtx(self, c, 5):
+            a.write(data)
+            a.setCompleted()
+        self.assertEqual(DROPStates.COMPLETED, c.status)
+        self.assertEqual(data, droputils.allDropContents(c))
+
+        # D doesn't read A, which stays exported only until D finishes
+        self.assertEqual(1, len(exported))
+        (name,) = exported
+        self.assertTrue(os.path.exists("/dev/shm" + name))
+        for _ in range(50):
+            if e.status == DROPStates.COMPLETED and not os.path.exists(
+                "/dev/shm" + name
+            ):
+                break
+            sleep(0.1)
+        self.assertEqual(DROPStates.COMPLETED, e.status)
+        self.assertFalse(os.path.exists("/dev/shm" + name))
+        self.assertEqual(set(), memory_manager._session_blocks[sessionId])
+        dm.destroySession(sessionId)
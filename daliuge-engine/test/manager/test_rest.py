@@ -19,9 +19,14 @@
 #    Foundation, Inc., 59 Temple Place, Suite 330, Boston,
 #    MA 02111-1307  USA
 #
+import http.client
+import io
+import json
 import tempfile
 import threading
+import time
 import unittest
+from unittest import mock
 
 from dlg import exceptions
 from dlg.common.deployment_methods import DeploymentMethods
@@ -32,6 +37,7 @@ from dlg.manager.client import NodeManagerClient, DataIslandManagerClient
 from dlg.manager.composite_manager import DataIslandManager
 from dlg.manager.node_manager import NodeManager
 from dlg.manager.rest import NMRestServer, CompositeManagerRestServer
+from dlg import restutils
 from dlg.restutils import RestClient
 
 default_repro = {
@@ -261,6 +267,145 @@ class TestRest(unittest.TestCase):
         )
         self.assertEqual({}, response["reprodata"])
 
+    def test_graph_stream(self):
+        """
+        Streams a graph into sessions on a NodeManager and a DataIslandManager
+        """
+        sid = "1234"
+
+        def graph_spec(n):
+            for i in range(n):
+                yield {
+                    "categoryType": "Data",
+                    "dropclass": "dlg.data.drops.memory.InMemoryDROP",
+                    "oid": str(i),
+                    "node": hostname,
+                    "island": hostname,
+                }
+
+        for port in (
+            constants.NODE_DEFAULT_REST_PORT,
+            constants.ISLAND_DEFAULT_REST_PORT,
+        ):
+            c = NodeManagerClient(hostname, port)
+            c.createSession(sid)
+            c.addGraphSpecStream(sid, graph_spec(5000))
+            self.assertEqual(5000, c.getGraphSize(sid))
+
+            # Errors are reported back
+            self.assertRaises(
+                (exceptions.InvalidGraphException, exceptions.SubManagerException),
+                c.addGraphSpecStream,
+                sid,
+                [{"oid": "a", "node": hostname, "island": hostname}],
+            )
+            c.destroySession(sid)
+
+    def test_keepalive(self):
+        """
+        Consecutive requests to a manager reuse a pooled connection, even after
+        errors, unless the request body is chunked
+        """
+        sid = "1234"
+        key = (hostname, constants.NODE_DEFAULT_REST_PORT)
+        pool = restutils.connection_pool
+        pool.clear()
+
+        def pooled_conn():
+            self.assertEqual(1, len(pool._idle[key]))
+            return pool._idle[key][0]
+
+        def drop_spec(oid):
+            return {
+                "categoryType": "Data",
+                "dropclass": "dlg.data.drops.memory.InMemoryDROP",
+                "oid": oid,
+            }
+
+        c = NodeManagerClient(hostname)
+        c.createSession(sid)
+        c._close()
+        conn = pooled_conn()
+        self.assertRaises(
+            exceptions.SessionAlreadyExistsException, c.createSession, sid
+        )
+        c._close()
+        self.assertIs(conn, pooled_conn())
+        NodeManagerClient(hostname).addGraphSpec(sid, [drop_spec("a")])
+        self.assertIs(conn, pooled_conn())
+
+        # Large uncompressed streams are sent chunked, after which the
+        # server closes the connection
+        graph = [drop_spec(str(i)) for i in range(10000)]
+        c._post_json(f"/sessions/{sid}/graph/append", graph)
+        c._close()
+        self.assertEqual(0, len(pool._idle[key]))
+        self.assertEqual(10001, c.getGraphSize(sid))
+        c.destroySession(sid)
+
+    def test_keepalive_idle_timeout(self):
+        """
+        Pooled connections closed by the server after its idle timeout are not
+        reused, so even chunked bodies (which can't be retried) get through
+        """
+        sid = "1234"
+        restutils.connection_pool.clear()
+        graph = [
+            {
+                "categoryType": "Data",
+                "dropclass": "dlg.data.drops.memory.InMemoryDROP",
+                "oid": str(i),
+            }
+            for i in range(2500)
+        ]
+        content = json.dumps(graph).encode("utf8")
+        self.assertGreater(len(content), 200 * 1024)
+
+        with mock.patch.object(
+            restutils.KeepAliveWSGIRequestHandler, "idle_timeout", 0.1
+        ):
+            c = NodeManagerClient(hostname)
+            c.createSession(sid)
+            c._close()
+            time.sleep(0.5)
+            c._POST(
+                f"/sessions/{sid}/graph/append",
+                io.BytesIO(content),
+                content_type="application/json",
+            )
+            c._close()
+        self.assertEqual(2500, c.getGraphSize(sid))
+        c.destroySession(sid)
+
+    def test_keepalive_replay(self):
+        """
+        Requests on a pooled connection that fails after they were sent are
+        replayed only if idempotent, or if the server closed or reset the
+        connection without answering
+        """
+        sid = "1234"
+        c = NodeManagerClient(hostname)
+
+        def broken_conn(error):
+            conn = mock.MagicMock()
+            conn.getresponse.side_effect = error
+            return conn
+
+        pool = restutils.connection_pool
+        conn = broken_conn(ConnectionAbortedError)
+        with mock.patch.object(pool, "get", return_value=conn):
+            self.assertRaises(ConnectionAbortedError, c.createSession, sid)
+            c._close()
+            self.assertEqual([], c.sessions())
+            c._close()
+        for error in (ConnectionResetError, http.client.RemoteDisconnected):
+            conn = broken_conn(error)
+            with mock.patch.object(pool, "get", return_value=conn):
+                c.createSession(sid)
+                c._close()
+            self.assertEqual([sid], [s["sessionId"] for s in c.sessions()])
+            c.destroySession(sid)
+
     def test_reprostatus_get(self):
         # Test with reprodata
         sid = "1234"
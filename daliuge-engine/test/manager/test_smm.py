@@ -23,11 +23,15 @@
 Module tests shared memory manager.
 """
 
+import os
 import sys
 import unittest
 
+from dlg.data.drops.memory import InMemoryDROP
+
 if sys.version_info >= (3, 8):
     from dlg.manager.shared_memory_manager import DlgSharedMemoryManager
+    from dlg.shared_memory import DlgSharedMemory
 
 
 @unittest.skipIf(sys.version_info < (3, 8), "Shared memory does not work < python 3.8")
@@ -106,3 +110,25 @@ class TestSharedMemoryManager(unittest.TestCase):
             manager.shutdown_all()
         except KeyError:
             self.fail("Manager errored when shutting down empty")
+
+    def test_export_drop(self):
+        """
+        Drops are exported once, and their block released when all their consumers finish
+        """
+        manager = DlgSharedMemoryManager()
+        drop = InMemoryDROP("A", "A", dlg_session_id="session1")
+        drop.write(b"abcdef")
+        drop.setCompleted()
+        name, size = manager.export_drop(drop)
+        self.assertEqual(6, size)
+        self.assertEqual((name, size), manager.export_drop(drop))
+        block = DlgSharedMemory(name)
+        self.assertEqual(b"abcdef", bytes(block.buf[:size]))
+        block.close()
+
+        manager.consumer_finished(drop, "B", {"B", "C"})
+        self.assertTrue(os.path.exists("/dev/shm" + name))
+        manager.consumer_finished(drop, "C", {"B", "C"})
+        self.assertFalse(os.path.exists("/dev/shm" + name))
+        self.assertNotEqual(name, manager.export_drop(drop)[0])
+        manager.shutdown_all()
@@ -0,0 +1,157 @@
+#
+#    ICRAR - International Centre for Radio Astronomy Research
+#    (c) UWA - The University of Western Australia, 2024
+#    Copyright by UWA (in the framework of the ICRAR)
+#    All rights reserved
+#
+#    This library is free software; you can redistribute it and/or
+#    modify it under the terms of the GNU Lesser General Public
+#    License as published by the Free Software Foundation; either
+#    version 2.1 of the License, or (at your option) any later version.
+#
+#    This library is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#    Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public
+#    License along with this library; if not, write to the Free Software
+#    Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+#    MA 02111-1307  USA
+#
+"""
+A small benchmark that measures how long a DataIslandManager takes to create,
+append a graph to, deploy and destroy sessions across many NodeManagers. The
+NodeManagers are local stand-ins running in this same process, each listening
+on its own port, so the time is dominated by the REST fan-out of the DIM.
+"""
+
+import sys
+import threading
+import time
+from optparse import OptionParser
+
+from dlg.manager.composite_manager import DataIslandManager
+from dlg.manager.node_manager import NodeManager
+from dlg.manager.rest import NMRestServer
+from dlg.utils import portIsOpen
+
+OPERATIONS = ("create", "append", "deploy", "destroy")
+
+
+def start_nms(n, base_port):
+    """
+    Starts `n` NodeManagers and returns their hosts and servers. Their REST,
+    RPC and events ports start at `base_port`, `base_port` + 1000 and
+    `base_port` + 2000 respectively
+    """
+    hosts, servers = [], []
+    for port in range(base_port, base_port + n):
+        nm = NodeManager(False, rpc_port=port + 1000, events_port=port + 2000)
+        server = NMRestServer(nm)
+        thread = threading.Thread(target=server.start, args=("localhost", port))
+        thread.start()
+        assert portIsOpen("localhost", port, 5)
+        hosts.append("localhost:%d" % port)
+        servers.append((server, thread))
+    return hosts, servers
+
+
+def stop_nms(servers):
+    for server, thread in servers:
+        server.stop()
+        thread.join()
+        server.dm.shutdown()
+
+
+def graph(hosts, drops_per_node):
+    spec = []
+    for host in hosts:
+        for i in range(drops_per_node):
+            spec.append(
+                {
+                    "oid": "%s/%d" % (host, i),
+                    "categoryType": "Data",
+                    "dropclass": "dlg.data.drops.memory.InMemoryDROP",
+                    "node": host,
+                }
+            )
+    return spec
+
+
+def measure(dim, hosts, sessions, drops_per_node):
+    """
+    Runs `sessions` sessions through `dim` and returns the average time taken
+    by each of the operations, in seconds
+    """
+    times = dict.fromkeys(OPERATIONS, 0)
+    for s in range(sessions):
+        sid = "session-%d" % s
+        operations = (
+            ("create", lambda: dim.createSession(sid)),
+            ("append", lambda: dim.addGraphSpec(sid, graph(hosts, drops_per_node))),
+            ("deploy", lambda: dim.deploySession(sid)),
+            ("destroy", lambda: dim.destroySession(sid)),
+        )
+        for name, operation in operations:
+            start = time.time()
+            operation()
+            times[name] += time.time() - start
+    return {name: t / sessions for name, t in times.items()}
+
+
+if __name__ == "__main__":
+
+    parser = OptionParser()
+    parser.add_option(
+        "-n",
+        "--nodes",
+        action="store",
+        type="string",
+        dest="nodes",
+        help="Comma-separated numbers of NodeManagers (default 10,50,100)",
+        default="10,50,100",
+    )
+    parser.add_option(
+        "-s",
+        "--sessions",
+        action="store",
+        type="int",
+        dest="sessions",
+        help="Number of sessions to average over (default 5)",
+        default=5,
+    )
+    parser.add_option(
+        "-d",
+        "--drops",
+        action="store",
+        type="int",
+        dest="drops",
+        help="Number of DROPs per NodeManager (default 10)",
+        default=10,
+    )
+    parser.add_option(
+        "-p",
+        "--port",
+        action="store",
+        type="int",
+        dest="port",
+        help="Port of the first NodeManager (default 18000)",
+        default=18000,
+    )
+    (options, args) = parser.parse_args(sys.argv)
+
+    for n in [int(x) for x in options.nodes.split(",")]:
+        hosts, servers = start_nms(n, options.port)
+        dim = DataIslandManager(hosts)
+        try:
+            times = measure(dim, hosts, options.sessions, options.drops)
+        finally:
+            dim.shutdown()
+            stop_nms(servers)
+        print(
+            "%4d NMs: " % n
+            + ", ".join(
+                "%s %8.3f [ms]" % (name, times[name] * 1000) for name in OPERATIONS
+            )
+        )
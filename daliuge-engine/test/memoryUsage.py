@@ -21,34 +21,54 @@
 #
 """
 A small module that measures the average memory consumption of different
-DROP types. It was initially developed to address PRO-234.
+DROP types. It was initially developed to address PRO-234, and is now used as
+a regression benchmark: by default it reports the bytes used per DROP for each
+of the most common DROP types, and can fail if any of them goes over a limit.
 """
 
+import gc
 import importlib
 import sys
+import time
+import tracemalloc
 from optparse import OptionParser
 
-import psutil
+DEFAULT_TYPES = (
+    "dlg.data.drops.memory.InMemoryDROP",
+    "dlg.data.drops.file.FileDROP",
+    "dlg.data.drops.data_base.NullDROP",
+    "dlg.apps.simple.SleepApp",
+    "dlg.apps.simple.CopyApp",
+)
 
 
 def measure(n, droptype):
     """
-    Create `n` DROPs of type `droptype` and measure how much memory does the
-    program use at the beginning and the end of the process. It returns a list
-    with the total amount of memory, user time and system time used during the
-    creation of all the DROP instances
+    Create `n` DROPs of type `droptype` and measure how much memory has been
+    allocated by the program at the beginning and the end of the process. It
+    returns a list with the total amount of memory, user time and system time
+    used during the creation of all the DROP instances
     """
-    p = psutil.Process()
-    mem1 = p.memory_info()[0]
-    uTime1, sTime1 = p.cpu_times()
     drops = []
-    for i in xrange(n):
+    gc.collect()
+    tracemalloc.start()
+    mem1 = tracemalloc.get_traced_memory()[0]
+    times1 = time.process_time(), time.perf_counter()
+    for i in range(n):
         uid = str(i)
         drops.append(droptype(uid, uid))
-    mem2 = p.memory_info()[0]
-    uTime2, sTime2 = p.cpu_times()
+    times2 = time.process_time(), time.perf_counter()
+    mem2 = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
 
-    return mem2 - mem1, uTime2 - uTime1, sTime2 - sTime1
+    return mem2 - mem1, times2[0] - times1[0], times2[1] - times1[1]
+
+
+def _load_type(name):
+    parts = name.split(".")
+    modname = ".".join(parts[:-1])
+    classname = parts[-1]
+    return getattr(importlib.import_module(modname), classname)
 
 
 if __name__ == "__main__":
@@ -67,55 +87,55 @@ if __name__ == "__main__":
         action="store",
         type="int",
         dest="instances",
-        help="Number of DROP instances to create and measure",
+        help="Number of DROP instances to create and measure (default 10000)",
+        default=10000,
     )
     parser.add_option(
         "-t",
         "--type",
-        action="store",
+        action="append",
         type="string",
-        dest="type",
-        help="DROP type to instantiate",
+        dest="types",
+        help="DROP type to instantiate, can be given more than once "
+        "(default: the most common DROP types)",
+    )
+    parser.add_option(
+        "-m",
+        "--max-bytes",
+        action="store",
+        type="int",
+        dest="max_bytes",
+        help="Fail if any DROP type uses more than these many bytes per DROP",
     )
     (options, args) = parser.parse_args(sys.argv)
 
-    if options.type is None:
-        parser.error("DROP type to instantiate not specified")
-    if options.instances is None:
-        parser.error("Number of instances to create not specified")
-
     n = options.instances
-    parts = options.type.split(".")
-    modname = ".".join(parts[:-1])
-    classname = parts[-1]
-    droptype = getattr(importlib.import_module(modname), classname)
-    mem, uTime, sTime = measure(n, droptype)
-    tTime = uTime + sTime
-    memAvg, uTimeAvg, sTimeAvg, tTimeAvg = [
-        x / float(n) for x in (mem, uTime, sTime, tTime)
-    ]
-
-    if options.csv:
-        print(
-            "%s,%d,%d,%.2f,%.2f,%.2f,%.2f,%.2f,%.2f,%.2f"
-            % (
-                options.type,
-                n,
-                mem,
-                uTime * 1e3,
-                sTime * 1e3,
-                tTime * 1e3,
-                memAvg,
-                uTimeAvg * 1e6,
-                sTimeAvg * 1e6,
-                tTimeAvg * 1e6,
+    over_limit = []
+    for typename in options.types or DEFAULT_TYPES:
+        droptype = _load_type(typename)
+        mem, cpuTime, wallTime = measure(n, droptype)
+        memAvg = mem / float(n)
+        if options.csv:
+            print(
+                "%s,%d,%d,%.2f,%.2f,%.2f,%.2f"
+                % (
+                    typename,
+                    n,
+                    mem,
+                    memAvg,
+                    cpuTime * 1e3,
+                    cpuTime / n * 1e6,
+                    wallTime * 1e3,
+                )
+            )
+        else:
+            print(
+                "%-40s %9.1f bytes per DROP, %6.2f usec CPU per DROP"
+                % (droptype.__name__, memAvg, cpuTime / n * 1e6)
             )
-        )
-    else:
-        print(
-            "%d bytes used by %d %ss (%.2f bytes per DROP)"
-            % (mem, n, droptype.__name__, memAvg)
-        )
-        print("Total time:  %.2f msec (%.2f msec per DROP)" % (tTime, tTimeAvg))
-        print("User time:   %.2f msec (%.2f msec per DROP)" % (uTime, uTimeAvg))
-        print("System time: %.2f msec (%.2f msec per DROP)" % (sTime, sTimeAvg))
+        if options.max_bytes and memAvg > options.max_bytes:
+            over_limit.append(typename)
+
+    if over_limit:
+        print("DROP types over %d bytes: %s" % (options.max_bytes, over_limit))
+        sys.exit(1)
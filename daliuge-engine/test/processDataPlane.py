@@ -0,0 +1,141 @@
+#
+#    ICRAR - International Centre for Radio Astronomy Research
+#    (c) UWA - The University of Western Australia, 2024
+#    Copyright by UWA (in the framework of the ICRAR)
+#    All rights reserved
+#
+#    This library is free software; you can redistribute it and/or
+#    modify it under the terms of the GNU Lesser General Public
+#    License as published by the Free Software Foundation; either
+#    version 2.1 of the License, or (at your option) any later version.
+#
+#    This library is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#    Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public
+#    License along with this library; if not, write to the Free Software
+#    Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+#    MA 02111-1307  USA
+#
+"""
+A small benchmark that measures the throughput of an application that reads a
+numpy array from an in-memory input and writes it into an in-memory output,
+when run by a NodeManager using threads, using processes that access the data
+over RPC, and using processes that access the data through shared memory.
+"""
+
+import sys
+import threading
+import time
+from optparse import OptionParser
+
+import numpy as np
+
+from dlg import droputils
+from dlg.apps.app_base import BarrierAppDROP
+from dlg.ddap_protocol import DROPStates
+from dlg.manager.node_manager import NodeManager
+
+MODES = {
+    "threads": {"use_processes": False},
+    "processes": {"use_processes": True},
+    "shared-memory": {"use_processes": True, "use_shared_memory": True},
+}
+
+# Size of the individual writes done by the application
+CHUNK_SIZE = 4 * 1024**2
+
+
+class ArrayCopyApp(BarrierAppDROP):
+    """Maps its input as an array of doubles, and writes it to its output"""
+
+    def run(self):
+        array = np.frombuffer(self.inputs[0].buffer(), dtype=np.float64)
+        data = memoryview(array).cast("B")
+        output = self.outputs[0]
+        for start in range(0, data.nbytes, CHUNK_SIZE):
+            output.write(data[start : start + CHUNK_SIZE])
+
+
+def graph():
+    memory = "dlg.data.drops.memory.InMemoryDROP"
+    return [
+        {"oid": "A", "categoryType": "Data", "dropclass": memory, "consumers": ["B"]},
+        {
+            "oid": "B",
+            "categoryType": "Application",
+            "dropclass": __name__ + ".ArrayCopyApp",
+            "outputs": ["C"],
+        },
+        {"oid": "C", "categoryType": "Data", "dropclass": memory},
+    ]
+
+
+def measure(size, mode, timeout):
+    """
+    Runs the copy of an array of `size` bytes with a NodeManager in the given
+    `mode`, and returns the time it took, in seconds
+    """
+    nm = NodeManager(max_threads=1, **MODES[mode])
+    try:
+        nm.createSession("s")
+        nm.addGraphSpec("s", graph())
+        nm.deploySession("s")
+        a, c = [nm._sessions["s"].drops[uid] for uid in "AC"]
+        a.write(memoryview(np.ones(size // 8, dtype=np.float64)).cast("B"))
+
+        finished = threading.Event()
+        c.subscribe(droputils.EvtConsumer(finished), "status")
+        start = time.time()
+        a.setCompleted()
+        assert finished.wait(timeout), "copy timed out"
+        delta = time.time() - start
+        assert c.status == DROPStates.COMPLETED, "copy failed"
+        assert c.size == size // 8 * 8
+        nm.destroySession("s")
+    finally:
+        nm.shutdown()
+    return delta
+
+
+if __name__ == "__main__":
+
+    parser = OptionParser()
+    parser.add_option(
+        "-s",
+        "--sizes",
+        action="store",
+        type="string",
+        dest="sizes",
+        help="Comma-separated payload sizes in MiB (default 1024)",
+        default="1024",
+    )
+    parser.add_option(
+        "-m",
+        "--modes",
+        action="store",
+        type="string",
+        dest="modes",
+        help="Comma-separated execution modes (default %s)" % ",".join(MODES),
+        default=",".join(MODES),
+    )
+    parser.add_option(
+        "-t",
+        "--timeout",
+        action="store",
+        type="int",
+        dest="timeout",
+        help="Seconds to wait for each copy to finish (default 600)",
+        default=600,
+    )
+    (options, args) = parser.parse_args(sys.argv)
+
+    for size in [int(s) * 1024**2 for s in options.sizes.split(",")]:
+        for mode in options.modes.split(","):
+            delta = measure(size, mode, options.timeout)
+            print(
+                "%13s %6d MiB payload: %8.3f [s], %8.2f MiB/s"
+                % (mode, size // 1024**2, delta, size / 1024**2 / delta)
+            )
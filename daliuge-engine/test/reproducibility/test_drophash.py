@@ -23,12 +23,19 @@
 Tests the low-level functionality for drops to hash runtime data.
 """
 
+import os
+import tempfile
+import threading
 import unittest
+from unittest import mock
 
 from dlg.common.reproducibility.constants import ReproducibilityFlags
 from dlg.common.reproducibility.reproducibility import common_hash
 from dlg.ddap_protocol import DROPStates
+from dlg.data.drops.file import FileDROP
+from dlg.data.drops.memory import InMemoryDROP
 from dlg.drop import AbstractDROP
+from dlg.manager.node_manager import NodeManagerThreadDropRunner
 from merklelib import MerkleTree
 
 
@@ -125,3 +132,54 @@ class AbstractDROPHashTests(unittest.TestCase):
         drop_a.reproducibility_level = ReproducibilityFlags.RERUN
         drop_a.commit()
         self.assertTrue(isinstance(drop_a.merkleroot, str))
+
+
+class _EventSetter(threading.Event):
+    def handleEvent(self, _evt):
+        self.set()
+
+
+class DataDROPHashTests(unittest.TestCase):
+    """
+    Tests the data hashes included in the reprodata of DataDROPs
+    """
+
+    def test_hash_on_write(self):
+        """
+        Tests that the data hash is built up while writing, and that the data
+        is not read back when committing.
+        """
+        drop_a = InMemoryDROP("a", "a")
+        drop_a.reproducibility_level = ReproducibilityFlags.REPRODUCE
+        for chunk in (b"abc", b"def", memoryview(b"ghi")):
+            drop_a.write(chunk)
+        with mock.patch("dlg.data.drops.data_base.stream_hash") as stream_hash:
+            drop_a.setCompleted()
+        stream_hash.assert_not_called()
+        self.assertEqual(
+            {"data_hash": common_hash(b"abcdefghi")}, drop_a._merkleData
+        )
+
+    def test_hash_external_data(self):
+        """
+        Tests that data not written through a DROP is hashed once it is
+        completed, and that it can be done on a drop runner.
+        """
+        with tempfile.TemporaryDirectory() as tmpdir:
+            for runner in (None, NodeManagerThreadDropRunner(1)):
+                drop_a = FileDROP("a", "a", filepath=os.path.join(tmpdir, "a"))
+                drop_a.reproducibility_level = ReproducibilityFlags.REPRODUCE
+                with open(drop_a.path, "wb") as f:
+                    f.write(b"x" * 100000)
+                if runner:
+                    runner.start(None)
+                    drop_a._drop_runner = runner
+                listener = _EventSetter()
+                drop_a.subscribe(listener, "reproducibility")
+                drop_a.setCompleted()
+                self.assertTrue(listener.wait(10))
+                if runner:
+                    runner.close()
+                self.assertEqual(
+                    {"data_hash": common_hash(b"x" * 100000)}, drop_a._merkleData
+                )
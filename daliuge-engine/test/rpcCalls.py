@@ -0,0 +1,134 @@
+#
+#    ICRAR - International Centre for Radio Astronomy Research
+#    (c) UWA - The University of Western Australia, 2024
+#    Copyright by UWA (in the framework of the ICRAR)
+#    All rights reserved
+#
+#    This library is free software; you can redistribute it and/or
+#    modify it under the terms of the GNU Lesser General Public
+#    License as published by the Free Software Foundation; either
+#    version 2.1 of the License, or (at your option) any later version.
+#
+#    This library is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#    Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public
+#    License along with this library; if not, write to the Free Software
+#    Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+#    MA 02111-1307  USA
+#
+"""
+A small micro-benchmark that measures how many RPC calls per second a
+NodeManager can issue against the drops of another NodeManager. Calls are
+made synchronously from one or more threads, and, when the RPC client
+supports it, also pipelined from a single thread.
+"""
+
+import sys
+import threading
+import time
+from optparse import OptionParser
+
+from dlg.manager.node_manager import NodeManager
+
+
+def measure(client, session_id, n, threads):
+    """
+    Issues `n` synchronous get_drop_property calls through `client`, spread
+    over `threads` threads, and returns the time it took, in seconds
+    """
+
+    def call(count):
+        for _ in range(count):
+            client.get_drop_property(session_id, "A", "status")
+
+    workers = [
+        threading.Thread(target=call, args=(n // threads,)) for _ in range(threads)
+    ]
+    start = time.time()
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+    return time.time() - start
+
+
+def measure_pipelined(client, session_id, n, depth):
+    """
+    Issues `n` get_drop_property calls through `client` from a single thread,
+    keeping up to `depth` of them in flight, and returns the time it took,
+    in seconds
+    """
+    start = time.time()
+    in_flight = []
+    for _ in range(n):
+        if len(in_flight) == depth:
+            in_flight.pop(0).result()
+        in_flight.append(
+            client.call_async("get_drop_property", session_id, "A", "status")
+        )
+    for f in in_flight:
+        f.result()
+    return time.time() - start
+
+
+if __name__ == "__main__":
+
+    parser = OptionParser()
+    parser.add_option(
+        "-n",
+        "--calls",
+        action="store",
+        type="int",
+        dest="calls",
+        help="Number of calls per measurement (default 2000)",
+        default=2000,
+    )
+    parser.add_option(
+        "-t",
+        "--threads",
+        action="store",
+        type="string",
+        dest="threads",
+        help="Comma-separated numbers of calling threads (default 1,4,16)",
+        default="1,4,16",
+    )
+    (options, args) = parser.parse_args(sys.argv)
+
+    nms = [
+        NodeManager(host="localhost", events_port=5853 + i, rpc_port=6966 + i)
+        for i in range(2)
+    ]
+    try:
+        session_id = "rpc-calls"
+        nms[0].createSession(session_id)
+        nms[0].addGraphSpec(
+            session_id,
+            [
+                {
+                    "oid": "A",
+                    "categoryType": "Data",
+                    "dropclass": "dlg.data.drops.memory.InMemoryDROP",
+                }
+            ],
+        )
+        nms[0].deploySession(session_id)
+        client, _ = nms[1].get_rpc_client("localhost", nms[0]._rpc_port)
+
+        n = options.calls
+        for threads in [int(s) for s in options.threads.split(",")]:
+            delta = measure(client, session_id, n, threads)
+            print(
+                "%3d threads, sync calls: %8.1f calls/s" % (threads, n / delta)
+            )
+        if hasattr(client, "call_async"):
+            for depth in (16, 128):
+                delta = measure_pipelined(client, session_id, n, depth)
+                print(
+                    "%3d in flight, pipelined: %8.1f calls/s" % (depth, n / delta)
+                )
+    finally:
+        for nm in nms:
+            nm.shutdown()
@@ -0,0 +1,97 @@
+#
+#    ICRAR - International Centre for Radio Astronomy Research
+#    (c) UWA - The University of Western Australia, 2024
+#    Copyright by UWA (in the framework of the ICRAR)
+#    All rights reserved
+#
+#    This library is free software; you can redistribute it and/or
+#    modify it under the terms of the GNU Lesser General Public
+#    License as published by the Free Software Foundation; either
+#    version 2.1 of the License, or (at your option) any later version.
+#
+#    This library is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#    Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public
+#    License along with this library; if not, write to the Free Software
+#    Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+#    MA 02111-1307  USA
+#
+"""
+A small benchmark that measures how long it takes to stream data into a
+SharedMemoryIO in fixed-size chunks. Since shared memory blocks grow
+geometrically the time per byte should stay constant as the total size grows,
+i.e., writing is linear on the total amount of data.
+"""
+
+import sys
+import time
+import uuid
+from optparse import OptionParser
+
+from dlg.data.io import OpenMode, SharedMemoryIO
+from dlg.shared_memory import DlgSharedMemory
+
+
+def measure(total, chunk_size):
+    """
+    Writes `total` bytes into a new SharedMemoryIO in chunks of `chunk_size`
+    bytes and returns the time it took, in seconds
+    """
+    chunk = b"x" * chunk_size
+    n_chunks = total // chunk_size
+    name = uuid.uuid4().hex[:8]
+    shm_io = SharedMemoryIO(name, "b")
+    shm_io.open(OpenMode.OPEN_WRITE)
+    start = time.time()
+    for _ in range(n_chunks):
+        shm_io.write(chunk)
+    shm_io.close()
+    delta = time.time() - start
+
+    block = DlgSharedMemory(f"b_{name}")
+    assert block.size == n_chunks * chunk_size
+    block.close()
+    block.unlink()
+    return delta
+
+
+if __name__ == "__main__":
+
+    parser = OptionParser()
+    parser.add_option(
+        "-s",
+        "--size",
+        action="store",
+        type="int",
+        dest="size",
+        help="Largest total size to write, in MiB (default 1024)",
+        default=1024,
+    )
+    parser.add_option(
+        "-c",
+        "--chunk-size",
+        action="store",
+        type="int",
+        dest="chunk_size",
+        help="Size of each individual write, in KiB (default 64)",
+        default=64,
+    )
+    (options, args) = parser.parse_args(sys.argv)
+
+    chunk_size = options.chunk_size * 1024
+    total = 16 * 1024**2
+    while total <= options.size * 1024**2:
+        delta = measure(total, chunk_size)
+        print(
+            "%5d MiB in %6d chunks: %7.3f [s], %8.2f MiB/s"
+            % (
+                total // 1024**2,
+                total // chunk_size,
+                delta,
+                total / 1024**2 / delta,
+            )
+        )
+        total *= 2
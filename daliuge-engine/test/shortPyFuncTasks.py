@@ -0,0 +1,147 @@
+#
+#    ICRAR - International Centre for Radio Astronomy Research
+#    (c) UWA - The University of Western Australia, 2024
+#    Copyright by UWA (in the framework of the ICRAR)
+#    All rights reserved
+#
+#    This library is free software; you can redistribute it and/or
+#    modify it under the terms of the GNU Lesser General Public
+#    License as published by the Free Software Foundation; either
+#    version 2.1 of the License, or (at your option) any later version.
+#
+#    This library is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#    Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public
+#    License along with this library; if not, write to the Free Software
+#    Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+#    MA 02111-1307  USA
+#
+"""
+A small benchmark that measures how long a NodeManager running applications
+in worker processes takes to run a graph made of many short, independent
+PyFuncApps, all of them running the same function, given either by name or by
+code.
+"""
+
+import base64
+import sys
+import threading
+import time
+from optparse import OptionParser
+
+from dlg import droputils
+from dlg.apps.pyfunc import serialize_func
+from dlg.ddap_protocol import DROPStates
+from dlg.manager.node_manager import NodeManager
+
+
+def short_task():
+    return sum(range(100))
+
+
+def graph(n, by_code):
+    func = {"func_name": __name__ + ".short_task"}
+    if by_code:
+        code, defaults = serialize_func(short_task)
+        func = {
+            "func_name": "short_task",
+            "func_code": base64.b64encode(code).decode("utf8"),
+            "func_defaults": defaults,
+        }
+    spec = []
+    for i in range(n):
+        spec.append(
+            {
+                "oid": "app%d" % i,
+                "categoryType": "Application",
+                "dropclass": "dlg.apps.pyfunc.PyFuncApp",
+                "outputs": ["out%d" % i],
+                **func,
+            }
+        )
+        spec.append(
+            {
+                "oid": "out%d" % i,
+                "categoryType": "Data",
+                "dropclass": "dlg.data.drops.memory.InMemoryDROP",
+            }
+        )
+    return spec
+
+
+def measure(n, workers, by_code, timeout):
+    """
+    Runs `n` tasks on a NodeManager with `workers` worker processes, and
+    returns the time it took, in seconds
+    """
+    nm = NodeManager(max_threads=workers, use_processes=True)
+    try:
+        nm.createSession("s")
+        nm.addGraphSpec("s", graph(n, by_code))
+        nm.deploySession("s")
+        outputs = [nm._sessions["s"].drops["out%d" % i] for i in range(n)]
+        events = []
+        for output in outputs:
+            events.append(threading.Event())
+            output.subscribe(droputils.EvtConsumer(events[-1]), "status")
+
+        start = time.time()
+        nm.trigger_drops("s", ["app%d" % i for i in range(n)])
+        for evt in events:
+            assert evt.wait(timeout), "tasks timed out"
+        delta = time.time() - start
+        assert all(o.status == DROPStates.COMPLETED for o in outputs), "tasks failed"
+        nm.destroySession("s")
+    finally:
+        nm.shutdown()
+    return delta
+
+
+if __name__ == "__main__":
+
+    parser = OptionParser()
+    parser.add_option(
+        "-n",
+        "--tasks",
+        action="store",
+        type="string",
+        dest="tasks",
+        help="Comma-separated numbers of tasks (default 100,1000)",
+        default="100,1000",
+    )
+    parser.add_option(
+        "-w",
+        "--workers",
+        action="store",
+        type="int",
+        dest="workers",
+        help="Number of worker processes (default 4)",
+        default=4,
+    )
+    parser.add_option(
+        "-c",
+        "--code",
+        action="store_true",
+        dest="code",
+        help="Give the function by code instead of by name",
+        default=False,
+    )
+    parser.add_option(
+        "-t",
+        "--timeout",
+        action="store",
+        type="int",
+        dest="timeout",
+        help="Seconds to wait for all tasks to finish (default 600)",
+        default=600,
+    )
+    (options, args) = parser.parse_args(sys.argv)
+
+    for n in [int(x) for x in options.tasks.split(",")]:
+        delta = measure(n, options.workers, options.code, options.timeout)
+        print(
+            "%6d tasks: %8.3f [s], %8.3f [ms] per task" % (n, delta, delta * 1000 / n)
+        )
@@ -23,6 +23,7 @@
 import contextlib
 import io
 import os, unittest
+import pickle
 import random
 import shutil
 import sqlite3
@@ -946,6 +947,29 @@ class TestDROP(unittest.TestCase):
         self.assertEqual(DROPStates.COMPLETED, a.status)
         self.assertEqual(AppDROPStates.FINISHED, a.execStatus)
 
+    def test_compact_drops(self):
+        """Relationship containers are only created when needed"""
+        a = InMemoryDROP("a", "a")
+        b = NullBarrierApp("b", "b")
+        self.assertEqual([], a.consumers)
+        self.assertEqual([], a.producers)
+        self.assertEqual({}, dict(a.parameters))
+        a.addConsumer(b)
+        self.assertEqual([b], a.consumers)
+        self.assertEqual([a], b.inputs)
+        self.assertEqual([], a.streamingConsumers)
+        self.assertIs(a.uid, InMemoryDROP("x", "".join(["a"])).uid)
+
+        # Slotted attributes survive pickling
+        a2 = pickle.loads(pickle.dumps(a))
+        self.assertEqual("a", a2.uid)
+        self.assertEqual(DROPStates.INITIALIZED, a2.status)
+        self.assertEqual(["b"], [c.uid for c in a2.consumers])
+        a2.write(b"data")
+        a2.setCompleted()
+        self.assertEqual(4, a2.size)
+        self.assertEqual(b"data", droputils.allDropContents(a2))
+
     def test_rdbms_drop(self):
         dbfile = f"{tempfile.mkdtemp()}/test_rdbms_drop.db"
         if os.path.isfile(dbfile):
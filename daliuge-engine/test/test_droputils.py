@@ -25,6 +25,7 @@ Created on 20 Jul 2015
 @author: rtobar
 """
 
+import gc
 import subprocess
 import unittest
 
@@ -149,6 +150,17 @@ class DropUtilsTest(unittest.TestCase):
         endNodes = droputils.getLeafNodes(a)
         self.assertSetEqual(set([j, f]), set(endNodes))
 
+    def testCriticalPathLengths(self):
+        """
+        Checks that getCriticalPathLengths follows the longest path
+        """
+        a, b, c, d, e, f, g, h, i, j = self._createGraph()
+        lengths = droputils.getCriticalPathLengths(
+            a, lambda drop: 1 if isinstance(drop, BarrierAppDROP) else 0
+        )
+        expected = {a: 3, b: 3, c: 2, d: 2, e: 1, f: 0, g: 2, h: 1, i: 1, j: 0}
+        self.assertDictEqual({x.uid: n for x, n in expected.items()}, lengths)
+
     def _test_datadrop_function(self, test_function, input_data):
         # basic datadrop
         for drop_type in (InMemoryDROP, FileDROP):
@@ -186,6 +198,101 @@ class DropUtilsTest(unittest.TestCase):
         input_data = numpy.ones([3, 5])
         self._test_datadrop_function(self._test_save_load_npy, input_data)
 
+    def test_load_npy_zero_copy(self):
+        """
+        Arrays loaded from in-memory DROPs are read-only views of the DROP's
+        data, not copies of it
+        """
+        input_data = numpy.arange(15, dtype=numpy.float32).reshape([3, 5])
+        drop = InMemoryDROP("a", "a")
+        drop_loaders.save_npy(drop, input_data)
+        output_data = drop_loaders.load_npy(drop)
+        numpy.testing.assert_equal(input_data, output_data)
+        self.assertFalse(output_data.flags.writeable)
+        self.assertFalse(output_data.flags.owndata)
+
+        fortran_data = numpy.asfortranarray(input_data)
+        drop = InMemoryDROP("b", "b")
+        drop_loaders.save_npy(drop, fortran_data)
+        output_data = drop_loaders.load_npy(drop)
+        numpy.testing.assert_equal(fortran_data, output_data)
+        self.assertTrue(output_data.flags.f_contiguous)
+
+        # Arrays built from a private copy of the data can be written to
+        drop = FileDROP("c", "c")
+        drop_loaders.save_npy(drop, input_data)
+        output_data = drop_loaders.load_npy(drop)
+        numpy.testing.assert_equal(input_data, output_data)
+        self.assertTrue(output_data.flags.writeable)
+        drop.delete()
+
+    def test_drop_buffer(self):
+        """
+        DataDROP.buffer gives access to the whole DROP contents, directly on
+        top of the data for in-memory DROPs
+        """
+        for drop_type in (InMemoryDROP, FileDROP):
+            drop = drop_type("a", "a")
+            drop.write(b"abc")
+            drop.write(b"def")
+            self.assertRaises(Exception, drop.buffer)
+            drop.setCompleted()
+            buf = drop.buffer()
+            self.assertEqual(b"abcdef", bytes(buf))
+            if drop_type is InMemoryDROP:
+                self.assertIsInstance(buf, memoryview)
+                self.assertTrue(buf.readonly)
+            drop.delete()
+
+    def test_mmap_file_drop(self):
+        """
+        FileDROPs using mmap give readers a view over a mapping of the file,
+        and count as being read while that mapping is alive
+        """
+        drop = FileDROP("a", "a", use_mmap=True)
+        drop.write(b"abcdef")
+        drop.setCompleted()
+        buf = drop.buffer()
+        self.assertIsInstance(buf, memoryview)
+        self.assertTrue(buf.readonly)
+        self.assertEqual(b"bcd", buf[1:4])
+        self.assertTrue(drop.isBeingRead())
+        del buf
+        gc.collect()
+        self.assertFalse(drop.isBeingRead())
+        drop.delete()
+
+        input_data = numpy.arange(15).reshape([3, 5])
+        drop = FileDROP("b", "b", use_mmap=True)
+        drop_loaders.save_npy(drop, input_data)
+        self.assertRaises(Exception, drop_loaders.load_npy, drop)
+        drop.setCompleted()
+        opened = []
+
+        class OpenListener(object):
+            def handleEvent(self, evt):
+                opened.append(evt)
+
+        drop.subscribe(OpenListener(), "open")
+        output_data = drop_loaders.load_npy(drop)
+        self.assertEqual(1, len(opened))
+        numpy.testing.assert_equal(input_data, output_data)
+        self.assertFalse(output_data.flags.writeable)
+        self.assertFalse(output_data.flags.owndata)
+        column = output_data[:, 1]
+        rows = output_data[1:3]
+        del output_data
+        gc.collect()
+        self.assertTrue(drop.isBeingRead())
+        del column
+        gc.collect()
+        self.assertTrue(drop.isBeingRead())
+        numpy.testing.assert_equal(input_data[1:3], rows)
+        del rows
+        gc.collect()
+        self.assertFalse(drop.isBeingRead())
+        drop.delete()
+
     def test_DROPFile(self):
         """
         This test exercises the DROPFile mechanism to read the data represented by
@@ -1,5 +1,6 @@
+import pickle
 from typing import Optional
-from dlg.event import EventFirer, EventHandler, Event
+from dlg.event import CoalescingEventHandler, EventFirer, EventHandler, Event
 import pytest
 
 
@@ -25,6 +26,14 @@ class MockEventHandler(EventHandler):
         self.lastEvent = e
 
 
+class MockRecordingEventHandler(EventHandler):
+    def __init__(self) -> None:
+        self.events = []
+
+    def handleEvent(self, e: Event) -> None:
+        self.events.append(e)
+
+
 def test_listener_exception_interrupts_later_handlers():
     eventSource = MockEventSource()
     handler1 = MockEventHandler()
@@ -41,3 +50,57 @@ def test_listener_exception_interrupts_later_handlers():
     assert handler1.lastEvent is not None
     assert getattr(handler1.lastEvent, "prop") == "value"
     assert handler2.lastEvent is None
+
+
+def test_listeners_updated_after_subscriptions():
+    eventSource = MockEventSource()
+    handler1 = MockEventHandler()
+    handler2 = MockEventHandler()
+    eventSource.subscribe(handler1, "type")
+    eventSource.fireEvent("type", prop=1)
+    assert handler1.lastEvent.prop == 1
+
+    eventSource.subscribe(handler2)
+    eventSource.fireEvent("type", prop=2)
+    assert handler1.lastEvent.prop == 2
+    assert handler2.lastEvent.prop == 2
+
+    eventSource.unsubscribe(handler1, "type")
+    eventSource.fireEvent("type", prop=3)
+    assert handler1.lastEvent.prop == 2
+    assert handler2.lastEvent.prop == 3
+
+
+def test_event_attributes():
+    e = Event("status")
+    e.uid = "a"
+    e.status = 1
+    e.extra = "value"
+    assert not hasattr(e, "execStatus")
+
+    e2 = pickle.loads(pickle.dumps(e))
+    assert (e2.type, e2.uid, e2.status, e2.extra) == ("status", "a", 1, "value")
+    assert "'extra': 'value'" in repr(e2)
+
+
+def test_coalescing_handler():
+    handler = MockRecordingEventHandler()
+    coalescing = CoalescingEventHandler(handler, period=60)
+    eventSource = MockEventSource()
+    eventSource.subscribe(coalescing)
+    coalescing.start()
+    for status in range(3):
+        eventSource.fireEvent("status", uid="a", status=status)
+    eventSource.fireEvent("open", uid="a")
+    eventSource.fireEvent("open", uid="a")
+    eventSource.fireEvent("status", uid="b", status=0)
+    eventSource.fireEvent("status", uid="a", status=3)
+    assert not handler.events
+
+    coalescing.stop()
+    assert [(e.type, e.uid, getattr(e, "status", None)) for e in handler.events] == [
+        ("open", "a", None),
+        ("open", "a", None),
+        ("status", "b", 0),
+        ("status", "a", 3),
+    ]
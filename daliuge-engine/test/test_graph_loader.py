@@ -25,6 +25,7 @@ import pkg_resources
 
 from dlg import graph_loader
 from dlg.ddap_protocol import DROPLinkType, DROPRel
+from dlg.exceptions import InvalidGraphException
 from dlg.data.drops.container import ContainerDROP
 from dlg.apps.app_base import AppDROP
 
@@ -134,6 +135,57 @@ class TestGraphLoader(unittest.TestCase):
         self.assertEqual("B", b.uid)
         self.assertEqual(a, b.inputs[0])
 
+    def test_loadDropSpecs(self):
+        dropSpecList = [
+            {
+                "oid": "A",
+                "categoryType": "Data",
+                "dropclass": "dlg.data.drops.memory.InMemoryDROP",
+                "consumers": ["B"],
+                "parent": "C",
+            },
+            {
+                "oid": "B",
+                "categoryType": "Application",
+                "dropclass": "dfms.apps.simple.SleepApp",
+            },
+            {"oid": "C", "categoryType": "Container"},
+        ]
+        dropSpecs, _ = graph_loader.loadDropSpecs(list(dropSpecList))
+        self.assertEqual(["A", "B", "C"], list(dropSpecs))
+
+        # Missing DROPs and applications are detected
+        dropSpecList[0]["consumers"].append("D")
+        self.assertRaises(KeyError, graph_loader.loadDropSpecs, list(dropSpecList))
+        dropSpecList[0]["consumers"].pop()
+        dropSpecList[1]["dropclass"] = "dlg.apps.simple.NoSuchApp"
+        self.assertRaises(
+            InvalidGraphException, graph_loader.loadDropSpecs, list(dropSpecList)
+        )
+
+    def test_parallelCreation(self):
+        n = graph_loader.CREATION_BATCH_SIZE * 3 + 1
+        dropSpecList = [
+            {
+                "oid": "D%d" % i,
+                "categoryType": "Data",
+                "dropclass": "dlg.data.drops.memory.InMemoryDROP",
+                "consumers": ["A%d" % i],
+            }
+            for i in range(n)
+        ] + [
+            {
+                "oid": "A%d" % i,
+                "categoryType": "Application",
+                "dropclass": "test.test_graph_loader.DummyApp",
+            }
+            for i in range(n)
+        ]
+        roots = graph_loader.createGraphFromDropSpecList(dropSpecList, max_workers=4)
+        self.assertEqual(["D%d" % i for i in range(n)], [r.oid for r in roots])
+        for i, root in enumerate(roots):
+            self.assertEqual(["A%d" % i], [c.oid for c in root.consumers])
+
     def test_removeUnmetRelationships(self):
         # Unmet relationsips are
         # DROPRel(D, CONSUMER, A)
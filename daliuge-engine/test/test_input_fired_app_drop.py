@@ -1,5 +1,7 @@
+import threading
 from concurrent.futures import Future
-from dlg.apps.app_base import InputFiredAppDROP
+from dlg.apps.app_base import InputFiredAppDROP, ReadyQueueDispatcher
+from dlg.ddap_protocol import DROPStates
 from dlg.event import Event, EventHandler
 import pytest
 
@@ -40,3 +42,51 @@ def test_execute_propogates_unexpected_exception():
 
     assert "Handler throw" in str(e.value)
     assert "Drop throw" not in str(e.value)
+
+
+def test_dispatcher_priorities():
+    dispatcher = ReadyQueueDispatcher(1)
+    started, blocker = threading.Event(), threading.Event()
+    order = []
+
+    def block():
+        started.set()
+        blocker.wait()
+
+    dispatcher.submit(0, block)
+    started.wait()
+    futures = [
+        dispatcher.submit(priority, order.append, priority)
+        for priority in (1, 5, 3, 5)
+    ]
+    assert dispatcher.stats()["queue_depth"] == 4
+    blocker.set()
+    for fut in futures:
+        fut.result()
+
+    assert order == [5, 5, 3, 1]
+    stats = dispatcher.stats()
+    assert stats["queue_depth"] == 0
+    assert stats["max_queue_depth"] == 4
+    assert stats["threads"] == 1
+    assert stats["dispatched"] == 5
+    dispatcher.shutdown()
+    with pytest.raises(RuntimeError):
+        dispatcher.submit(0, order.append, 0)
+
+
+def test_async_execute_uses_dispatcher():
+    dispatcher = ReadyQueueDispatcher(2)
+    drops = []
+    for i in range(10):
+        drop = MockThrowingDrop(str(i), str(i), n_effective_inputs=1)
+        drop._dispatcher = dispatcher
+        drops.append(drop)
+    for fut in [drop.async_execute() for drop in drops]:
+        fut.result()
+
+    stats = dispatcher.stats()
+    assert stats["dispatched"] == 10
+    assert stats["threads"] <= 2
+    assert all(drop.status == DROPStates.ERROR for drop in drops)
+    dispatcher.shutdown()
@@ -19,9 +19,11 @@
 #    Foundation, Inc., 59 Temple Place, Suite 330, Boston,
 #    MA 02111-1307  USA
 #
+import io
 import unittest
 
-from dlg.data.io import NullIO, OpenMode
+from dlg.data.io import MemoryIO, NullIO, OpenMode, SharedMemoryIO
+from dlg.shared_memory import DlgSharedMemory
 
 
 class TestIO(unittest.TestCase):
@@ -44,3 +46,47 @@ class TestIO(unittest.TestCase):
 
         # It's OK to close it again
         io.close()
+
+    def test_memoryIOReads(self):
+        buf = io.BytesIO()
+        mio = MemoryIO(buf)
+        mio.open(OpenMode.OPEN_WRITE)
+        mio.write(b"0123456789")
+        mio.close()
+
+        mio.open(OpenMode.OPEN_READ)
+        chunks = [mio.read(4) for _ in range(4)]
+        mio.close()
+        self.assertEqual([b"0123", b"4567", b"89", b""], chunks)
+        self.assertTrue(all(isinstance(c, bytes) for c in chunks))
+
+        # buffer() gives read-only views of the original buffer
+        mio.open(OpenMode.OPEN_READ)
+        self.assertEqual(b"0123456789", mio.read(-1))
+        view = mio.buffer()
+        mio.close()
+        self.assertTrue(view.readonly)
+
+        # Data can't go away under the feet of outstanding views
+        mio.delete()
+        self.assertEqual(b"0123456789", view)
+        del view
+        mio.delete()
+        self.assertFalse(mio.exists())
+
+    def test_sharedMemoryIOEmptyRewrite(self):
+        shmio = SharedMemoryIO("a", "io")
+        shmio.open(OpenMode.OPEN_WRITE)
+        shmio.write(b"0123456789")
+        shmio.close()
+
+        # Rewriting a block with nothing empties it
+        shmio.open(OpenMode.OPEN_WRITE)
+        shmio.close()
+        shmio.open(OpenMode.OPEN_READ)
+        self.assertEqual(0, shmio.size())
+        self.assertEqual(b"", bytes(shmio.buffer()))
+        shmio.close()
+        block = DlgSharedMemory("io_a")
+        block.close()
+        block.unlink()
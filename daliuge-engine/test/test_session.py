@@ -20,6 +20,7 @@
 #    MA 02111-1307  USA
 #
 import json
+import threading
 import unittest
 
 import pkg_resources
@@ -27,7 +28,7 @@ import pkg_resources
 from dlg.ddap_protocol import DROPLinkType, DROPStates, AppDROPStates
 from dlg.droputils import DROPWaiterCtx
 from dlg.exceptions import InvalidGraphException
-from dlg.manager.session import SessionStates, Session
+from dlg.manager.session import LeavesCompletionListener, SessionStates, Session
 
 default_repro = {
     "rmode": "1",
@@ -152,6 +153,50 @@ class TestSession(unittest.TestCase):
                 ),
             )  # missing X DROP
 
+    def test_addGraphSpecStream(self):
+        def specs(n, extra=(), prefix=""):
+            for i in range(n):
+                yield {"oid": f"{prefix}{i}", "categoryType": "container"}
+            yield from extra
+
+        with Session("1") as s:
+            # Batches are added as they are consumed, reprodata is sliced off
+            s.addGraphSpecStream(
+                specs(10, [default_graph_repro.copy()]), batch_size=3
+            )
+            self.assertEqual(10, len(s._graph))
+            self.assertEqual("a", s._graphreprodata["merkleroot"])
+
+            # Relationships can point to DROPs in later batches
+            s.addGraphSpecStream(
+                iter(
+                    [
+                        {"oid": "A", "categoryType": "container", "consumers": ["B"]},
+                        {"oid": "B", "categoryType": "container"},
+                    ]
+                ),
+                batch_size=1,
+            )
+            self.assertEqual(12, len(s._graph))
+
+            # Failures in any batch leave the session untouched
+            for extra in (
+                [{"oid": "5", "categoryType": "container"}],
+                [{"oid": "X", "categoryType": "invalid"}],
+                [{"oid": "X", "categoryType": "container", "consumers": ["Y"]}],
+            ):
+                self.assertRaises(
+                    Exception,
+                    s.addGraphSpecStream,
+                    specs(20, extra, prefix="x"),
+                    batch_size=3,
+                )
+                self.assertEqual(12, len(s._graph))
+            self.assertRaises(InvalidGraphException, s.addGraphSpecStream, [])
+
+            s.deploy()
+            self.assertEqual(12, len(s.drops))
+
     def test_addGraphSpec_namedPorts(self):
         with pkg_resources.resource_stream(
             "test", "graphs/funcTestPG_namedPorts.graph"
@@ -289,3 +334,150 @@ class TestSession(unittest.TestCase):
                 self.assertEqual(DROPStates.COMPLETED, s.drops[uid].status)
             for uid in "DE":
                 self.assertEqual(DROPStates.CANCELLED, s.drops[uid].status)
+
+    def test_graphStatusSummaryAndChanges(self):
+        """Checks the aggregated and incremental views of the graph status"""
+        with Session("1") as s:
+            s.addGraphSpec(
+                add_test_reprodata(
+                    [
+                        {
+                            "oid": "A",
+                            "categoryType": "Data",
+                            "dropclass": "dlg.data.drops.memory.InMemoryDROP",
+                            "consumers": ["B"],
+                            "node": "n1",
+                        },
+                        {
+                            "oid": "B",
+                            "categoryType": "Application",
+                            "dropclass": "dlg.apps.simple.SleepApp",
+                            "sleep_time": 0,
+                            "node": "n1",
+                        },
+                        {
+                            "oid": "C",
+                            "categoryType": "Data",
+                            "dropclass": "dlg.data.drops.memory.InMemoryDROP",
+                            "producers": ["B"],
+                            "node": "n2",
+                        },
+                    ]
+                )
+            )
+            s.deploy()
+
+            summary = s.getGraphStatusSummary()
+            self.assertEqual(3, summary["total"])
+            self.assertEqual({DROPStates.INITIALIZED: 3}, summary["status"])
+            self.assertEqual({AppDROPStates.NOT_RUN: 1}, summary["execStatus"])
+            self.assertEqual(
+                {
+                    "n1": {DROPStates.INITIALIZED: 2},
+                    "n2": {DROPStates.INITIALIZED: 1},
+                },
+                summary["node"],
+            )
+
+            # Everything is reported the first time around
+            changes = s.getGraphStatusChanges()
+            self.assertEqual(summary["version"], changes["version"])
+            self.assertEqual({"A", "B", "C"}, set(changes["changes"]))
+            self.assertEqual(
+                AppDROPStates.NOT_RUN, changes["changes"]["B"]["execStatus"]
+            )
+            since = changes["version"]
+            self.assertEqual({}, s.getGraphStatusChanges(since)["changes"])
+
+            with DROPWaiterCtx(self, s.drops["C"], 3):
+                s.drops["A"].write(b"x")
+                s.drops["A"].setCompleted()
+
+            summary = s.getGraphStatusSummary()
+            self.assertEqual({DROPStates.COMPLETED: 3}, summary["status"])
+            self.assertEqual({AppDROPStates.FINISHED: 1}, summary["execStatus"])
+
+            # Only what changed after `since` is reported, and can be filtered
+            changes = s.getGraphStatusChanges(since)
+            self.assertGreater(changes["version"], since)
+            self.assertEqual({"A", "B", "C"}, set(changes["changes"]))
+            for oid in "ABC":
+                self.assertEqual(
+                    DROPStates.COMPLETED, changes["changes"][oid]["status"]
+                )
+            changes = s.getGraphStatusChanges(since, node=["n2"])
+            self.assertEqual({"C"}, set(changes["changes"]))
+            changes = s.getGraphStatusChanges(since, status=[DROPStates.ERROR])
+            self.assertEqual({}, changes["changes"])
+
+    def test_dropsByStatus(self):
+        """DROPs are indexed by their current status, in graph order"""
+        with Session("1") as s:
+            s.addGraphSpec(
+                add_test_reprodata(
+                    [
+                        {
+                            "oid": "A",
+                            "categoryType": "Data",
+                            "dropclass": "dlg.data.drops.memory.InMemoryDROP",
+                            "consumers": ["B"],
+                        },
+                        {
+                            "oid": "B",
+                            "categoryType": "Application",
+                            "dropclass": "dlg.apps.simple.SleepApp",
+                            "sleep_time": 0,
+                        },
+                        {
+                            "oid": "C",
+                            "categoryType": "Data",
+                            "dropclass": "dlg.data.drops.memory.InMemoryDROP",
+                            "producers": ["B"],
+                        },
+                    ]
+                )
+            )
+            s.deploy()
+            self.assertEqual(["C"], [d.oid for d in s.leaves])
+
+            tracker = s._statusTracker
+            initialized = tracker.drops([DROPStates.INITIALIZED])
+            self.assertEqual(["A", "B", "C"], [d.oid for d in initialized])
+
+            s.drops["A"].write(b"x")
+            writing = tracker.drops([DROPStates.WRITING])
+            self.assertEqual(["A"], [d.oid for d in writing])
+            others = tracker.drops(exclude=[DROPStates.WRITING])
+            self.assertEqual(["B", "C"], [d.oid for d in others])
+
+            # Finishing completes everything that wasn't yet
+            s.finish()
+            self.assertEqual(SessionStates.FINISHED, s.status)
+            for uid in "ABC":
+                self.assertEqual(DROPStates.COMPLETED, s.drops[uid].status)
+            self.assertEqual([], tracker.drops([DROPStates.INITIALIZED]))
+
+    def test_leavesCompletionListener_threads(self):
+        """The session finishes exactly once when leaves complete concurrently"""
+
+        class FakeSession(object):
+            sessionId = "1"
+            finished = 0
+
+            def finish(self):
+                self.finished += 1
+
+        n = 1000
+        session = FakeSession()
+        listener = LeavesCompletionListener(range(n), session)
+        threads = [
+            threading.Thread(
+                target=lambda: [listener.handleEvent(None) for _ in range(n // 10)]
+            )
+            for _ in range(10)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(1, session.finished)
@@ -26,6 +26,8 @@ import pickle
 import sys
 import unittest
 
+import numpy as np
+
 if sys.version_info >= (3, 8):
     from dlg.shared_memory import DlgSharedMemory, _MAXNAMELENGTH
 
@@ -58,6 +60,98 @@ class TestSharedMemory(unittest.TestCase):
         block_a.close()
         block_a.unlink()
 
+    def test_resize_keeps_data(self):
+        """
+        Resizing happens in place and must keep the data already in the block
+        """
+        block_a = DlgSharedMemory("A")
+        data = b"0123456789" * 100
+        block_a.buf[0 : len(data)] = data
+        block_a.resize(block_a.size * 4)
+        self.assertEqual(block_a.buf[0 : len(data)], data)
+        block_a.resize(len(data) // 2)
+        self.assertEqual(block_a.buf[:], data[: len(data) // 2])
+        block_a.close()
+        block_a.unlink()
+
+    def test_append_grows_geometrically(self):
+        """
+        Appending keeps a logical size separate from the capacity, which grows by doubling
+        """
+        block_a = DlgSharedMemory("A", size=16)
+        block_a.truncate(0)
+        capacities = set()
+        data = b""
+        for i in range(100):
+            chunk = bytes([i]) * 10
+            self.assertEqual(block_a.append(chunk), len(chunk))
+            data += chunk
+            capacities.add(block_a.capacity)
+        self.assertEqual(block_a.size, len(data))
+        self.assertGreaterEqual(block_a.capacity, block_a.size)
+        self.assertEqual(bytes(block_a.buf[0 : block_a.size]), data)
+        # 16 -> 1024 bytes in doublings, not one remap per append
+        self.assertEqual(len(capacities), 7)
+        block_a.resize(block_a.size)
+        self.assertEqual(block_a.capacity, len(data))
+        block_a.close()
+        block_b = DlgSharedMemory("A")
+        self.assertEqual(block_b.size, len(data))
+        self.assertEqual(bytes(block_b.buf), data)
+        block_b.close()
+        block_b.unlink()
+
+    def test_resize_with_views(self):
+        """
+        Blocks can be resized while views of their memory are in use. Shrinking moves the
+        data to a new block, so the views keep working with the old contents
+        """
+        block_a = DlgSharedMemory("A", size=16)
+        block_a.buf[:16] = bytes(range(16))
+        array = np.frombuffer(block_a.buf, dtype=np.uint8)
+        block_a.resize(64)
+        self.assertEqual(bytes(block_a.buf[:16]), bytes(range(16)))
+        view = np.frombuffer(block_a.buf, dtype=np.uint8)
+        block_a.resize(8)
+        self.assertEqual(bytes(block_a.buf), bytes(range(8)))
+        self.assertEqual(view.tobytes(), bytes(range(16)) + bytes(48))
+        self.assertEqual(array.tobytes(), bytes(range(16)))
+        block_a.close()
+        block_b = DlgSharedMemory("A")
+        self.assertEqual(bytes(block_b.buf), bytes(range(8)))
+        block_b.close()
+        block_b.unlink()
+
+    def test_resize_empty(self):
+        """
+        Blocks can be emptied, and reopened and grown again afterwards
+        """
+        block_a = DlgSharedMemory("A")
+        block_a.resize(0)
+        self.assertEqual(block_a.size, 0)
+        self.assertEqual(block_a.capacity, 0)
+        block_a.close()
+        block_b = DlgSharedMemory("A")
+        self.assertEqual(block_b.size, 0)
+        self.assertEqual(bytes(block_b.buf), b"")
+        block_b.append(b"data")
+        self.assertEqual(bytes(block_b.buf[: block_b.size]), b"data")
+        block_b.close()
+        block_b.unlink()
+
+    def test_truncate_bounds(self):
+        """
+        The logical size cannot go beyond the current capacity
+        """
+        block_a = DlgSharedMemory("A")
+        block_a.truncate(10)
+        self.assertEqual(block_a.size, 10)
+        self.assertEqual(block_a.capacity, 65536)
+        with self.assertRaises(ValueError):
+            block_a.truncate(block_a.capacity + 1)
+        block_a.close()
+        block_a.unlink()
+
     def test_open_new(self):
         """
         When opening a new block by name, that name should be respected
@@ -197,6 +197,29 @@ class TestUtils(unittest.TestCase):
             )
             self.assertEqual(0, len(stream.read(100).decode("latin1")))
 
+    def test_json_array_reader(self):
+        objects = [1, -1.5e10, "a☃", None, [1, [2]], {"oid": "A", "b": {}}]
+        for blocksize in (1, 2, 5, 1024):
+            for content in (
+                json.dumps(objects),
+                json.dumps(objects, indent=2, ensure_ascii=False),
+                json.dumps(objects, separators=(",", ":")),
+            ):
+                for stream in (io.StringIO(content), io.BytesIO(content.encode())):
+                    reader = utils.JSONArrayReader(stream, blocksize)
+                    self.assertEqual(objects, list(reader))
+
+            # Round trip with JSONStream, which produces the content lazily
+            reader = utils.JSONArrayReader(
+                utils.JSONStream((o for o in objects)), blocksize
+            )
+            self.assertEqual(objects, list(reader))
+            self.assertEqual([], list(utils.JSONArrayReader(io.BytesIO(b" [ ] "))))
+
+        for content in (b"", b"{}", b"[1,", b"[1 2]", b"[1,]", b"[{]", b"[1.]"):
+            reader = utils.JSONArrayReader(io.BytesIO(content), 2)
+            self.assertRaises(ValueError, list, reader)
+
     def test_get_dlg_root(self):
         # It should obey the DLG_ROOT environment variable
         old = os.environ.get("DLG_ROOT", None)
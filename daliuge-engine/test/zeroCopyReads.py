@@ -0,0 +1,101 @@
+#
+#    ICRAR - International Centre for Radio Astronomy Research
+#    (c) UWA - The University of Western Australia, 2024
+#    Copyright by UWA (in the framework of the ICRAR)
+#    All rights reserved
+#
+#    This library is free software; you can redistribute it and/or
+#    modify it under the terms of the GNU Lesser General Public
+#    License as published by the Free Software Foundation; either
+#    version 2.1 of the License, or (at your option) any later version.
+#
+#    This library is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#    Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public
+#    License along with this library; if not, write to the Free Software
+#    Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+#    MA 02111-1307  USA
+#
+"""
+A small benchmark that measures the peak memory used when loading numpy
+arrays and pickled objects from an InMemoryDROP. Each measurement runs in a
+fresh process, and the peak RSS is reset right before loading so it
+reflects the memory used by that load only (Linux only).
+"""
+
+import multiprocessing
+import pickle
+import resource
+import sys
+from optparse import OptionParser
+
+import numpy as np
+
+from dlg import drop_loaders
+from dlg.data.drops.memory import InMemoryDROP
+
+
+def _reset_peak_rss():
+    # Linux-specific, resets the VmHWM of the process to its current RSS
+    with open("/proc/self/clear_refs", "w") as f:
+        f.write("5")
+
+
+def _peak_rss():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmHWM:"):
+                return int(line.split()[1]) * 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def measure(size, loader):
+    """
+    Stores an array of `size` bytes in an InMemoryDROP and returns how many
+    bytes the peak RSS of the process grew while loading it back with `loader`
+    """
+    drop = InMemoryDROP("a", "a")
+    data = np.ones(size // 8, dtype=np.float64)
+    if loader == "npy":
+        drop_loaders.save_npy(drop, data)
+    else:
+        drop.write(memoryview(pickle.dumps(data, protocol=5)))
+    del data
+    drop.setCompleted()
+
+    _reset_peak_rss()
+    before = _peak_rss()
+    if loader == "npy":
+        res = drop_loaders.load_npy(drop)
+    else:
+        res = drop_loaders.load_pickle(drop)
+    assert res.nbytes == size // 8 * 8
+    return _peak_rss() - before
+
+
+if __name__ == "__main__":
+
+    parser = OptionParser()
+    parser.add_option(
+        "-s",
+        "--sizes",
+        action="store",
+        type="string",
+        dest="sizes",
+        help="Comma-separated payload sizes in MiB (default 100,500,1000,2000)",
+        default="100,500,1000,2000",
+    )
+    (options, args) = parser.parse_args(sys.argv)
+
+    ctx = multiprocessing.get_context("spawn")
+    for size in [int(s) * 1024**2 for s in options.sizes.split(",")]:
+        for loader in ("npy", "pickle"):
+            with ctx.Pool(1) as pool:
+                extra = pool.apply(measure, (size, loader))
+            print(
+                "%6s %6d MiB payload: peak RSS grew %8.1f MiB (%.2fx payload)"
+                % (loader, size // 1024**2, extra / 1024**2, extra / size)
+            )
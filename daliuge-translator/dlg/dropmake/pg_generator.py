@@ -168,6 +168,8 @@ def partition(
     deadline = _get_algo_param(algo_params, "deadline", None)
     topk = _get_algo_param(algo_params, "topk", 30)
     swarm_size = _get_algo_param(algo_params, "swarm_size", 40)
+    processes = _get_algo_param(algo_params, "processes", 1)
+    patience = _get_algo_param(algo_params, "patience", None)
 
     max_dop = {"num_cpus": max_cpu, "mem_usage": max_mem}
 
@@ -217,6 +219,8 @@ def partition(
             deadline=deadline,
             topk=topk,
             swarm_size=swarm_size,
+            processes=processes,
+            patience=patience,
             merge_parts=could_merge,
         )
 
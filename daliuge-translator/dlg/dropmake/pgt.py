@@ -58,6 +58,7 @@ class PGT(object):
         self._drop_list_len = len(drop_list)
         self._extra_drops = []  # artifacts DROPs produced during L2G mapping
         self._dag = DAGUtil.build_dag_from_drops(self._drop_list) if build_dag else None
+        self._csr_dag = None  # used instead of the DAG when it is not built
         self._json_str = None
         self._oid_gid_map = dict()
         self._gid_island_id_map = dict()
@@ -157,6 +158,8 @@ class PGT(object):
         elif self.dag is not None:
             G = self.dag
             self._data_movement = sum(e[2].get("weight", 0) for e in G.edges(data=True))
+        elif self._csr_dag is not None:
+            self._data_movement = self._csr_dag.edge_weight_sum()
         return self._data_movement
 
     def pred_exec_time(self, app_drop_only=False, wk="weight", force_answer=False):
@@ -165,13 +168,16 @@ class PGT(object):
         """
         G = self.dag
         if G is None:
-            if force_answer:
-                self._dag = DAGUtil.build_dag_from_drops(self._drop_list)
-                G = self.dag
-            else:
+            if not force_answer:
                 return None
+            # the drops' weights are enough, the DAG doesn't need to be built
+            if self._csr_dag is None:
+                self._csr_dag = DAGUtil.build_csr_from_drops(self._drop_list)
+            G = self._csr_dag
         if app_drop_only:
             lp = DAGUtil.get_longest_path(G, show_path=True)[0]
+            if G is self._csr_dag:
+                return sum(G.node_weights[G.index(u)].item() for u in lp)
             return sum(G.nodes[u].get(wk, 0) for u in lp)
         else:
             return DAGUtil.get_longest_path(G, show_path=False)[1]
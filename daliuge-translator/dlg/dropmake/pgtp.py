@@ -689,6 +689,8 @@ class PSOPGTP(MySarkarPGTP):
         deadline=None,
         topk=30,
         swarm_size=40,
+        processes=1,
+        patience=None,
         merge_parts=False,
     ):
         """
@@ -697,6 +699,8 @@ class PSOPGTP(MySarkarPGTP):
         self._deadline = deadline
         self._topk = topk
         self._swarm_size = swarm_size
+        self._processes = processes
+        self._patience = patience
         super(PSOPGTP, self).__init__(
             drop_list, 0, par_label, max_dop, merge_parts
         )
@@ -713,4 +717,6 @@ class PSOPGTP(MySarkarPGTP):
             dag=self.dag,
             topk=self._topk,
             swarm_size=self._swarm_size,
+            processes=self._processes,
+            patience=self._patience,
         )
@@ -21,6 +21,14 @@
 #
 
 """
+Maximum antichain (DAG width) algorithms.
+
+The unweighted width is based on Dilworth's theorem: the size of the maximum
+antichain of a DAG equals its number of nodes minus the size of a maximum
+matching in the bipartite graph that links every node to its descendants
+(i.e. the transitive closure of the DAG), which is found with Hopcroft-Karp
+in polynomial time instead of enumerating all antichains.
+
 Weighted antichain agorithm based on
 
 A special case (K = 1) of the Maximum Weighted K-families based on
@@ -31,11 +39,402 @@ A detailed proof can be found on Page 2 (Corollary)
     https://link.springer.com/article/10.1007/BF00333130
 """
 from asyncio.log import logger
+import collections
 import sys
 
 import networkx as nx
 
 
+class DAGWidth(object):
+    """
+    The width (the length, or weight, of the maximum antichain, i.e. the
+    maximum degree of parallelism) of a DAG that changes incrementally.
+
+    A maximum flow through the bipartite graph of the transitive closure of
+    the DAG is kept up to date as nodes and edges are added or removed, where
+    both copies of each node have the node's weight as capacity (with unit
+    weights, a maximum matching). The closure itself is never stored, which
+    would take memory quadratic in the number of nodes: the descendants of a
+    node are found by following the DAG's edges when needed. Flows remain
+    valid when nodes or edges are added, or when two DAGs are merged, so the
+    width is re-computed lazily by only looking for the augmenting paths the
+    changes opened up.
+    """
+
+    def __init__(self, dag=None, w_attr=None, default_weight=1):
+        self._succ = {}  # {node : set of direct successors}
+        self._pred = {}  # {node : set of direct predecessors}
+        self._weight = {}  # {node : weight}
+        self._flow = {}  # {node : {descendant : flow}}
+        self._rev = {}  # {node : {ancestor : flow}}
+        self._out = {}  # {node : total flow to its descendants}
+        self._in = {}  # {node : total flow from its ancestors}
+        self._total_weight = 0
+        self._flow_value = 0
+        self._dirty = False
+        if dag is not None:
+            for n, data in dag.nodes(data=True):
+                if w_attr is None:
+                    self.add_node(n, default_weight)
+                else:
+                    self.add_node(n, data.get(w_attr, default_weight))
+            for u, v in dag.edges():
+                self._succ[u].add(v)
+                self._pred[v].add(u)
+
+    def __len__(self):
+        return len(self._succ)
+
+    def __contains__(self, n):
+        return n in self._succ
+
+    @property
+    def width(self):
+        """
+        The length (or weight) of the maximum antichain of the DAG
+        """
+        self._augment()
+        return self._total_weight - self._flow_value
+
+    def descendants(self, n):
+        """
+        The set of descendants of node n
+        """
+        return self._reach(self._succ[n], self._succ)
+
+    def add_node(self, n, weight=1):
+        if n not in self._succ:
+            self._succ[n] = set()
+            self._pred[n] = set()
+            self._weight[n] = weight
+            self._flow[n] = {}
+            self._rev[n] = {}
+            self._out[n] = 0
+            self._in[n] = 0
+            self._total_weight += weight
+            self._dirty = True
+
+    def add_edge(self, u, v):
+        """
+        Add the edge (u, v), and the nodes u and v if they are new
+        """
+        self.add_node(u)
+        self.add_node(v)
+        self._add_edge(u, v)
+
+    def _add_edge(self, u, v, shared=False):
+        # Sets that might be shared with other instances are replaced instead
+        # of being updated in place
+        if u == v or self._reaches(v, u):
+            raise ValueError("Edge (%r, %r) would create a cycle" % (u, v))
+        if shared:
+            self._succ[u] = self._succ[u] | {v}
+            self._pred[v] = self._pred[v] | {u}
+        else:
+            self._succ[u].add(v)
+            self._pred[v].add(u)
+        self._dirty = True
+
+    def remove_node(self, n):
+        """
+        Remove node n and its edges
+        """
+        for v, f in list(self._flow[n].items()):
+            self._push(n, v, -f)
+            self._flow_value -= f
+        for u, f in list(self._rev[n].items()):
+            self._push(u, n, -f)
+            self._flow_value -= f
+        for attr in (self._flow, self._rev, self._out, self._in):
+            del attr[n]
+        self._total_weight -= self._weight.pop(n)
+        preds = self._pred.pop(n)
+        succs = self._succ.pop(n)
+        for u in preds:
+            self._succ[u].discard(n)
+        for v in succs:
+            self._pred[v].discard(n)
+        if preds and succs:
+            # paths going through n might have been the only ones connecting
+            # its ancestors to its descendants
+            descendants = self._reach(succs, self._succ)
+            for u in self._reach(preds, self._pred):
+                lost = [v for v in self._flow[u] if v in descendants]
+                if not lost:
+                    continue
+                reached = self._reach(self._succ[u], self._succ)
+                for v in lost:
+                    if v not in reached:
+                        f = self._flow[u][v]
+                        self._push(u, v, -f)
+                        self._flow_value -= f
+        self._dirty = True
+
+    def merge(self, other, u=None, v=None):
+        """
+        Add the nodes and edges of `other`, a DAGWidth with no nodes in common
+        with this one, plus the edge (u, v) if given. The flows of both stay
+        valid, so only new augmenting paths need to be found. `other` must
+        not be used afterwards
+        """
+        for attr in (
+            "_succ",
+            "_pred",
+            "_weight",
+            "_flow",
+            "_rev",
+            "_out",
+            "_in",
+        ):
+            getattr(self, attr).update(getattr(other, attr))
+        self._total_weight += other._total_weight
+        self._flow_value += other._flow_value
+        self._dirty = self._dirty or other._dirty
+        if u is not None:
+            self._add_edge(u, v)
+
+    def merged(self, other, u=None, v=None):
+        """
+        Return a new DAGWidth resulting of merging `other` into this one like
+        `merge` does, but leaving both of them untouched
+        """
+        new = DAGWidth()
+        for attr in ("_succ", "_pred", "_weight", "_out", "_in"):
+            values = getattr(new, attr)
+            values.update(getattr(self, attr))
+            values.update(getattr(other, attr))
+        for attr in ("_flow", "_rev"):
+            values = getattr(new, attr)
+            for flows in (getattr(self, attr), getattr(other, attr)):
+                for n, f in flows.items():
+                    values[n] = dict(f)
+        new._total_weight = self._total_weight + other._total_weight
+        new._flow_value = self._flow_value + other._flow_value
+        new._dirty = self._dirty or other._dirty
+        if u is not None:
+            new._add_edge(u, v, shared=True)
+        return new
+
+    def antichain(self):
+        """
+        Return the node list of a maximum antichain of the DAG
+        """
+        self._augment()
+        # Nodes whose left copy is on the source side of the minimum cut (the
+        # nodes reachable from the source in the residual graph) but whose
+        # right copy isn't (Koenig's theorem, for unit weights). Right copies
+        # are reached together with all their descendants, so the descendants
+        # of those already reached are not followed again
+        succ = self._succ
+        left = set(u for u in succ if self._out[u] < self._weight[u])
+        right = set()
+        queue = collections.deque(left)
+        while queue:
+            u = queue.popleft()
+            stack = list(succ[u])
+            while stack:
+                v = stack.pop()
+                if v in right:
+                    continue
+                right.add(v)
+                stack.extend(succ[v])
+                for w in self._rev[v]:
+                    if w not in left:
+                        left.add(w)
+                        queue.append(w)
+        return [n for n in succ if n in left and n not in right]
+
+    @staticmethod
+    def _reach(nodes, adj):
+        # nodes, and the nodes reachable from them following adj
+        reached = set()
+        stack = list(nodes)
+        while stack:
+            v = stack.pop()
+            if v not in reached:
+                reached.add(v)
+                stack.extend(adj[v])
+        return reached
+
+    def _reaches(self, u, v):
+        # whether v is a descendant of u
+        visited = set()
+        stack = [u]
+        while stack:
+            n = stack.pop()
+            for child in self._succ[n]:
+                if child == v:
+                    return True
+                if child not in visited:
+                    visited.add(child)
+                    stack.append(child)
+        return False
+
+    def _push(self, u, v, amount):
+        f = self._flow[u].get(v, 0) + amount
+        if f:
+            self._flow[u][v] = f
+            self._rev[v][u] = f
+        else:
+            del self._flow[u][v]
+            del self._rev[v][u]
+        self._out[u] += amount
+        self._in[v] += amount
+
+    def _augment(self):
+        """
+        Dinic's algorithm (Hopcroft-Karp for unit weights), starting from the
+        current flow
+        """
+        if not self._dirty:
+            return
+        succ, rev, weight, out, in_ = (
+            self._succ,
+            self._rev,
+            self._weight,
+            self._out,
+            self._in,
+        )
+        while True:
+            # Layer the left side with a BFS starting at its unsaturated nodes.
+            # The right copy of each descendant is visited from the first left
+            # node that reaches it, and so are all of the descendant's own
+            # descendants: those already visited are not followed again
+            free = [u for u in succ if out[u] < weight[u]]
+            dist = dict.fromkeys(free, 0)
+            level = {}  # {node : dist of the left node its right copy was visited from}
+            queue = collections.deque(free)
+            found = False
+            while queue:
+                u = queue.popleft()
+                stack = list(succ[u])
+                while stack:
+                    v = stack.pop()
+                    if v in level:
+                        continue
+                    level[v] = dist[u]
+                    stack.extend(succ[v])
+                    if in_[v] < weight[v]:
+                        found = True
+                    for w in rev[v]:
+                        if w not in dist:
+                            dist[w] = dist[u] + 1
+                            queue.append(w)
+            if not found:
+                break
+
+            # Push flow along the layers
+            for root in free:
+                while out[root] < weight[root] and self._augment_from(
+                    root, dist, level
+                ):
+                    pass
+        self._dirty = False
+
+    def _edges(self, u, d, level):
+        # the residual edges leaving the left copy of u (at distance d), two
+        # steps at a time: to the right copy of a descendant v, and from there
+        # either to the sink (w is None) or back to the left copy of an
+        # ancestor w of v. Only the descendants visited from d's layer are
+        # considered, the rest (and all their descendants) having been visited
+        # from an earlier one
+        succ, rev = self._succ, self._rev
+        visited = set()
+        stack = list(succ[u])
+        while stack:
+            v = stack.pop()
+            if v in visited or level.get(v) != d:
+                continue
+            visited.add(v)
+            stack.extend(succ[v])
+            yield v, None
+            for w in rev[v]:
+                yield v, w
+
+    def _augment_from(self, root, dist, level):
+        """
+        Push flow through an augmenting path starting at root, if there's one
+        """
+        flow, weight, in_ = self._flow, self._weight, self._in
+        stack = [root]
+        edges = [self._edges(root, 0, level)]
+        vias = []
+        while stack:
+            u = stack[-1]
+            for v, w in edges[-1]:
+                if w is None:
+                    if in_[v] < weight[v]:
+                        vias.append((v, None))
+                        break
+                elif dist.get(w) == dist[u] + 1 and v in flow[w]:
+                    vias.append((v, w))
+                    stack.append(w)
+                    edges.append(self._edges(w, dist[w], level))
+                    break
+            else:
+                # no augmenting path goes through u in this phase
+                dist[u] = None
+                stack.pop()
+                edges.pop()
+                if vias:
+                    vias.pop()
+                continue
+            if vias[-1][1] is None:
+                break
+        if not stack:
+            return False
+
+        amount = weight[root] - self._out[root]
+        for v, w in vias:
+            if w is None:
+                amount = min(amount, weight[v] - in_[v])
+            else:
+                amount = min(amount, flow[w][v])
+        u = root
+        for v, w in vias:
+            self._push(u, v, amount)
+            if w is not None:
+                self._push(w, v, -amount)
+            u = w
+        self._flow_value += amount
+        return True
+
+
+def get_max_antichain(dag):
+    """
+    Given a networkx DiGraph `dag`, return a tuple.
+    The first element is the length of the max antichain (the width of `dag`)
+    The second element is the node list of the antichain
+    """
+    antichain = DAGWidth(dag).antichain()
+    return len(antichain), antichain
+
+
+def get_max_weighted_width(dag, w_attr="weight", default_weight=1):
+    """
+    Given a networkx DiGraph `dag`, return the weight of its max weighted
+    antichain, where the weight of each node is given by its `w_attr` field.
+
+    This is the weighted form of Dilworth's theorem: the total weight of the
+    nodes minus the max flow through the transitive closure's bipartite graph
+    whose sides are connected to the source and sink with the node weights
+    as capacities.
+    """
+    closure = DAGWidth(dag)
+    flow_graph = nx.DiGraph()
+    total = 0
+    for n, data in dag.nodes(data=True):
+        w = data.get(w_attr, default_weight)
+        total += w
+        flow_graph.add_edge("s", (n, "x"), capacity=w)
+        flow_graph.add_edge((n, "y"), "t", capacity=w)
+        for v in closure.descendants(n):
+            flow_graph.add_edge((n, "x"), (v, "y"))
+    if total == 0:
+        return 0
+    return total - nx.maximum_flow_value(flow_graph, "s", "t")
+
+
 def _create_split_graph(dag, w_attr="weight"):
     """
     Given a normal DiGraph, create its equivalent split graph
@@ -0,0 +1,283 @@
+#
+#    ICRAR - International Centre for Radio Astronomy Research
+#    (c) UWA - The University of Western Australia, 2024
+#    Copyright by UWA (in the framework of the ICRAR)
+#    All rights reserved
+#
+#    This library is free software; you can redistribute it and/or
+#    modify it under the terms of the GNU Lesser General Public
+#    License as published by the Free Software Foundation; either
+#    version 2.1 of the License, or (at your option) any later version.
+#
+#    This library is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#    Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public
+#    License along with this library; if not, write to the Free Software
+#    Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+#    MA 02111-1307  USA
+#
+
+"""
+A compact, read-only DAG in Compressed Sparse Row (CSR) format.
+
+The successors of node i are indices[offsets[i]:offsets[i + 1]], and the
+weights of these edges are at the same positions in edge_weights. Nodes are
+processed one topological level (i.e. all the nodes whose predecessors have
+all been processed) at a time with numpy, so the algorithms take a few numpy
+calls per level instead of a few Python calls per node and edge.
+"""
+
+import numpy as np
+
+
+class CSRDAG(object):
+    """
+    A weighted DAG in CSR format. Nodes are known by their index in the
+    DAG, and have a label (e.g. their networkx node) in `nodes`
+    """
+
+    def __init__(self, nodes, src, dst, edge_weights=None, node_weights=None):
+        """
+        nodes:          the labels of the nodes
+        src, dst:       the indices of the source and destination of each edge
+        edge_weights:   the weight of each edge (default 1)
+        node_weights:   the weight of each node (default 0)
+        """
+        self.nodes = nodes if isinstance(nodes, range) else list(nodes)
+        n = len(self.nodes)
+        src = np.asarray(src, dtype=np.int32)
+        dst = np.asarray(dst, dtype=np.int32)
+        if edge_weights is None:
+            edge_weights = np.ones(len(src), dtype=np.int64)
+        if node_weights is None:
+            node_weights = np.zeros(n, dtype=np.int64)
+
+        order = np.argsort(src, kind="stable")
+        self.offsets = np.zeros(n + 1, dtype=np.int32)
+        np.cumsum(np.bincount(src, minlength=n), out=self.offsets[1:])
+        self.indices = dst[order]
+        self.edge_weights = np.asarray(edge_weights)[order]
+        self.node_weights = np.asarray(node_weights)
+        self._sources = src[order]
+        for array in (
+            self.offsets,
+            self.indices,
+            self.edge_weights,
+            self.node_weights,
+            self._sources,
+        ):
+            array.flags.writeable = False
+        self._levels = None
+        self._index = None
+
+    @classmethod
+    def from_graph(cls, G, weight="weight", default_weight=1):
+        """
+        Return the CSRDAG of networkx DiGraph G, with edges weighing their
+        `weight` attribute (or `default_weight`) and nodes weighing their
+        `weight` attribute (or 0)
+        """
+        index = {n: i for i, n in enumerate(G)}
+        src = []
+        dst = []
+        edge_weights = []
+        for u, nbrs in G.adj.items():
+            iu = index[u]
+            for v, data in nbrs.items():
+                src.append(iu)
+                dst.append(index[v])
+                edge_weights.append(data.get(weight, default_weight))
+        node_weights = [data.get(weight, 0) for data in G.nodes.values()]
+        dag = cls(index, src, dst, edge_weights, node_weights)
+        dag._index = index
+        return dag
+
+    def __len__(self):
+        return len(self.nodes)
+
+    @property
+    def num_edges(self):
+        return len(self.indices)
+
+    def index(self, node):
+        """
+        Return the index of the node labelled `node`
+        """
+        if self._index is None:
+            self._index = {n: i for i, n in enumerate(self.nodes)}
+        return self._index[node]
+
+    def _out_edges(self, nodes):
+        """
+        Return the positions of the edges of `nodes` in indices
+        """
+        starts = self.offsets[nodes]
+        counts = self.offsets[nodes + 1] - starts
+        return np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(
+            counts.sum()
+        )
+
+    def topological_levels(self):
+        """
+        Return the nodes as a list of arrays, where each array holds the
+        nodes whose predecessors are all in the previous arrays. Like with
+        networkx.topological_generations, nodes are sorted by the order in
+        which their last predecessor reaches them
+        """
+        if self._levels is not None:
+            return self._levels
+        in_degrees = np.bincount(self.indices, minlength=len(self))
+        frontier = np.flatnonzero(in_degrees == 0)
+        levels = []
+        num_sorted = 0
+        while len(frontier):
+            levels.append(frontier)
+            num_sorted += len(frontier)
+            reached = self.indices[self._out_edges(frontier)][::-1]
+            dsts, last, counts = np.unique(
+                reached, return_index=True, return_counts=True
+            )
+            in_degrees[dsts] -= counts
+            ready = in_degrees[dsts] == 0
+            frontier = dsts[ready][np.argsort(-last[ready], kind="stable")]
+        if num_sorted != len(self):
+            raise ValueError("Graph contains a cycle")
+        self._levels = levels
+        return levels
+
+    def topological_sort(self):
+        """
+        Return the indices of the nodes in a topological order
+        """
+        levels = self.topological_levels()
+        if not levels:
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate(levels)
+
+    def _propagate(self, init, no_preds, edge_value, node_value):
+        """
+        Return, in topological order, val[v] = node_value(v, x[v]) with
+        x[v] = init(max(edge_value(e, val[u]) for each edge e = (u, v)))
+        for nodes with predecessors, and no_preds otherwise
+        """
+        n = len(self)
+        best = np.full(n, -np.inf)
+        val = np.zeros(n)
+        for level in self.topological_levels():
+            x = best[level]
+            has_preds = x != -np.inf
+            val[level] = node_value(level, np.where(has_preds, init(x), no_preds))
+            edges = self._out_edges(level)
+            if len(edges):
+                np.maximum.at(
+                    best,
+                    self.indices[edges],
+                    edge_value(edges, val[self._sources[edges]]),
+                )
+        return val
+
+    def _as_weight(self, values):
+        """
+        Return values with the same type as the weights of the DAG
+        """
+        weights = [w for w in (self.edge_weights, self.node_weights) if len(w)]
+        if all(np.issubdtype(w.dtype, np.integer) for w in weights):
+            return values.astype(np.int64)
+        return values
+
+    def longest_path(self, show_path=True):
+        """
+        Return the longest path in the DAG and its length, like
+        `DAGUtil.get_longest_path`: the length of each edge (u, v) includes the
+        weight of u, and the weight of v if v is a leaf. Paths of negative
+        length are ignored. The path is None if not `show_path`.
+        """
+        if not len(self):
+            raise ValueError("Graph has no nodes")
+        edge_weights = self.edge_weights.astype(np.float64)
+        node_weights = self.node_weights.astype(np.float64)
+        is_leaf = self.offsets[1:] == self.offsets[:-1]
+        leaf_weights = np.where(is_leaf, node_weights, 0)
+        dsts = self.indices
+
+        def edge_length(edges, dist):
+            return (
+                dist
+                + edge_weights[edges]
+                + node_weights[self._sources[edges]]
+                + leaf_weights[dsts[edges]]
+            )
+
+        dist = self._propagate(
+            lambda x: x, 0, edge_length, lambda nodes, x: np.maximum(x, 0)
+        )
+        length = self._as_weight(dist)
+
+        # Like before, the path goes through the predecessor that comes last
+        # among those at the same distance, and ends at the node whose
+        # predecessor comes last among those at the longest distance
+        rank = self._rank()
+        edges = np.arange(self.num_edges)
+        lengths = edge_length(edges, dist[self._sources])
+        on_path = (lengths == dist[dsts]) & (lengths >= 0)
+        pred_rank = np.full(len(self), -1)
+        np.maximum.at(pred_rank, dsts[on_path], rank[self._sources[on_path]])
+        preds = np.arange(len(self))
+        has_pred = pred_rank >= 0
+        preds[has_pred] = np.argsort(rank)[pred_rank[has_pred]]
+
+        ends = np.flatnonzero(dist == dist.max())
+        ends = ends[rank[preds[ends]] == rank[preds[ends]].max()]
+        end = ends[0]
+        if len(ends) > 1:
+            position = np.empty(len(self), dtype=np.int64)
+            position[self.topological_sort()] = np.arange(len(self))
+            end = ends[np.argmin(position[ends])]
+
+        path = None
+        if show_path:
+            path = [end]
+            while preds[path[-1]] != path[-1]:
+                path.append(preds[path[-1]])
+            path = [self.nodes[i] for i in reversed(path)]
+        return path, length[end].item()
+
+    def _rank(self):
+        """
+        Return the rank of each node's label when sorted (or its index if the
+        labels can't be compared)
+        """
+        try:
+            order = sorted(range(len(self)), key=self.nodes.__getitem__)
+        except TypeError:
+            return np.arange(len(self))
+        rank = np.empty(len(self), dtype=np.int64)
+        rank[order] = np.arange(len(self))
+        return rank
+
+    def schedule(self):
+        """
+        Return the start and end times of all nodes, like
+        `DAGUtil.label_schedule`: nodes start when the last of their
+        predecessors ends (plus the weight of their edge), and end after their
+        weight
+        """
+        edge_weights = self.edge_weights.astype(np.float64)
+        node_weights = self.node_weights.astype(np.float64)
+        end = self._propagate(
+            lambda x: np.maximum(x, -1),
+            0,
+            lambda edges, end: end + edge_weights[edges],
+            lambda nodes, start: start + node_weights[nodes],
+        )
+        start = end - node_weights
+        return self._as_weight(start), self._as_weight(end)
+
+    def edge_weight_sum(self):
+        """
+        Return the total weight of the edges
+        """
+        return self.edge_weights.sum().item()
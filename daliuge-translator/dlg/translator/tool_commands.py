@@ -72,6 +72,8 @@ _param_types = {
     "deadline": int,
     "topk": int,
     "swarm_size": int,
+    "processes": int,
+    "patience": int,
     "max_mem": int,
 }
 
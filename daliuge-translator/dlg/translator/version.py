@@ -0,0 +1,9 @@
+# THIS FILE IS GENERATED BY SETUP.PY
+# DO NOT MODIFY BY HAND
+version = '4.0.1'
+git_version = 'f6b4b25aa8a6228cbcad6f7470775aa5b4d33e83'
+full_version = '4.0.1'
+is_release = True
+
+if not is_release:
+    version = full_version
\ No newline at end of file
@@ -103,7 +103,6 @@ install_requires = [
     "numpy",
     "parameterized",
     "psutil",
-    "pyswarm",
     "python-multipart",
     # "ruamel.yaml.clib<=0.2.2",
     "uvicorn==0.18",
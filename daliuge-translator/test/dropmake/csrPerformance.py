@@ -0,0 +1,117 @@
+#
+#    ICRAR - International Centre for Radio Astronomy Research
+#    (c) UWA - The University of Western Australia, 2024
+#    Copyright by UWA (in the framework of the ICRAR)
+#    All rights reserved
+#
+#    This library is free software; you can redistribute it and/or
+#    modify it under the terms of the GNU Lesser General Public
+#    License as published by the Free Software Foundation; either
+#    version 2.1 of the License, or (at your option) any later version.
+#
+#    This library is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#    Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public
+#    License along with this library; if not, write to the Free Software
+#    Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+#    MA 02111-1307  USA
+#
+"""
+A small benchmark that measures the time and memory it takes to build the DAG
+of scatter graphs (see scatterPartitioning.py) with increasing numbers of
+drops, as a networkx DiGraph and as a CSRDAG, and to compute their longest
+path and schedule.
+"""
+
+import sys
+import time
+import tracemalloc
+from optparse import OptionParser
+
+from dlg.dropmake.scheduler import DAGUtil
+from scatterPartitioning import scatter_drop_list
+
+
+def timed(func, *args):
+    start = time.time()
+    ret = func(*args)
+    return time.time() - start, ret
+
+
+def memory(func, *args):
+    """
+    Returns the memory (in MB) still allocated by func once it returns
+    """
+    tracemalloc.start()
+    ret = func(*args)
+    size = tracemalloc.get_traced_memory()[0] / 1e6
+    tracemalloc.stop()
+    del ret
+    return size
+
+
+def measure(drops, depth):
+    """
+    Returns, for a scatter graph with (about) `drops` drops and branches
+    `depth` applications deep, a dictionary with the time it takes to build it
+    as a networkx DiGraph and as a CSRDAG, the memory these take, and the
+    time it takes to compute their longest path and schedule (in seconds and
+    MB)
+    """
+    width = max(1, (drops - 2) // (2 * depth + 1))
+    drop_list = scatter_drop_list(width, depth)
+    results = {}
+    results["nx"], G = timed(DAGUtil.build_dag_from_drops, drop_list)
+    results["csr"], dag = timed(DAGUtil.build_csr_from_drops, drop_list)
+    results["nx_mem"] = memory(DAGUtil.build_dag_from_drops, drop_list)
+    results["csr_mem"] = memory(DAGUtil.build_csr_from_drops, drop_list)
+    results["nx_lp"], lp = timed(DAGUtil.get_longest_path, G)
+    results["csr_lp"], csr_lp = timed(DAGUtil.get_longest_path, dag)
+    assert lp == csr_lp
+    results["label"], _ = timed(DAGUtil.label_schedule, G)
+    return results
+
+
+if __name__ == "__main__":
+
+    parser = OptionParser()
+    parser.add_option(
+        "-n",
+        "--drops",
+        action="store",
+        type="string",
+        dest="drops",
+        help="Comma-separated numbers of drops (default 10000,100000,1000000)",
+        default="10000,100000,1000000",
+    )
+    parser.add_option(
+        "-d",
+        "--depth",
+        action="store",
+        type="int",
+        dest="depth",
+        help="Number of applications in each scatter branch (default 4)",
+        default=4,
+    )
+    (options, args) = parser.parse_args(sys.argv)
+
+    for drops in [int(x) for x in options.drops.split(",")]:
+        results = measure(drops, options.depth)
+        print(
+            "%7d drops: build %7.3f / %7.3f [s], %7.1f / %6.1f [MB] "
+            "(DiGraph / CSRDAG), longest path %6.3f / %6.3f [s], "
+            "schedule %6.3f [s]"
+            % (
+                drops,
+                results["nx"],
+                results["csr"],
+                results["nx_mem"],
+                results["csr_mem"],
+                results["nx_lp"],
+                results["csr_lp"],
+                results["label"],
+            )
+        )
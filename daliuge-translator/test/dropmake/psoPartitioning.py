@@ -0,0 +1,166 @@
+#
+#    ICRAR - International Centre for Radio Astronomy Research
+#    (c) UWA - The University of Western Australia, 2024
+#    Copyright by UWA (in the framework of the ICRAR)
+#    All rights reserved
+#
+#    This library is free software; you can redistribute it and/or
+#    modify it under the terms of the GNU Lesser General Public
+#    License as published by the Free Software Foundation; either
+#    version 2.1 of the License, or (at your option) any later version.
+#
+#    This library is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#    Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public
+#    License along with this library; if not, write to the Free Software
+#    Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+#    MA 02111-1307  USA
+#
+"""
+A small benchmark that measures how long the PSOScheduler takes to find a
+solution for a scatter graph (see scatterPartitioning.py) with different
+numbers of worker processes, and with or without stopping the swarm once it
+stops improving.
+"""
+
+import sys
+import time
+from optparse import OptionParser
+
+from dlg.dropmake.scheduler import PSOScheduler
+from scatterPartitioning import scatter_drop_list
+
+
+def measure(drop_list, swarm_size, max_dop, deadline, processes, patience, seed):
+    """
+    Partitions the drops with the PSOScheduler, and returns the time it took
+    in seconds, the number of iterations of the swarm, the number of positions
+    that were evaluated (i.e., not cached), and the longest path length and
+    number of partitions of the solution
+    """
+    scheduler = PSOScheduler(
+        drop_list,
+        max_dop={"num_cpus": max_dop},
+        deadline=deadline,
+        swarm_size=swarm_size,
+        processes=processes,
+        patience=patience,
+        seed=seed,
+    )
+    start = time.time()
+    num_parts, lpl, _, _ = scheduler.partition_dag()
+    return (
+        time.time() - start,
+        scheduler._iterations,
+        scheduler._call_counts,
+        lpl,
+        num_parts,
+    )
+
+
+if __name__ == "__main__":
+
+    parser = OptionParser()
+    parser.add_option(
+        "-w",
+        "--width",
+        action="store",
+        type="int",
+        dest="width",
+        help="Scatter width, 84 gives 504 edges with the default depth (default 84)",
+        default=84,
+    )
+    parser.add_option(
+        "-d",
+        "--depth",
+        action="store",
+        type="int",
+        dest="depth",
+        help="Number of applications in each scatter branch (default 2)",
+        default=2,
+    )
+    parser.add_option(
+        "-s",
+        "--swarm-size",
+        action="store",
+        type="int",
+        dest="swarm_size",
+        help="Number of particles in the swarm (default 40)",
+        default=40,
+    )
+    parser.add_option(
+        "-m",
+        "--max-dop",
+        action="store",
+        type="int",
+        dest="max_dop",
+        help="Maximum DoP allowed in each partition (default 4)",
+        default=4,
+    )
+    parser.add_option(
+        "-D",
+        "--deadline",
+        action="store",
+        type="int",
+        dest="deadline",
+        help="Deadline, minimises the number of partitions if given",
+        default=None,
+    )
+    parser.add_option(
+        "-p",
+        "--processes",
+        action="store",
+        type="string",
+        dest="processes",
+        help="Comma-separated numbers of worker processes (default 1,4)",
+        default="1,4",
+    )
+    parser.add_option(
+        "-t",
+        "--patience",
+        action="store",
+        type="string",
+        dest="patience",
+        help="Comma-separated numbers of iterations without improvement "
+        "after which the swarm stops, 0 to never stop early (default 0,10)",
+        default="0,10",
+    )
+    parser.add_option(
+        "-r",
+        "--seed",
+        action="store",
+        type="int",
+        dest="seed",
+        help="Seed of the swarm (default 0)",
+        default=0,
+    )
+    (options, args) = parser.parse_args(sys.argv)
+
+    drop_list = scatter_drop_list(options.width, options.depth)
+    for patience in [int(x) for x in options.patience.split(",")]:
+        for processes in [int(x) for x in options.processes.split(",")]:
+            delta, iterations, evaluations, lpl, num_parts = measure(
+                drop_list,
+                options.swarm_size,
+                options.max_dop,
+                options.deadline,
+                processes,
+                patience,
+                options.seed,
+            )
+            print(
+                "patience %3d, %2d processes: %8.3f [s], %3d iterations, "
+                "%5d evaluations, longest path %d, %d partitions"
+                % (
+                    patience,
+                    processes,
+                    delta,
+                    iterations,
+                    evaluations,
+                    lpl,
+                    num_parts,
+                )
+            )
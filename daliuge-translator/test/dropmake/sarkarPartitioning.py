@@ -0,0 +1,132 @@
+#
+#    ICRAR - International Centre for Radio Astronomy Research
+#    (c) UWA - The University of Western Australia, 2024
+#    Copyright by UWA (in the framework of the ICRAR)
+#    All rights reserved
+#
+#    This library is free software; you can redistribute it and/or
+#    modify it under the terms of the GNU Lesser General Public
+#    License as published by the Free Software Foundation; either
+#    version 2.1 of the License, or (at your option) any later version.
+#
+#    This library is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#    Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public
+#    License along with this library; if not, write to the Free Software
+#    Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+#    MA 02111-1307  USA
+#
+"""
+A small benchmark that measures how long the MySarkarScheduler takes to
+partition scatter graphs (see scatterPartitioning.py) with increasing numbers
+of drops under a DoP constraint. The resulting partitions can be saved to a
+file, and compared against those saved by another version of the scheduler.
+"""
+
+import json
+import sys
+import time
+from optparse import OptionParser
+
+from dlg.dropmake.scheduler import MySarkarScheduler
+from scatterPartitioning import scatter_drop_list
+
+
+def measure(drops, depth, max_dop):
+    """
+    Partitions a scatter graph with (about) `drops` drops and branches
+    `depth` applications deep, and returns the time it took in seconds, the
+    number of partitions and the longest path length of the result, and the
+    result itself (the gid of each drop, and the drops of each partition)
+    """
+    width = max(1, (drops - 2) // (2 * depth + 1))
+    scheduler = MySarkarScheduler(scatter_drop_list(width, depth), max_dop=max_dop)
+    start = time.time()
+    _, lpl, _, parts = scheduler.partition_dag()
+    delta = time.time() - start
+    G = scheduler._dag
+    result = {
+        "gids": {str(n): G.nodes[n]["gid"] for n in G},
+        "parts": {
+            str(part._gid): sorted(str(n) for n in part._dag) for part in parts
+        },
+    }
+    return delta, len(parts), lpl, result
+
+
+if __name__ == "__main__":
+
+    parser = OptionParser()
+    parser.add_option(
+        "-n",
+        "--drops",
+        action="store",
+        type="string",
+        dest="drops",
+        help="Comma-separated numbers of drops (default 10000,50000,100000,200000)",
+        default="10000,50000,100000,200000",
+    )
+    parser.add_option(
+        "-d",
+        "--depth",
+        action="store",
+        type="int",
+        dest="depth",
+        help="Number of applications in each scatter branch (default 4)",
+        default=4,
+    )
+    parser.add_option(
+        "-m",
+        "--max-dop",
+        action="store",
+        type="int",
+        dest="max_dop",
+        help="Maximum DoP allowed in each partition (default 8)",
+        default=8,
+    )
+    parser.add_option(
+        "-s",
+        "--save",
+        action="store",
+        type="string",
+        dest="save",
+        help="Save the resulting partitions to this file",
+        default=None,
+    )
+    parser.add_option(
+        "-c",
+        "--compare",
+        action="store",
+        type="string",
+        dest="compare",
+        help="Compare the resulting partitions with those saved in this file",
+        default=None,
+    )
+    (options, args) = parser.parse_args(sys.argv)
+
+    expected = {}
+    if options.compare:
+        with open(options.compare) as f:
+            expected = json.load(f)
+
+    results = {}
+    for drops in [int(x) for x in options.drops.split(",")]:
+        delta, num_parts, lpl, result = measure(
+            drops, options.depth, options.max_dop
+        )
+        key = "%d,%d,%d" % (drops, options.depth, options.max_dop)
+        results[key] = result
+        same = ""
+        if key in expected:
+            same = ", same" if expected[key] == result else ", DIFFERENT"
+        print(
+            "%7d drops: %9.3f [s], %6d partitions, longest path %d%s"
+            % (drops, delta, num_parts, lpl, same)
+        )
+
+    if options.save:
+        with open(options.save, "w") as f:
+            json.dump(results, f)
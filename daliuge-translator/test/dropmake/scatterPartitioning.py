@@ -0,0 +1,197 @@
+#
+#    ICRAR - International Centre for Radio Astronomy Research
+#    (c) UWA - The University of Western Australia, 2024
+#    Copyright by UWA (in the framework of the ICRAR)
+#    All rights reserved
+#
+#    This library is free software; you can redistribute it and/or
+#    modify it under the terms of the GNU Lesser General Public
+#    License as published by the Free Software Foundation; either
+#    version 2.1 of the License, or (at your option) any later version.
+#
+#    This library is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the GNU
+#    Lesser General Public License for more details.
+#
+#    You should have received a copy of the GNU Lesser General Public
+#    License along with this library; if not, write to the Free Software
+#    Foundation, Inc., 59 Temple Place, Suite 330, Boston,
+#    MA 02111-1307  USA
+#
+"""
+A small benchmark that measures how long it takes to compute the maximum
+degree of parallelism (DoP) of scatter graphs of increasing width, and to
+partition them under a DoP constraint. Each graph has a root application that
+scatters its output over `width` branches, each made of `depth`
+application/data pairs, which are gathered by a final application.
+
+It also measures the time and peak memory it takes for a single partition to
+grow along a long chain, one edge at a time.
+"""
+
+import sys
+import time
+import tracemalloc
+from optparse import OptionParser
+
+import networkx as nx
+
+from dlg.common import CategoryType
+from dlg.dropmake.scheduler import DAGUtil, Partition, PSOScheduler
+
+
+def scatter_drop_list(width, depth):
+    """
+    Returns the drop list of a scatter graph `width` wide and `depth` deep
+    """
+    drops = []
+
+    def app(oid, outputs):
+        drops.append(
+            {
+                "oid": oid,
+                "name": oid,
+                "categoryType": CategoryType.APPLICATION,
+                "weight": 5,
+                "outputs": outputs,
+            }
+        )
+
+    def data(oid, consumers):
+        drops.append(
+            {
+                "oid": oid,
+                "name": oid,
+                "categoryType": CategoryType.DATA,
+                "weight": 2,
+                "consumers": consumers,
+            }
+        )
+
+    app("scatter", ["in_%d" % i for i in range(width)])
+    for i in range(width):
+        data("in_%d" % i, ["app_%d_0" % i])
+        for j in range(depth):
+            nxt = "out_%d_%d" % (i, j)
+            app("app_%d_%d" % (i, j), [nxt])
+            consumer = "app_%d_%d" % (i, j + 1) if j + 1 < depth else "gather"
+            data(nxt, [consumer])
+    app("gather", [])
+    return drops
+
+
+def measure(width, depth, max_dop, enumerate_limit):
+    """
+    Returns the time it takes to calculate the DoP of a scatter graph with
+    both the enumeration of all its antichains (only if `width` is not above
+    `enumerate_limit`) and DAGUtil.get_max_dop, and then to partition it as
+    one PSO particle that zeroes all edges, in seconds
+    """
+    drop_list = scatter_drop_list(width, depth)
+    G = DAGUtil.build_dag_from_drops(drop_list, embed_drop=False)
+
+    enumeration = None
+    if width <= enumerate_limit:
+        start = time.time()
+        slow_dop = max(len(antichain) for antichain in nx.antichains(G))
+        enumeration = time.time() - start
+
+    start = time.time()
+    dop = DAGUtil.get_max_dop(G)
+    dilworth = time.time() - start
+    assert dop == width, "DoP is %d instead of %d" % (dop, width)
+    assert enumeration is None or slow_dop == dop
+
+    scheduler = PSOScheduler(drop_list, max_dop={"num_cpus": max_dop})
+    start = time.time()
+    scheduler._partition_G(scheduler._lite_dag.to_graph(), [1] * scheduler._leng)
+    partitioning = time.time() - start
+    return enumeration, dilworth, partitioning
+
+
+def measure_chain(length, max_dop):
+    """
+    Returns the time, in seconds, and peak memory, in MiB, it takes for a
+    partition to take in a chain of `length` nodes, probing each edge before
+    adding it like MySarkarScheduler does
+    """
+    node = {"weight": 1, "num_cpus": 1}
+    tracemalloc.start()
+    start = time.time()
+    partition = Partition(0, {"num_cpus": max_dop})
+    partition.add_node(0, 1)
+    for u in range(length - 1):
+        partition.can_add(u, u + 1, node, node)
+        partition.add(u, u + 1, node, node)
+    duration = time.time() - start
+    peak = tracemalloc.get_traced_memory()[1] / 1024**2
+    tracemalloc.stop()
+    return duration, peak
+
+
+if __name__ == "__main__":
+
+    parser = OptionParser()
+    parser.add_option(
+        "-w",
+        "--widths",
+        action="store",
+        type="string",
+        dest="widths",
+        help="Comma-separated scatter widths (default 4,6,100,500)",
+        default="4,6,100,500",
+    )
+    parser.add_option(
+        "-d",
+        "--depth",
+        action="store",
+        type="int",
+        dest="depth",
+        help="Number of applications in each scatter branch (default 3)",
+        default=3,
+    )
+    parser.add_option(
+        "-m",
+        "--max-dop",
+        action="store",
+        type="int",
+        dest="max_dop",
+        help="Maximum DoP allowed in each partition (default 8)",
+        default=8,
+    )
+    parser.add_option(
+        "-e",
+        "--enumerate-limit",
+        action="store",
+        type="int",
+        dest="enumerate_limit",
+        help="Widest graph whose antichains are all enumerated (default 6)",
+        default=6,
+    )
+    parser.add_option(
+        "-c",
+        "--chain-length",
+        action="store",
+        type="int",
+        dest="chain_length",
+        help="Length of the chain taken in by a single partition (default 3000)",
+        default=3000,
+    )
+    (options, args) = parser.parse_args(sys.argv)
+
+    for width in [int(x) for x in options.widths.split(",")]:
+        enumeration, dilworth, partitioning = measure(
+            width, options.depth, options.max_dop, options.enumerate_limit
+        )
+        enumeration = "-" if enumeration is None else "%.3f" % enumeration
+        print(
+            "width %4d: enumeration %8s [s], dilworth %8.3f [s], "
+            "partitioning %8.3f [s]" % (width, enumeration, dilworth, partitioning)
+        )
+
+    duration, peak = measure_chain(options.chain_length, options.max_dop)
+    print(
+        "chain %d: partitioning %8.3f [s], peak memory %8.1f [MiB]"
+        % (options.chain_length, duration, peak)
+    )
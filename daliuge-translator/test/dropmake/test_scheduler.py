@@ -20,8 +20,10 @@
 #    MA 02111-1307  USA
 
 import os
+import random
 import unittest
 
+import networkx as nx
 import pkg_resources
 import psutil
 from dlg.dropmake.lg import LG
@@ -29,10 +31,13 @@ from dlg.dropmake.scheduler import (
     Scheduler,
     MySarkarScheduler,
     DAGUtil,
+    KFamilyPartition,
     Partition,
     MinNumPartsScheduler,
     PSOScheduler,
 )
+from dlg.dropmake.utils.antichains import DAGWidth
+from dlg.dropmake.utils.csr import CSRDAG
 
 if "DALIUGE_TESTS_RUNLONGTESTS" in os.environ:
     skip_long_tests = not bool(os.environ["DALIUGE_TESTS_RUNLONGTESTS"])
@@ -69,6 +74,170 @@ class TestScheduler(unittest.TestCase):
         r = DAGUtil.get_max_dop(part._dag)
         assert l == r, "l = {0}, r = {1}".format(l, r)
 
+    def test_max_dop(self):
+        """DAGUtil's width functions agree with enumerating all antichains"""
+        rnd = random.Random(42)
+        for _ in range(100):
+            G = nx.gnp_random_graph(rnd.randint(1, 10), 0.3, seed=rnd)
+            G = nx.DiGraph((u, v) for u, v in G.edges() if u < v)
+            G.add_nodes_from(range(3))
+            for n in G:
+                G.nodes[n]["weight"] = rnd.randint(0, 5)
+            antichains = list(nx.antichains(G))
+            self.assertEqual(
+                max(len(ac) for ac in antichains), DAGUtil.get_max_dop(G)
+            )
+            self.assertEqual(
+                max(sum(G.nodes[n]["weight"] for n in ac) for ac in antichains),
+                DAGUtil.get_max_width(G),
+            )
+            max_antichain = DAGUtil.get_max_antichains(G)[0]
+            self.assertIn(set(max_antichain), [set(ac) for ac in antichains])
+            self.assertEqual(DAGUtil.get_max_dop(G), len(max_antichain))
+
+    def test_incremental_width(self):
+        """DAGWidth keeps the width up to date as the DAG changes"""
+        G = nx.DiGraph()
+        width = DAGWidth()
+        # a scatter 100 wide and 3 deep, whose antichains can't be enumerated
+        for i in range(100):
+            for u, v in (("root", (i, 0)), ((i, 0), (i, 1)), ((i, 1), "sink")):
+                G.add_edge(u, v)
+                width.add_edge(u, v)
+        self.assertEqual(100, width.width)
+        self.assertEqual(100, DAGUtil.get_max_dop(G))
+        self.assertEqual(100, len(width.antichain()))
+
+        # Gathering half of the branches reduces the width
+        for i in range(50):
+            width.add_edge((i, 1), "gather")
+        width.add_edge("gather", "sink")
+        self.assertEqual(100, width.width)
+        width.add_edge("gather", (50, 0))
+        self.assertEqual(99, width.width)
+
+        # removing nodes in the middle of paths
+        width.remove_node("gather")
+        self.assertEqual(100, width.width)
+        for i in range(50):
+            width.remove_node((i, 0))
+        self.assertEqual(100, width.width)
+        for i in range(50):
+            width.remove_node((i, 1))
+        self.assertEqual(50, width.width)
+        self.assertRaises(ValueError, width.add_edge, "sink", "root")
+
+    def test_csr_dag(self):
+        """CSRDAG's algorithms agree with straightforward ones on networkx"""
+        rnd = random.Random(3)
+        for _ in range(100):
+            n = rnd.randint(1, 12)
+            G = nx.gnp_random_graph(n, 0.3, seed=rnd)
+            G = nx.DiGraph((u, v) for u, v in G.edges() if u < v)
+            G.add_nodes_from(range(n))
+            for v in G:
+                G.nodes[v]["weight"] = rnd.randint(0, 5)
+            for u, v in G.edges():
+                G.adj[u][v]["weight"] = rnd.randint(0, 5)
+            dag = CSRDAG.from_graph(G)
+            self.assertEqual(
+                list(nx.topological_sort(G)),
+                [dag.nodes[i] for i in dag.topological_sort()],
+            )
+
+            # every path from a root, with the weights of get_longest_path
+            def lengths(path, length):
+                u = path[-1]
+                yield path, length
+                for v in G.successors(u):
+                    leaf = G.out_degree(v) == 0
+                    yield from lengths(
+                        path + [v],
+                        length
+                        + G.adj[u][v]["weight"]
+                        + G.nodes[u]["weight"]
+                        + (G.nodes[v]["weight"] if leaf else 0),
+                    )
+
+            paths = dict()
+            for root in (u for u in G if G.in_degree(u) == 0):
+                for path, length in lengths([root], 0):
+                    paths[tuple(path)] = length
+            path, length = DAGUtil.get_longest_path(G)
+            self.assertEqual(max(paths.values()), length)
+            self.assertEqual(length, paths[tuple(path)])
+
+            DAGUtil.label_schedule(G)
+            for v in G:
+                preds = [
+                    G.nodes[u]["edt"] + G.adj[u][v]["weight"] for u in G.pred[v]
+                ]
+                stt = max(preds) if preds else 0
+                self.assertEqual(stt, G.nodes[v]["stt"])
+                self.assertEqual(stt + G.nodes[v]["weight"], G.nodes[v]["edt"])
+
+        self.assertRaises(
+            ValueError, CSRDAG.from_graph(nx.DiGraph([(1, 2), (2, 1)])).topological_sort
+        )
+
+    def test_csr_from_drops(self):
+        """build_csr_from_drops gives the DAG of build_dag_from_drops"""
+        drop_list = LG(get_lg_fname("cont_img_mvp.graph")).unroll_to_tpl()
+        G = DAGUtil.build_dag_from_drops(drop_list)
+        dag = DAGUtil.build_csr_from_drops(drop_list)
+        self.assertEqual(sorted(G.nodes()), list(dag.nodes))
+        edges = {}
+        for u in range(len(dag)):
+            for e in range(dag.offsets[u], dag.offsets[u + 1]):
+                v = dag.nodes[dag.indices[e]]
+                edges[(dag.nodes[u], v)] = dag.edge_weights[e]
+        self.assertEqual({(u, v): d["weight"] for u, v, d in G.edges(data=True)}, edges)
+        self.assertEqual(
+            [G.nodes[n]["weight"] for n in dag.nodes], dag.node_weights.tolist()
+        )
+        self.assertEqual(
+            DAGUtil.get_longest_path(G), DAGUtil.get_longest_path(dag)
+        )
+
+    def test_kfamily_merges(self):
+        """KFamilyPartition merges only if the merged partition is narrow enough"""
+        rnd = random.Random(7)
+        G = nx.gnp_random_graph(30, 0.15, seed=rnd)
+        G = nx.DiGraph((u, v) for u, v in G.edges() if u < v)
+        G.add_nodes_from(range(30))
+        for n in G:
+            G.nodes[n]["num_cpus"] = rnd.randint(1, 3)
+
+        def width(dag):
+            return max(
+                sum(dag.nodes[n]["num_cpus"] for n in ac)
+                for ac in nx.antichains(dag)
+            )
+
+        parts = {}
+        for n in G:
+            parts[n] = KFamilyPartition(n, {"num_cpus": 6}, global_dag=G)
+            parts[n].add_node(n)
+        for u, v in sorted(G.edges()) + [(None, None)] * 10:
+            if u is None:
+                # merge partitions that are not linked
+                partA, partB = rnd.sample(list(set(parts.values())), 2)
+            else:
+                partA, partB = parts[u], parts[v]
+            if partA is partB:
+                continue
+            merged = nx.compose(partA._dag, partB._dag)
+            if u is not None:
+                merged.add_edge(u, v)
+            allowed = max(6, partB._max_dop["num_cpus"])
+            expected = width(merged) <= allowed
+            self.assertEqual(expected, partA.can_merge(partB, u, v))
+            if expected:
+                partA.merge(partB, u, v)
+                for n in partB._dag:
+                    parts[n] = partA
+                self.assertEqual(width(merged), partA._widths["num_cpus"].width)
+
     def test_basic_scheduler(self):
         fp = get_lg_fname("cont_img_mvp.graph")
         lg = LG(fp)
@@ -116,6 +285,47 @@ class TestScheduler(unittest.TestCase):
                 """
             # mys.merge_partitions(numparts)
 
+    def test_mysarkar_gids(self):
+        """Partitions are numbered consecutively, and so are their drops"""
+        for mdp in (1, 2, 8):
+            lg = LG(get_lg_fname("cont_img_mvp.graph"))
+            drop_list = lg.unroll_to_tpl()
+            mys = MySarkarScheduler(drop_list, max_dop=mdp)
+            _, _, _, parts = mys.partition_dag()
+            st_gid = len(drop_list) + 1
+            gids = sorted(part._gid for part in parts)
+            self.assertEqual(list(range(st_gid, st_gid + len(parts))), gids)
+            self.assertEqual(gids, sorted(mys._part_dict))
+            for part in parts:
+                self.assertIs(part, mys._part_dict[part._gid])
+                for n in part._dag:
+                    self.assertEqual(part._gid, mys._dag.nodes[n]["gid"])
+            self.assertEqual(
+                len(mys._dag), sum(len(part._dag) for part in parts)
+            )
+
+    def test_pso_swarm(self):
+        """The swarm finds the same solution whatever the number of processes"""
+        drop_list = LG(get_lg_fname("chiles_simple.graph")).unroll_to_tpl()
+        results = []
+        for processes, patience in ((1, None), (2, None), (1, 1)):
+            pso = PSOScheduler(
+                drop_list,
+                max_dop={"num_cpus": 2},
+                swarm_size=10,
+                processes=processes,
+                patience=patience,
+                max_iter=5,
+                seed=1,
+            )
+            num_parts, lpl, _, parts = pso.partition_dag()
+            self.assertEqual(num_parts, len(parts))
+            # positions are evaluated only once
+            self.assertEqual(pso._call_counts, len(pso._sspace_dict))
+            self.assertLessEqual(pso._iterations, 5)
+            results.append((num_parts, lpl))
+        self.assertEqual(results[0], results[1])
+
     @unittest.skipIf(
         skip_long_tests,
         "Skipping because they take too long. Chen to eventually shorten them",
@@ -62,7 +62,6 @@ MOCK_MODULES = (
     "pyarrow",
     "pyarrow.plasma",
     "pyarrow.flight",
-    "pyswarm",
     "python-daemon",
     "pyzmq",
     "scp",